@@ -0,0 +1,370 @@
+import os
+import json
+import asyncio
+import hashlib
+import functools
+import threading
+import uuid
+from typing import List, Literal, Optional
+
+import anyio
+from pydantic import BaseModel, Field, ValidationError
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from langchain_core.messages import AIMessage, HumanMessage
+
+import app as core
+from chat_memory import ChatMemory
+from extraction import DocumentError
+from llm_scheduler import get_scheduler
+from model_router import get_router
+from models import CareerAnalysis, ResumeData
+from question_bank import DIFFICULTIES, get_question_bank
+from telemetry import set_session
+
+# ==========================================
+# HEADLESS HTTP API (ASGI)
+# ==========================================
+# Pipeline yang sama dengan UI Streamlit, diekspos sebagai service async:
+#   uvicorn api:api --port 8080
+#   PAKAR_FAKE_LLM=1 uvicorn api:api   # chat model pengganti offline (untuk load test)
+# API key Gemini dikirim per request lewat header X-Gemini-Key (fallback env GEMINI_API_KEY).
+# Setiap key dibatasi PAKAR_API_KEY_CONCURRENCY request bersamaan; request yang menunggu
+# lebih dari PAKAR_API_QUEUE_TIMEOUT detik ditolak dengan 429. Panggilan LLM yang blocking
+# dijalankan di thread pool; jika client memutus koneksi, request dibatalkan.
+
+KEY_CONCURRENCY = int(os.environ.get("PAKAR_API_KEY_CONCURRENCY", "4"))
+QUEUE_TIMEOUT = float(os.environ.get("PAKAR_API_QUEUE_TIMEOUT", "30"))
+MAX_UPLOAD_BYTES = int(os.environ.get("PAKAR_API_MAX_UPLOAD_MB", "10")) * 1024 * 1024
+
+if os.environ.get("PAKAR_FAKE_LLM"):
+    from fake_llm import FakeChatModel
+    from llm_pool import get_llm_pool
+    # Model pengganti: cache hasil terpisah dari produksi (key cache juga membawa identitas factory)
+    os.environ.setdefault("PAKAR_CACHE_DIR", ".pakar_cache_fake")
+    get_llm_pool().set_factory(functools.partial(
+        FakeChatModel,
+        latency_s=float(os.environ.get("PAKAR_FAKE_LATENCY_MS", "0")) / 1000,
+        tokens_per_s=float(os.environ.get("PAKAR_FAKE_TOKENS_PER_S", "0")),
+    ))
+
+
+# --- Skema request (respons memakai model Pydantic yang sama dengan UI) ---
+class ChatTurn(BaseModel):
+    role: Literal["user", "assistant"]
+    content: str
+
+class ChatRequest(BaseModel):
+    query: str
+    profile: ResumeData
+    career: Optional[CareerAnalysis] = None
+    history: List[ChatTurn] = Field(default_factory=list)
+    stream: bool = True
+
+class QuestionsRequest(BaseModel):
+    job_title: str
+    n: int = Field(default=1, ge=1, le=20)
+    difficulty: str = core.DEFAULT_DIFFICULTY
+    session_id: Optional[str] = None
+
+class EvaluateRequest(BaseModel):
+    question: str
+    answer: str
+    job_title: str
+
+
+class MemoryFile:
+    """Adapter upload di memori dengan antarmuka yang dipakai `load_and_read_file` (name & getbuffer)."""
+
+    def __init__(self, name, data):
+        self.name = name
+        self._data = data
+
+    def getbuffer(self):
+        return memoryview(self._data)
+
+    def getvalue(self):
+        return self._data
+
+
+class KeyLimiter:
+    """Batas request bersamaan per API key (key disimpan sebagai hash)."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, api_key):
+        key_id = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            return self._semaphores.setdefault(key_id, asyncio.Semaphore(self.limit))
+
+    async def acquire(self, api_key, timeout=QUEUE_TIMEOUT):
+        semaphore = self._semaphore(api_key)
+        try: await asyncio.wait_for(semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(429, f"Terlalu banyak request bersamaan untuk API key ini (maks {self.limit}).")
+        return semaphore
+
+    def in_flight(self):
+        with self._lock:
+            return {k: self.limit - s._value for k, s in self._semaphores.items() if s._value < self.limit}
+
+
+limiter = KeyLimiter(KEY_CONCURRENCY)
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class LimitedStreamingResponse(StreamingResponse):
+    """StreamingResponse yang memanggil `on_close` sekali saat respons selesai, gagal, atau client
+    putus — termasuk jika body tidak pernah diiterasi (slot limiter tidak boleh bocor)."""
+
+    def __init__(self, content, on_close, **kwargs):
+        super().__init__(content, **kwargs)
+        self._on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try: await super().__call__(scope, receive, send)
+        finally: self._on_close()
+
+
+def _api_key(request):
+    key = request.headers.get("x-gemini-key") or os.environ.get("GEMINI_API_KEY")
+    if not key: raise HTTPException(401, "Header X-Gemini-Key wajib diisi.")
+    return key
+
+
+def _with_session(session_id, fn, *args):
+    set_session(session_id)
+    return fn(*args)
+
+
+async def run_blocking(request, fn, *args):
+    """Jalankan fungsi blocking di thread; berhenti menunggu jika client memutus koneksi.
+
+    Thread yang sudah berjalan tidak bisa dihentikan paksa: panggilan LLM-nya selesai di
+    background dan hasilnya dibuang, tapi slot limiter langsung dibebaskan.
+    """
+    result = {}
+    session_id = request.headers.get("x-session-id")
+
+    async def work():
+        result["value"] = await anyio.to_thread.run_sync(
+            functools.partial(_with_session, session_id, fn, *args), abandon_on_cancel=True)
+        tg.cancel_scope.cancel()
+
+    async def watch():
+        while not await request.is_disconnected(): await anyio.sleep(0.2)
+        tg.cancel_scope.cancel()
+
+    try:
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(work)
+            tg.start_soon(watch)
+    except BaseExceptionGroup as group:
+        # Hanya `work` yang bisa gagal: teruskan exception aslinya (dipetakan ke HTTP di `_limited`)
+        raise group.exceptions[0] from None
+    if "value" not in result: raise ClientDisconnected()
+    return result["value"]
+
+
+async def _json_body(request, model):
+    try: return model(**await request.json())
+    except (ValidationError, ValueError, TypeError) as e:
+        raise HTTPException(422, str(e))
+
+
+def _http_error(exc):
+    """Exception dari pipeline -> HTTPException: file rusak 422, kegagalan LLM/upstream 502."""
+    if isinstance(exc, DocumentError): return HTTPException(422, str(exc))
+    return HTTPException(502, f"{type(exc).__name__}: {exc}")
+
+
+def _limited(handler):
+    """Terapkan batas per key & ubah pembatalan menjadi respons 499 (client closed request)."""
+    @functools.wraps(handler)
+    async def wrapper(request):
+        api_key = _api_key(request)
+        semaphore = await limiter.acquire(api_key)
+        try: return await handler(request, api_key)
+        except ClientDisconnected: return _cancelled()
+        except HTTPException: raise
+        except Exception as e: raise _http_error(e) from e
+        finally: semaphore.release()
+    return wrapper
+
+
+def _cancelled():
+    return JSONResponse({"detail": "Dibatalkan oleh client."}, status_code=499)
+
+
+# --- Endpoint ---
+async def health(request):
+    return JSONResponse({"status": "ok", "in_flight": limiter.in_flight(), "llm": get_scheduler().stats(), "routing": get_router().stats()})
+
+
+def _too_large():
+    return HTTPException(413, f"File terlalu besar (maks {MAX_UPLOAD_BYTES // (1024 * 1024)} MB).")
+
+
+async def _read_upload(request):
+    # max_part_size Starlette hanya berlaku untuk field non-file: batas ukuran dicek sendiri,
+    # dari Content-Length sebelum form di-parse dan dari jumlah byte file yang benar-benar dibaca
+    try: declared = int(request.headers.get("content-length", "0"))
+    except ValueError: raise HTTPException(400, "Header Content-Length tidak valid.")
+    if declared > MAX_UPLOAD_BYTES: raise _too_large()
+    form = await request.form(max_part_size=MAX_UPLOAD_BYTES)
+    upload = form.get("file")
+    if upload is None or not hasattr(upload, "read"): raise HTTPException(422, "Field multipart 'file' wajib diisi.")
+    if core.get_loader(upload.filename or "") is None:
+        raise HTTPException(415, f"Format tidak didukung. Gunakan: {', '.join(core.supported_extensions())}")
+    data = await upload.read(MAX_UPLOAD_BYTES + 1)
+    if len(data) > MAX_UPLOAD_BYTES: raise _too_large()
+    return MemoryFile(upload.filename, data)
+
+
+@_limited
+async def parse_cv(request, api_key):
+    """Upload CV -> ResumeData (tanpa analisis karir)."""
+    upload = await _read_upload(request)
+
+    def parse():
+        text = core.load_and_read_file(upload)
+        return core.parse_resume_with_llm(text, api_key) if text else None
+
+    resume = await run_blocking(request, parse)
+    if resume is None: raise HTTPException(422, "Gagal parsing CV.")
+    return JSONResponse({"resume": resume.dict()})
+
+
+@_limited
+async def analyze_cv(request, api_key):
+    """Upload CV -> ResumeData + CareerAnalysis (memakai cache hasil yang sama dengan UI).
+
+    ?mode=fused | two_step memilih pipeline (default PAKAR_FUSED_PIPELINE).
+    """
+    upload = await _read_upload(request)
+    fused = {"fused": True, "two_step": False}.get(request.query_params.get("mode"))
+    resume, career, from_cache = await run_blocking(request, core.analyze_cv_file, upload, api_key, None, fused)
+    if resume is None: raise HTTPException(422, "Gagal parsing CV.")
+    return JSONResponse({"resume": resume.dict(), "career": career.dict() if career else None,
+                         "from_cache": from_cache, "cv_hash": core.content_hash(upload.getvalue())})
+
+
+@_limited
+async def career(request, api_key):
+    profile = await _json_body(request, ResumeData)
+    narrative = request.query_params.get("narrative", "1") not in ("0", "false")
+    advice = await run_blocking(request, core.analyze_career_path, profile.dict(), api_key, narrative)
+    if advice is None: raise HTTPException(502, "Gagal analisis karir.")
+    return JSONResponse(advice.dict())
+
+
+def _chat_inputs(body):
+    history = [(HumanMessage if t.role == "user" else AIMessage)(content=t.content) for t in body.history]
+    data = body.profile.dict()
+    advice = body.career.dict() if body.career else {"rekomendasi": [], "analisis_gap": "-"}
+    # API stateless: giliran lama dipotong ke transkrip ringkas tanpa panggilan LLM tambahan
+    memory = ChatMemory(summarize_fn=None)
+    context, recent, _ = core.prepare_agent_turn(memory, history, body.query, data, advice)
+    return context, recent
+
+
+async def chat(request):
+    api_key = _api_key(request)
+    body = await _json_body(request, ChatRequest)
+    context, recent = _chat_inputs(body)
+    semaphore = await limiter.acquire(api_key)
+    if not body.stream:
+        try:
+            answer = await run_blocking(request, core.get_agent_response, body.query, recent, context, api_key)
+            return JSONResponse({"answer": answer})
+        except ClientDisconnected: return _cancelled()
+        except HTTPException: raise
+        except Exception as e: raise _http_error(e) from e
+        finally: semaphore.release()
+
+    cancel = threading.Event()
+    session_id = request.headers.get("x-session-id")
+
+    def close():
+        cancel.set()  # client putus / selesai -> agent berhenti di token berikutnya
+        semaphore.release()
+
+    async def events():
+        # NDJSON: satu event per baris, {"event": "token" | "tool_start" | ... | "final", "data": ...}
+        try:
+            set_session(session_id)
+            stream = core.stream_agent_response(body.query, recent, context, api_key, cancel=cancel)
+            while True:
+                item = await anyio.to_thread.run_sync(next, stream, None, abandon_on_cancel=True)
+                if item is None: break
+                event, value = item
+                yield json.dumps({"event": event, "data": value}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "error", "data": f"{type(e).__name__}: {e}"}) + "\n"
+        finally:
+            cancel.set()
+
+    try: return LimitedStreamingResponse(events(), on_close=close, media_type="application/x-ndjson")
+    except BaseException:
+        close()
+        raise
+
+
+@_limited
+async def interview_questions(request, api_key):
+    body = await _json_body(request, QuestionsRequest)
+    if body.difficulty not in DIFFICULTIES: raise HTTPException(422, f"difficulty harus salah satu dari {DIFFICULTIES}")
+    bank = get_question_bank(generate_fn=core.generate_interview_questions)
+    session_id = body.session_id or request.headers.get("x-session-id")
+    # Tanpa session id riwayat soal hanya berlaku di request ini (tidak dibagi antar client)
+    bank_session = session_id or f"api:{uuid.uuid4().hex}"
+
+    def take():
+        try:
+            questions = [bank.next(bank_session, body.job_title, body.difficulty, api_key) for _ in range(body.n)]
+        finally:
+            if not session_id: bank.reset_session(bank_session)
+        return [q for q in questions if q]
+
+    questions = await run_blocking(request, take)
+    if not questions: raise HTTPException(502, "Gagal membuat soal interview.")
+    return JSONResponse({"questions": questions})
+
+
+@_limited
+async def interview_evaluate(request, api_key):
+    body = await _json_body(request, EvaluateRequest)
+    feedback = await run_blocking(request, core.evaluate_interview_answer, body.question, body.answer, body.job_title, api_key)
+    if feedback is None: raise HTTPException(502, "Gagal melakukan penilaian.")
+    return JSONResponse(feedback.dict())
+
+
+async def http_error(request, exc):
+    return JSONResponse({"detail": exc.detail}, status_code=exc.status_code)
+
+
+api = Starlette(
+    routes=[
+        Route("/health", health),
+        Route("/v1/cv/parse", parse_cv, methods=["POST"]),
+        Route("/v1/cv/analyze", analyze_cv, methods=["POST"]),
+        Route("/v1/career", career, methods=["POST"]),
+        Route("/v1/chat", chat, methods=["POST"]),
+        Route("/v1/interview/questions", interview_questions, methods=["POST"]),
+        Route("/v1/interview/evaluate", interview_evaluate, methods=["POST"]),
+    ],
+    exception_handlers={HTTPException: http_error},
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(api, host=os.environ.get("PAKAR_API_HOST", "127.0.0.1"), port=int(os.environ.get("PAKAR_API_PORT", "8080")))
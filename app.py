@@ -1,23 +1,76 @@
 import streamlit as st
 import os
 import json
-import tempfile
-from typing import List
+import time
+import queue
+import threading
+import uuid
+import functools
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ThreadPoolExecutor
 
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.output_parsers import PydanticOutputParser
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
-from langchain_google_genai import ChatGoogleGenerativeAI
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain.agents import tool, AgentExecutor, create_tool_calling_agent
-from pydantic import BaseModel, Field
+
+from cache import cache_key, content_hash, get_result_cache
+from chat_memory import ChatMemory, build_profile_digest, estimate_tokens, messages_tokens, transcript
+from compaction import compact_cv
+from extraction import DEFAULT_TOKEN_BUDGET, extract_document, get_loader, supported_extensions
+from llm_pool import get_llm, get_llm_pool
+from llm_scheduler import get_scheduler, llm_lane
+from matching import get_matcher
+from model_router import get_router
+from prefetch import Prefetcher
+from question_bank import DIFFICULTIES, get_question_bank
+from semantic_cache import get_semantic_cache, scope_key
+from session_store import get_session_store, pack
+from structured_output import invoke_structured, parse_model
+from telemetry import (
+    get_trace_log, record_event, set_session, submit_with_context, tool_trace_handler, trace_stage, traced,
+)
+from prompts import (
+    RESUME_PARSER, RESUME_PROMPT, FUSED_PROMPT, FUSED_PROFILE_MARKER, FUSED_ANALYSIS_MARKER, CAREER_PARSER, CAREER_PROMPT, CAREER_NARRATIVE_PARSER, CAREER_NARRATIVE_PROMPT,
+    INTERVIEW_FEEDBACK_PARSER, INTERVIEW_FEEDBACK_PROMPT, INTERVIEW_QUESTION_PROMPT,
+    QUESTION_SET_PARSER, QUESTION_SET_PROMPT,
+    STUDY_PLAN_PROMPT, COVER_LETTER_PROMPT, LINKEDIN_PROMPT, AGENT_PROMPT, CHAT_SUMMARY_PROMPT,
+    STRUCTURED_REASK_PROMPT,
+)
 
 # ==========================================
 # 1. KONFIGURASI & CSS
 # ==========================================
-st.set_page_config(page_title="PAKAR - AI Career", page_icon="🎓")
+LLM_MODEL = "gemini-2.5-flash"
+
+# Client LLM diambil dari pool global (dipakai ulang antar panggilan & rerun)
+def create_llm(temperature, api_key, model=LLM_MODEL):
+    return get_llm(model, temperature, api_key)
+
+# Model per tugas dipilih router (tier + anggaran latensi/biaya, lihat model_router.py)
+def route_llm(task, temperature, api_key, prompt_text=""):
+    """Return (tier, tokens_estimasi, client) untuk satu panggilan `task`."""
+    router = get_router()
+    tokens = estimate_tokens(prompt_text)
+    tier = router.select(task, tokens)
+    return tier, tokens, create_llm(temperature, api_key, model=router.model(tier))
+
+def invoke_routed(task, temperature, api_key, prompt, inputs, parser):
+    """invoke_structured lewat router. Jika tier fallback gagal parse, diulang sekali di tier utama."""
+    router = get_router()
+    tier, tokens, llm = route_llm(task, temperature, api_key, " ".join(str(v) for v in inputs.values()))
+    with router.track(task, tier, tokens) as signals:
+        result = invoke_structured(llm, prompt, inputs, parser)
+        signals["parsed"] = result is not None
+    primary = router.primary(task)
+    if result is None and tier != primary:
+        with router.track(task, primary, tokens, escalated=True) as signals:
+            result = invoke_structured(create_llm(temperature, api_key, model=router.model(primary)), prompt, inputs, parser)
+            signals["parsed"] = result is not None
+    return result
 
-st.markdown("""
+APP_CSS = """
 <style>
     .stApp {background-color: #0e1117;}
     
@@ -128,85 +181,284 @@ st.markdown("""
         background-color: #30363d;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+def setup_page():
+    st.set_page_config(page_title="PAKAR - AI Career", page_icon="🎓")
+    st.markdown(APP_CSS, unsafe_allow_html=True)
 
 # ==========================================
 # 2. DEFINISI DATA (PYDANTIC MODELS)
 # ==========================================
-class ResumeData(BaseModel):
-    nama_kandidat: str = Field(description="Nama lengkap kandidat.")
-    pendidikan_tertinggi: str = Field(description="Pendidikan tertinggi.")
-    skills_utama: list[str] = Field(description="Daftar 5-10 skill teknis.")
-    ringkasan_cv: str = Field(description="Ringkasan eksekutif singkat tentang profil kandidat (2-3 kalimat).")
-
-class JobRecommendation(BaseModel):
-    judul_pekerjaan: str = Field(description="Posisi pekerjaan.")
-    skor_kecocokan: str = Field(description="Persentase 0-100%.")
-    alasan: str = Field(description="Alasan spesifik kenapa cocok (maks 2 kalimat).")
-
-class CareerAnalysis(BaseModel):
-    rekomendasi: List[JobRecommendation] = Field(description="Daftar 3 rekomendasi pekerjaan.")
-    analisis_gap: str = Field(description="Saran pengembangan skill (gap analysis) yang konkret.")
-
-class InterviewFeedback(BaseModel):
-    skor: int = Field(description="Skor jawaban user (0-100).")
-    feedback_positif: str = Field(description="Apa yang sudah bagus dari jawaban user.")
-    feedback_negatif: str = Field(description="Apa yang perlu diperbaiki/kurang.")
-    jawaban_saran: str = Field(description="Contoh jawaban ideal/sempurna untuk pertanyaan tersebut.")
+from models import ResumeData, JobRecommendation, CareerAnalysis
 
 # ==========================================
 # 3. HELPER FUNCTIONS
 # ==========================================
-def load_and_read_file(uploaded_file):
-    tmp = None
-    try:
-        tmp = tempfile.NamedTemporaryFile(delete=False)
-        tmp.write(uploaded_file.getbuffer())
-        tmp.close()
-        if uploaded_file.name.endswith('.pdf'): loader = PyPDFLoader(tmp.name)
-        elif uploaded_file.name.endswith('.txt'): loader = TextLoader(tmp.name)
-        else: return None
-        docs = loader.load()
-        return " ".join([doc.page_content for doc in docs])
-    finally:
-        if tmp and os.path.exists(tmp.name): os.remove(tmp.name)
-
-def clean_and_parse_json(content, parser_class):
-    try: return parser_class.parse(content)
-    except:
-        content = content.replace("json", "").replace("```", "").strip()
-        start, end = content.find("{"), content.rfind("}")
-        if start != -1 and end != -1:
-            try: return parser_class.pydantic_object(**json.loads(content[start:end+1]))
-            except: return None
-        return None
+# Batas token teks CV yang dikirim ke parser resume (setelah compaction)
+RESUME_INPUT_TOKEN_BUDGET = int(os.environ.get("PAKAR_RESUME_TOKEN_BUDGET", "4000"))
+
+def load_and_read_file(uploaded_file, token_budget=DEFAULT_TOKEN_BUDGET, compact=True):
+    # Dibaca langsung dari buffer upload (tanpa file sementara); waktu per halaman dicatat ke telemetry
+    if get_loader(uploaded_file.name) is None: return None
+    result = extract_document(uploaded_file.name, uploaded_file.getbuffer(), token_budget)
+    for page in result.pages:
+        record_event("extract_page", file=uploaded_file.name, page=page.page, tokens=page.tokens, ms=page.ms)
+    record_event("extract", file=uploaded_file.name, pages=len(result.pages), total_pages=result.total_pages,
+                 truncated=result.truncated, ms=result.ms)
+    if not compact: return result.text
+    # Compaction sebelum LLM: header/footer berulang, kontak & referensi dibuang, bagian diprioritaskan
+    compacted = compact_cv([page.text for page in result.pages], RESUME_INPUT_TOKEN_BUDGET)
+    record_event("compact", file=uploaded_file.name, tokens_before=compacted.tokens_before,
+                 tokens_after=compacted.tokens_after, truncated_sections=compacted.truncated_sections)
+    return compacted.text
 
 # ==========================================
 # 4. AI TOOLS & AGENT TOOLS (CORE LOGIC)
 # ==========================================
 
+# Parameter yang ikut menentukan key cache (ubah versi prompt jika prompt diubah)
+RESUME_TEMPERATURE = 0
+CAREER_TEMPERATURE = 0.2
+RESUME_PROMPT_VERSION = "resume-v3"
+CAREER_PROMPT_VERSION = "career-v3"
+FUSED_PROMPT_VERSION = "fused-v2"
+# Pipeline CV fused (profil + analisis dalam satu panggilan) masih opt-in: PAKAR_FUSED_PIPELINE=1.
+# Benchmark offline (10 CV, median 5 run, termasuk re-ask/fallback): profil tampil ~165 vs ~190 ms, tapi
+# total p50 setara (~400 vs ~390 ms) dan hanya ~47% posisi rekomendasi sama dengan jalur dua langkah
+# (posisi dipilih LLM, bukan matcher lokal) -> belum cukup alasan untuk menjadikannya default.
+FUSED_PIPELINE = os.environ.get("PAKAR_FUSED_PIPELINE", "0") not in ("0", "false", "")
+
 # Helper: Resume Parser
+@traced("parse_resume_with_llm")
 def parse_resume_with_llm(text, api_key):
-    parser = PydanticOutputParser(pydantic_object=ResumeData)
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", api_key=api_key, temperature=0)
-    prompt = ChatPromptTemplate.from_template(
-        "Extract resume data to JSON:\n{format_instructions}\nResume:\n{resume_text}"
-    ).partial(format_instructions=parser.get_format_instructions())
-    res = (prompt | llm).invoke({"resume_text": text})
-    return clean_and_parse_json(res.content, parser)
+    return invoke_routed("extract", RESUME_TEMPERATURE, api_key, RESUME_PROMPT, {"resume_text": text}, RESUME_PARSER)
 
 # Helper: Career Analyzer
-def analyze_career_path(data, api_key):
-    parser = PydanticOutputParser(pydantic_object=CareerAnalysis)
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", api_key=api_key, temperature=0.2)
+# Posisi & skor dihitung matcher lokal (instan, deterministik); LLM hanya menulis alasan & gap.
+def format_matches(matches):
+    return "\n".join(
+        f"{i}. {m.title} ({m.score}%) - sudah dimiliki: {', '.join(m.matched) or '-'}; belum: {', '.join(m.missing[:5]) or '-'}"
+        for i, m in enumerate(matches, start=1)
+    )
+
+def local_career_analysis(matches):
+    """CareerAnalysis dari hasil matcher saja (tanpa LLM): alasan & gap berbasis template."""
+    recs = []
+    for m in matches:
+        alasan = f"Sudah menguasai {', '.join(m.matched[:3])}." if m.matched else "Skill inti posisi ini belum terlihat di CV."
+        if m.missing: alasan += f" Perkuat {', '.join(m.missing[:2])}."
+        recs.append(JobRecommendation(judul_pekerjaan=m.title, skor_kecocokan=f"{m.score}%", alasan=alasan,
+                                      skor=m.score, skill_cocok=m.matched, skill_kurang=m.missing))
+    gaps = list(dict.fromkeys(s for m in matches for s in m.missing[:3]))[:5]
+    gap = f"Prioritaskan mempelajari {', '.join(gaps)} untuk memperluas peluang di posisi-posisi di atas." if gaps else "Skill Anda sudah memenuhi kebutuhan inti posisi-posisi di atas."
+    return CareerAnalysis(rekomendasi=recs, analisis_gap=gap)
+
+def _percent(text):
+    digits = "".join(ch for ch in str(text) if ch.isdigit())
+    return max(0, min(100, int(digits))) if digits else 0
+
+@traced("analyze_career_path")
+def analyze_career_path(data, api_key, narrative=True):
     profile = f"Nama: {data['nama_kandidat']}, Skill: {data['skills_utama']}, Info: {data['ringkasan_cv']}"
-    prompt = ChatPromptTemplate.from_template(
-        "Based on this profile, suggest 3 specific job titles and provide a gap analysis in JSON format:\n{profile}\n{format_instructions}"
-    ).partial(format_instructions=parser.get_format_instructions())
-    res = (prompt | llm).invoke({"profile": profile})
-    return clean_and_parse_json(res.content, parser)
+    matches = get_matcher().match(data['skills_utama'], top_k=3)
+    if not matches or matches[0].score == 0:
+        # Tidak ada skill yang dikenali katalog -> LLM memilih posisi sendiri (skor dari teks persentase)
+        advice = invoke_routed("analyze", CAREER_TEMPERATURE, api_key, CAREER_PROMPT, {"profile": profile}, CAREER_PARSER)
+        if advice:
+            for rec in advice.rekomendasi: rec.skor = _percent(rec.skor_kecocokan)
+        return advice
+    advice = local_career_analysis(matches)
+    if not narrative: return advice
+    story = invoke_routed("analyze", CAREER_TEMPERATURE, api_key, CAREER_NARRATIVE_PROMPT, {"profile": profile, "matches": format_matches(matches)}, CAREER_NARRATIVE_PARSER)
+    if story:
+        for rec, alasan in zip(advice.rekomendasi, story.alasan):
+            if alasan.strip(): rec.alasan = alasan.strip()
+        if story.analisis_gap.strip(): advice.analisis_gap = story.analisis_gap.strip()
+    return advice
+
+# Helper: Pipeline fused (1 panggilan streaming -> profil lalu analisis karir)
+def score_recommendations(advice, skills):
+    """Skor & skill cocok/kurang dari matcher lokal untuk posisi pilihan LLM (posisi di luar katalog: skor dari teks)."""
+    matcher = get_matcher()
+    by_title = {m.title.lower(): m for m in matcher.match(skills, top_k=len(matcher.titles))}
+    for rec in advice.rekomendasi:
+        m = by_title.get(rec.judul_pekerjaan.strip().lower())
+        if m and m.score: rec.skor, rec.skill_cocok, rec.skill_kurang = m.score, m.matched, m.missing
+        else: rec.skor = _percent(rec.skor_kecocokan)
+        rec.skor_kecocokan = f"{rec.skor}%"
+    advice.rekomendasi = sorted(advice.rekomendasi, key=lambda r: -r.skor)[:3]
+    return advice
+
+def split_fused_output(text):
+    """(teks profil | None, teks analisis | None) dari output fused.
+
+    Penanda hanya dikenali sebagai satu baris utuh; bagian analisis yang belum lengkap dikembalikan
+    apa adanya, bagian yang penandanya belum muncul -> None.
+    """
+    sections, current = {}, None
+    for line in text.splitlines():
+        if line.strip() in (FUSED_PROFILE_MARKER, FUSED_ANALYSIS_MARKER):
+            current = line.strip()
+            sections[current] = []
+        elif current: sections[current].append(line)
+    return tuple("\n".join(sections[m]) if m in sections else None for m in (FUSED_PROFILE_MARKER, FUSED_ANALYSIS_MARKER))
+
+@traced("analyze_profile_fused")
+def fused_analysis(text, api_key, on_profile=None):
+    """Return (ResumeData | None, CareerAnalysis | None) dari satu panggilan LLM.
+
+    Output di-stream sebagai teks (bukan tool call, agar bisa dibaca sebagian): begitu penanda bagian
+    analisis muncul, bagian profil sudah lengkap -> ResumeData divalidasi dan `on_profile` dipanggil
+    selagi rekomendasi masih ditulis. Profil valid tapi analisis rusak (mis. terpotong) -> bagian
+    analisis ditanya ulang SEKALI, seperti invoke_structured. Analisis tetap None -> pemanggil memakai
+    jalur dua langkah (profil yang sudah valid tetap dipakai).
+    """
+    router = get_router()
+    messages = FUSED_PROMPT.format_messages(resume_text=text, catalog=", ".join(get_matcher().titles))
+    tier, tokens, llm = route_llm("fused", RESUME_TEMPERATURE, api_key, text)
+    buffer, profile, advice, profile_checked = "", None, None, False
+    try:
+        with router.track("fused", tier, tokens) as signals:
+            for chunk in llm.stream(messages):
+                buffer += chunk.content or ""
+                if profile_checked: continue
+                profile_text, analysis_text = split_fused_output(buffer)
+                if analysis_text is not None:
+                    # Bagian profil sudah tertutup -> validasi sekali, tampilkan tanpa menunggu analisis
+                    profile_checked = True
+                    profile = parse_model(profile_text or "", ResumeData)
+                    if profile is not None and on_profile: on_profile(profile)
+            profile_text, analysis_text = split_fused_output(buffer)
+            if profile is None and profile_text is not None:
+                profile = parse_model(profile_text, ResumeData)
+                if profile is not None and on_profile: on_profile(profile)
+            advice = parse_model(analysis_text, CareerAnalysis) if analysis_text is not None else None
+            reasked = profile is not None and (advice is None or not advice.rekomendasi)
+            if reasked:
+                followup = STRUCTURED_REASK_PROMPT.format(schema="CareerAnalysis", error="bagian analisis tidak lengkap atau tidak sesuai skema",
+                                                          format_instructions=CAREER_PARSER.get_format_instructions())
+                reply = llm.invoke(messages + [AIMessage(content=buffer[:4000]), HumanMessage(content=followup)]).content or ""
+                # Model bisa membalas JSON saja atau mengulang output berpenanda
+                analysis_text = split_fused_output(reply)[1]
+                advice = parse_model(reply if analysis_text is None else analysis_text, CareerAnalysis)
+            signals["parsed"] = profile is not None and advice is not None and bool(advice.rekomendasi)
+    except Exception as e:
+        record_event("fused_fallback", reason=f"{type(e).__name__}: {e}"[:200])
+        return profile, None
+    record_event("parse", schema="ResumeData+CareerAnalysis", success=signals["parsed"], mode="stream", reasked=reasked)
+    if not signals["parsed"]:
+        record_event("fused_fallback", reason="parse", profile=profile is not None)
+        return profile, None
+    return profile, score_recommendations(advice, profile.skills_utama)
+
+# Helper: Pipeline CV lengkap dengan cache (upload yang sama -> tanpa panggilan LLM)
+def cache_model(task):
+    """Model untuk key cache: model tier utama tugas, plus identitas factory pool jika bukan Gemini (mis. --fake)."""
+    return get_llm_pool().cache_identity(get_router().primary_model(task))
+
+def pipeline_cache_keys(content, fused):
+    matcher_version = get_matcher().version
+    if fused:
+        model = cache_model("fused")
+        return (cache_key(content, "resume", model, RESUME_TEMPERATURE, FUSED_PROMPT_VERSION),
+                cache_key(content, "career", model, RESUME_TEMPERATURE, f"{FUSED_PROMPT_VERSION}+{matcher_version}"))
+    return (cache_key(content, "resume", cache_model("extract"), RESUME_TEMPERATURE, RESUME_PROMPT_VERSION),
+            cache_key(content, "career", cache_model("analyze"), CAREER_TEMPERATURE,
+                      f"{RESUME_PROMPT_VERSION}+{CAREER_PROMPT_VERSION}+{matcher_version}"))
+
+@traced("analyze_cv_file")
+def analyze_cv_file(uploaded_file, api_key, cache=None, fused=None, on_profile=None):
+    """Return (ResumeData | None, CareerAnalysis | None, from_cache).
+
+    fused=None mengikuti PAKAR_FUSED_PIPELINE. `on_profile(ResumeData)` dipanggil begitu profil
+    tersedia (sebelum analisis karir selesai) agar UI bisa menampilkannya lebih dulu.
+    """
+    fused = FUSED_PIPELINE if fused is None else fused
+    cache = cache or get_result_cache()
+    content = bytes(uploaded_file.getbuffer())
+    resume_key, career_key = pipeline_cache_keys(content, fused)
+
+    p_data = cache.get(resume_key, ResumeData)
+    record_event("cache", key="resume", hit=p_data is not None)
+    c_advice = cache.get(career_key, CareerAnalysis) if p_data else None
+    if p_data: record_event("cache", key="career", hit=c_advice is not None)
+    if p_data and c_advice: return p_data, c_advice, True
+
+    if not p_data:
+        text = load_and_read_file(uploaded_file)
+        if not text: return None, None, False
+        if fused:
+            p_data, c_advice = fused_analysis(text, api_key, on_profile)
+            if p_data: cache.put(resume_key, p_data)
+            if c_advice:
+                cache.put(career_key, c_advice)
+                return p_data, c_advice, False
+        if not p_data:
+            p_data = parse_resume_with_llm(text, api_key)
+            if not p_data: return None, None, False
+            cache.put(resume_key, p_data)
+            if on_profile: on_profile(p_data)
+    elif on_profile: on_profile(p_data)
+
+    c_advice = analyze_career_path(p_data.dict(), api_key)
+    if c_advice: cache.put(career_key, c_advice)
+    return p_data, c_advice, False
+
+# Helper: panggil LLM dalam mode streaming (token diteruskan ke callback yang aktif)
+def stream_llm_text(llm, prompt):
+    return "".join(chunk.content for chunk in llm.stream(prompt))
+
+# Prompt per tool (dipakai oleh @tool agent maupun fast path tombol Tindakan Cepat)
+TOOL_PROMPTS = {
+    "tool_study_plan": (STUDY_PLAN_PROMPT, "skill_name", "Gagal membuat study plan"),
+    "tool_cover_letter": (COVER_LETTER_PROMPT, "job_title", "Gagal membuat surat lamaran"),
+    "tool_linkedin_optimization": (LINKEDIN_PROMPT, "role_target", "Gagal optimasi LinkedIn"),
+}
+
+TOOL_ERROR_PREFIXES = tuple(label for _, _, label in TOOL_PROMPTS.values()) + ("Error:",)
+
+def build_tool_prompt(tool_name, argument, profile_context=""):
+    template, arg_name, _ = TOOL_PROMPTS[tool_name]
+    prompt = template.format(**{arg_name: argument})
+    if profile_context:
+        prompt += f"\n\nSesuaikan dengan profil kandidat berikut:\n{profile_context}"
+    return prompt
+
+# SEMANTIC CACHE: output tool & jawaban agent untuk permintaan yang mirip dipakai ulang tanpa LLM.
+# Scope exact = model + profil (+ riwayat chat untuk agent); kemiripan dihitung atas argumen / pertanyaan.
+def semantic_lookup(namespace, scope, text):
+    hit = get_semantic_cache().get(namespace, scope, text)
+    record_event("semantic_cache", namespace=namespace, hit=hit is not None, similarity=round(hit[1], 3) if hit else None)
+    return hit[0] if hit else None
+
+def agent_cache_scope(history, profile_context):
+    return scope_key(cache_model("chat"), profile_context, *(f"{m.type}:{m.content}" for m in history))
+
+def tool_failed(steps):
+    return any(isinstance(obs, str) and obs.startswith(TOOL_ERROR_PREFIXES) for _, obs in steps)
+
+def run_tool(tool_name, argument):
+    """Body bersama ketiga @tool: semantic cache dulu, lalu satu panggilan LLM (streaming)."""
+    api_key = tool_api_key()
+    if not api_key: return "Error: API Key hilang."
+    scope = scope_key(cache_model("tool"))
+    cached = semantic_lookup(tool_name, scope, argument)
+    if cached is not None: return cached
+    prompt = build_tool_prompt(tool_name, argument)
+    tier, tokens, llm_tool = route_llm("tool", 0.7, api_key, prompt)
+    with trace_stage(tool_name), get_router().track("tool", tier, tokens) as signals:
+        text = stream_llm_text(llm_tool, prompt)
+        signals["ok"] = bool(text.strip())
+    if text.strip(): get_semantic_cache().put(tool_name, scope, argument, text)
+    return text
 
 # DEFINISI 3 TOOLS AGENT (AGENTIC ARCHITECTURE) 
+# API key milik permintaan yang sedang berjalan (UI atau HTTP API); fallback ke env
+_request_api_key = contextvars.ContextVar("pakar_api_key", default=None)
+
+def tool_api_key():
+    return _request_api_key.get() or os.environ.get("GEMINI_API_KEY")
 
 @tool
 def tool_study_plan(skill_name: str):
@@ -215,10 +467,7 @@ def tool_study_plan(skill_name: str):
     Input: Nama skill. Output: Rencana belajar 4 minggu.
     """
     try:
-        api_key = os.environ.get("GEMINI_API_KEY")
-        if not api_key: return "Error: API Key hilang."
-        llm_tool = ChatGoogleGenerativeAI(model="gemini-2.5-flash", api_key=api_key, temperature=0.7)
-        return llm_tool.invoke(f"Buatkan study plan 4 minggu yang ringkas dan padat untuk mempelajari: {skill_name}.").content
+        return run_tool("tool_study_plan", skill_name)
     except Exception as e:
         return f"Gagal membuat study plan: {str(e)}"
 
@@ -229,16 +478,7 @@ def tool_cover_letter(job_title: str):
     Input: Judul pekerjaan. Output: Draft surat lamaran kerja.
     """
     try:
-        api_key = os.environ.get("GEMINI_API_KEY")
-        if not api_key: return "Error: API Key hilang."
-        llm_tool = ChatGoogleGenerativeAI(model="gemini-2.5-flash", api_key=api_key, temperature=0.7)
-        prompt = (
-            f"Buatkan draft Cover Letter (Surat Lamaran Kerja) profesional dalam Bahasa Indonesia "
-            f"untuk posisi: {job_title}. "
-            f"Buatlah surat yang persuasif, menonjolkan semangat belajar, dan siap berkontribusi. "
-            f"Gunakan format [Nama Kandidat], [Perusahaan Tujuan] sebagai placeholder."
-        )
-        return llm_tool.invoke(prompt).content
+        return run_tool("tool_cover_letter", job_title)
     except Exception as e:
         return f"Gagal membuat surat lamaran: {str(e)}"
 
@@ -249,97 +489,827 @@ def tool_linkedin_optimization(role_target: str):
     Input: Target pekerjaan/Role. Output: Saran Headline, About Section, dan Hashtag.
     """
     try:
-        api_key = os.environ.get("GEMINI_API_KEY")
-        if not api_key: return "Error: API Key hilang."
-        llm_tool = ChatGoogleGenerativeAI(model="gemini-2.5-flash", api_key=api_key, temperature=0.7)
-        prompt = (
-            f"Buatkan optimasi profil LinkedIn untuk seseorang yang menargetkan posisi: {role_target}. "
-            f"Berikan output berupa:\n"
-            f"1. 3 Opsi 'Headline' yang profesional dengan kata kunci SEO.\n"
-            f"2. Draft 'About' (Ringkasan Diri) yang engaging (maks 2 paragraf).\n"
-            f"3. 5 Hashtag relevan."
-        )
-        return llm_tool.invoke(prompt).content
+        return run_tool("tool_linkedin_optimization", role_target)
     except Exception as e:
         return f"Gagal optimasi LinkedIn: {str(e)}"
 
+# FAST PATH TINDAKAN CEPAT: tool sudah diketahui, jadi lewati perencanaan & ringkasan agent
+def stream_quick_action(tool_name, argument, profile_context, api_key):
+    """Yield potongan teks output tool secara langsung (1 panggilan LLM, tanpa AgentExecutor)."""
+    scope = scope_key(cache_model("tool"), profile_context)
+    cached = semantic_lookup(tool_name, scope, argument)
+    if cached is not None:
+        yield cached
+        return
+    try:
+        prompt = build_tool_prompt(tool_name, argument, profile_context)
+        tier, tokens, llm_tool = route_llm("tool", 0.7, api_key, prompt)
+        parts = []
+        with trace_stage(tool_name), get_router().track("tool", tier, tokens) as signals:
+            chunks = llm_tool.stream(prompt)
+            for chunk in chunks:
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield chunk.content
+            signals["ok"] = bool(parts)
+        if parts: get_semantic_cache().put(tool_name, scope, argument, "".join(parts))
+    except Exception as e:
+        yield f"{TOOL_PROMPTS[tool_name][2]}: {str(e)}"
+
 # AGENT ORCHESTRATOR 
-def get_agent_response(query, history, profile_context, api_key):
+def build_agent_executor(api_key, model=LLM_MODEL):
     # 1. Setup LLM
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", api_key=api_key, temperature=0.5)
+    llm = create_llm(0.5, api_key, model=model)
     
     # 2. DAFTAR 3 TOOLS
     tools = [tool_study_plan, tool_cover_letter, tool_linkedin_optimization] 
     
-    # 3. System Prompt
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", 
-         "Anda adalah AI Career Coach agent profesional. Tugas utama Anda adalah memberikan saran karir strategis. "
-         "Anda memiliki akses ke 3 tools khusus: 'Study Plan Generator', 'Cover Letter Drafter', dan 'LinkedIn Optimizer'. "
-         "Gunakan tools tersebut JIKA DAN HANYA JIKA user memintanya atau jika konteks percakapan membutuhkannya. "
-         "\n\n"
-         "ATURAN RESPON (HARUS DIPATUHI SETIAP SAAT):\n"
-         "1. Jika pertanyaan terkait karir/skill: Jawablah dengan profesional dan gunakan tools jika perlu.\n"
-         "2. Jika pertanyaan DI LUAR KONTEKS (misal: 'kenapa bumi bulat', 'resep masakan', 'gosip artis', dll): \n"
-         "   - Jawablah pertanyaan tersebut secara ringkas (maksimal 2 kalimat).\n"
-         "   - SETIAP KALI (TANPA KECUALI) Anda menjawab pertanyaan di luar konteks, Anda WAJIB menutup jawaban dengan kalimat transisi untuk mengajak user kembali ke topik karir. \n"
-         "   - JANGAN PERNAH lupa menambahkan kalimat pengingat ini, meskipun user bertanya di luar konteks berkali-kali.\n"
-         "   (Contoh penutup: '...Namun, agar waktu Anda produktif, mari kita kembali bahas strategi karir Anda. Ada update terbaru soal skill yang sedang dipelajari?')\n"
-         "3. Jika user meminta simulasi interview: Arahkan ke Tab 3.\n"
-         "\n"
-         "Informasi Profil User:\n{context_data}"),
-        MessagesPlaceholder(variable_name="chat_history"),
-        ("human", "{input}"),
-        MessagesPlaceholder(variable_name="agent_scratchpad"),
-    ])
-    
-    # 4. Create Agent
-    agent = create_tool_calling_agent(llm, tools, prompt)
-    agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
+    # 3. Create Agent (prompt sudah dikompilasi di prompts.py)
+    agent = create_tool_calling_agent(llm, tools, AGENT_PROMPT)
+    return AgentExecutor(agent=agent, tools=tools, verbose=True, return_intermediate_steps=True)
+
+@traced("get_agent_response")
+def get_agent_response(query, history, profile_context, api_key):
+    scope = agent_cache_scope(history, profile_context)
+    cached = semantic_lookup("agent", scope, query)
+    if cached is not None: return cached
+    router = get_router()
+    tokens = estimate_tokens(profile_context + query) + messages_tokens(history)
+    tier = router.select("chat", tokens)
+    agent_executor = build_agent_executor(api_key, router.model(tier))
     
-    # 5. Run Agent
-    response = agent_executor.invoke({
-        "input": query, 
-        "chat_history": history,
-        "context_data": profile_context
-    })
+    # 4. Run Agent
+    token = _request_api_key.set(api_key)
+    try:
+        with llm_lane("interactive"), router.track("chat", tier, tokens) as signals:
+            response = agent_executor.invoke({
+                "input": query, 
+                "chat_history": history,
+                "context_data": profile_context
+            }, config={"callbacks": [tool_trace_handler()]})
+            signals["ok"] = bool(response["output"]) and not tool_failed(response["intermediate_steps"])
+    finally:
+        _request_api_key.reset(token)
+    if response["output"] and not tool_failed(response["intermediate_steps"]):
+        get_semantic_cache().put("agent", scope, query, response["output"])
     return response["output"]
 
+# PREFETCH SPEKULATIF: siapkan soal interview & output Tindakan Cepat selagi user membaca hasil analisis
+def quick_action_targets(data, advice):
+    """Argumen default tombol Tindakan Cepat: (skill teratas, posisi teratas)."""
+    first_skill = data['skills_utama'][0] if data['skills_utama'] else "Python"
+    target_job = advice['rekomendasi'][0]['judul_pekerjaan'] if advice['rekomendasi'] else "Data Scientist"
+    return first_skill, target_job
+
+def quick_action_text(tool_name, argument, profile_context, api_key):
+    return "".join(stream_quick_action(tool_name, argument, profile_context, api_key))
+
+def start_prefetch(prefetcher, data, advice, api_key):
+    first_skill, target_job = quick_action_targets(data, advice)
+    context = build_profile_digest(data, advice)
+    jobs = [job['judul_pekerjaan'] for job in advice['rekomendasi']]
+    bank = get_question_bank(generate_fn=generate_interview_questions)
+    # Urutan = prioritas: yang paling mungkin diklik lebih dulu
+    if jobs: prefetcher.submit(("questions", jobs[0]), bank.ensure, jobs[0], DEFAULT_DIFFICULTY, api_key)
+    prefetcher.submit(("tool_study_plan", first_skill), quick_action_text, "tool_study_plan", first_skill, context, api_key)
+    prefetcher.submit(("tool_cover_letter", target_job), quick_action_text, "tool_cover_letter", target_job, context, api_key)
+    prefetcher.submit(("tool_linkedin_optimization", target_job), quick_action_text, "tool_linkedin_optimization", target_job, context, api_key)
+    for job in jobs[1:]: prefetcher.submit(("questions", job), bank.ensure, job, DEFAULT_DIFFICULTY, api_key)
+
+# MEMORI PERCAKAPAN: ringkas giliran lama agar ukuran prompt tidak tumbuh linear
+@traced("summarize_chat")
+def summarize_chat(previous_summary, messages, api_key):
+    prompt = CHAT_SUMMARY_PROMPT.format(summary=previous_summary or "-", transcript=transcript(messages))
+    tier, tokens, llm = route_llm("summary", 0, api_key, prompt)
+    with get_router().track("summary", tier, tokens) as signals:
+        summary = llm.invoke(prompt).content.strip()
+        signals["ok"] = bool(summary)
+    return summary
+
+def prepare_agent_turn(memory, history, query, data, advice):
+    """Bangun (context_data, chat_history) berbudget token untuk satu giliran agent.
+
+    Return juga estimasi token prompt vs. prompt lama (history penuh + str(data)) agar penghematan terukur.
+    """
+    summary, recent = memory.window(history)
+    context = build_profile_digest(data, advice)
+    if summary: context += f"\n\nRingkasan percakapan sebelumnya:\n{summary}"
+
+    def prompt_tokens(ctx, msgs):
+        formatted = AGENT_PROMPT.format_messages(context_data=ctx, chat_history=msgs, input=query, agent_scratchpad=[])
+        return messages_tokens(formatted)
+
+    full_context = f"Data Kandidat: {data}\nRekomendasi Sistem: {advice['rekomendasi']}\nGap Analysis: {advice['analisis_gap']}"
+    tokens = {
+        "prompt_tokens": prompt_tokens(context, recent),
+        "unbounded_tokens": prompt_tokens(full_context, history + [HumanMessage(content=query)]),
+        "summary_tokens": estimate_tokens(summary),
+        "recent_messages": len(recent),
+    }
+    return context, recent, tokens
+
+class AgentStreamHandler(BaseCallbackHandler):
+    """Meneruskan token LLM & event tool dari thread agent ke antrian event.
+
+    Jika `cancel` (threading.Event) di-set, token/tool berikutnya menghentikan agent.
+    """
+
+    raise_error = True  # exception pembatalan harus menghentikan run, bukan sekadar dicatat
+
+    def __init__(self, events, cancel=None):
+        self.events = events
+        self.cancel = cancel
+        self.active_tool = None
+        self.tool_streamed = False
+
+    def _check_cancel(self):
+        if self.cancel is not None and self.cancel.is_set(): raise CancelledError("Permintaan dibatalkan oleh client.")
+
+    def on_llm_new_token(self, token, **kwargs):
+        self._check_cancel()
+        if not token: return
+        # Token yang muncul selama tool berjalan berasal dari LLM milik tool tersebut
+        if self.active_tool: self.tool_streamed = True
+        self.events.put(("tool_token" if self.active_tool else "token", token))
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self._check_cancel()
+        self.active_tool = serialized.get("name", "tool")
+        self.tool_streamed = False
+        self.events.put(("tool_start", self.active_tool))
+
+    def on_tool_end(self, output, **kwargs):
+        # Output dari semantic cache tidak lewat LLM -> kirim utuh sebagai satu potongan
+        if self.active_tool and not self.tool_streamed and output: self.events.put(("tool_token", str(output)))
+        self.events.put(("tool_end", self.active_tool))
+        self.active_tool = None
+
+    def on_tool_error(self, error, **kwargs):
+        self.on_tool_end(None)
+
+def stream_agent_response(query, history, profile_context, api_key, cancel=None):
+    """Versi streaming dari get_agent_response.
+
+    Yield tuple (event, value): ("token", teks), ("tool_start", nama_tool), ("tool_token", teks),
+    ("tool_end", nama_tool), lalu terakhir ("final", output_agent).
+    """
+    scope = agent_cache_scope(history, profile_context)
+    with trace_stage("get_agent_response"):
+        cached = semantic_lookup("agent", scope, query)
+    if cached is not None:
+        yield "token", cached
+        yield "final", cached
+        return
+    events = queue.Queue()
+    router = get_router()
+    tokens = estimate_tokens(profile_context + query) + messages_tokens(history)
+    tier = router.select("chat", tokens)
+    agent_executor = build_agent_executor(api_key, router.model(tier))
+
+    def run():
+        _request_api_key.set(api_key)  # context milik thread ini saja
+        try:
+            with trace_stage("get_agent_response"), llm_lane("interactive"), router.track("chat", tier, tokens) as signals:
+                response = agent_executor.invoke(
+                    {"input": query, "chat_history": history, "context_data": profile_context},
+                    config={"callbacks": [AgentStreamHandler(events, cancel), tool_trace_handler()]},
+                )
+                signals["ok"] = bool(response["output"]) and not tool_failed(response["intermediate_steps"])
+            if response["output"] and not tool_failed(response["intermediate_steps"]):
+                get_semantic_cache().put("agent", scope, query, response["output"])
+            events.put(("final", response["output"]))
+        except Exception as e:
+            events.put(("error", e))
+
+    # Thread baru tidak mewarisi contextvars (sesi telemetry) -> jalankan di salinan context
+    threading.Thread(target=contextvars.copy_context().run, args=(run,), daemon=True).start()
+    while True:
+        event, value = events.get()
+        if event == "error": raise value
+        yield event, value
+        if event == "final": return
+
 # MANUAL INTERVIEW FUNCTIONS (TAB 3) 
+@traced("generate_interview_question")
 def generate_interview_question(job_title, api_key):
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", api_key=api_key, temperature=0.8)
-    prompt = f"Buatlah 1 pertanyaan interview yang SULIT, SPESIFIK dan TEKNIS untuk posisi '{job_title}'. Langsung tulis pertanyaannya saja tanpa kalimat pembuka."
-    return llm.invoke(prompt).content
+    prompt = INTERVIEW_QUESTION_PROMPT.format(job_title=job_title)
+    tier, tokens, llm = route_llm("question", 0.8, api_key, prompt)
+    with get_router().track("question", tier, tokens) as signals:
+        question = llm.invoke(prompt).content
+        signals["ok"] = bool(question.strip())
+    return question
+
+# Bank soal: N soal per panggilan terstruktur, dilayani lokal tanpa pengulangan per sesi
+DEFAULT_DIFFICULTY = "Sulit"
 
+@traced("generate_interview_questions")
+def generate_interview_questions(job_title, n, difficulty, api_key):
+    parsed = invoke_routed("question", 0.8, api_key, QUESTION_SET_PROMPT, {"job_title": job_title, "n": n, "difficulty": difficulty}, QUESTION_SET_PARSER)
+    return parsed.pertanyaan if parsed else []
+
+@traced("evaluate_interview_answer")
 def evaluate_interview_answer(question, answer, job_title, api_key):
-    parser = PydanticOutputParser(pydantic_object=InterviewFeedback)
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", api_key=api_key, temperature=0.1)
-    prompt = ChatPromptTemplate.from_template(
-        "Anda adalah Senior Interviewer untuk posisi {job_title}.\n"
-        "Pertanyaan: {question}\n"
-        "Jawaban Kandidat: {answer}\n\n"
-        "Berikan penilaian jujur dan detail dalam format JSON:\n{format_instructions}"
-    ).partial(format_instructions=parser.get_format_instructions())
-    res = (prompt | llm).invoke({"question": question, "answer": answer, "job_title": job_title})
-    return clean_and_parse_json(res.content, parser)
+    return invoke_routed("grade", 0.1, api_key, INTERVIEW_FEEDBACK_PROMPT, {"question": question, "answer": answer, "job_title": job_title}, INTERVIEW_FEEDBACK_PARSER)
+
+# UJIAN LENGKAP (TAB 3): K soal dijawab berurutan lalu dinilai paralel
+EXAM_RUBRIC = [("Sangat Baik", 85), ("Baik", 70), ("Cukup", 50), ("Kurang", 0)]
+
+def grade_exam(questions, answers, job_title, api_key, max_workers=10):
+    """Nilai semua jawaban sekaligus; total waktu ≈ waktu menilai satu jawaban."""
+    def grade(pair):
+        try: return evaluate_interview_answer(pair[0], pair[1], job_title, api_key)
+        except Exception: return None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(questions)))) as pool:
+        futures = [submit_with_context(pool, grade, pair) for pair in zip(questions, answers)]
+        return [f.result() for f in futures]
+
+def summarize_exam(feedbacks):
+    # Skor dari LLM tidak dibatasi skema -> dijepit ke 0-100 sebelum masuk rubrik
+    scores = [min(100, max(0, fb['skor'])) for fb in feedbacks if fb]
+    rubric = {label: 0 for label, _ in EXAM_RUBRIC}
+    for score in scores:
+        rubric[next(label for label, minimum in EXAM_RUBRIC if score >= minimum)] += 1
+    return {
+        "skor_rata_rata": round(sum(scores) / len(scores)) if scores else 0,
+        "skor_tertinggi": max(scores, default=0),
+        "skor_terendah": min(scores, default=0),
+        "dinilai": len(scores),
+        "gagal_dinilai": len(feedbacks) - len(scores),
+        "rubrik": rubric,
+    }
+
+def score_color(score):
+    return "#28a745" if score >= 75 else "#ffc107" if score >= 50 else "#dc3545"
+
+def render_exam_mode(selected_job, difficulty, api_key):
+    exam = st.session_state.exam
+    n_questions = st.number_input("Jumlah Soal:", min_value=2, max_value=10, value=5)
+
+    if st.button("🧪 Mulai Ujian Lengkap", type="primary"):
+        with st.spinner("🤖 AI sedang menyiapkan paket soal..."):
+            bank = get_question_bank(generate_fn=generate_interview_questions)
+            questions = []
+            for _ in range(int(n_questions)):
+                q = bank.next(st.session_state.session_id, selected_job, difficulty, api_key)
+                if not q: break
+                questions.append(q)
+        if questions:
+            exam = st.session_state.exam = {"id": uuid.uuid4().hex[:8], "job": selected_job, "questions": questions, "answers": [""] * len(questions), "current": 0, "feedbacks": None, "summary": None}
+        else:
+            st.error("Gagal menyiapkan soal ujian.")
+
+    if not exam: return
+
+    if exam["feedbacks"] is None:
+        i, total = exam["current"], len(exam["questions"])
+        st.markdown("---")
+        st.progress(i / total, text=f"Soal {i + 1} dari {total}")
+        st.markdown(f"### 🤖 Penguji ({exam['job']}) bertanya:")
+        st.info(f"🗣 *{exam['questions'][i]}*")
+        answer = st.text_area("Jawaban Anda:", value=exam["answers"][i], height=150, key=f"exam_answer_{exam['id']}_{i}",
+                              placeholder="Jawablah selengkap mungkin menggunakan metode STAR (Situation, Task, Action, Result)...")
+
+        col_prev, col_next = st.columns(2)
+        if i > 0 and col_prev.button("⬅ Soal Sebelumnya"):
+            exam["answers"][i] = answer
+            exam["current"] -= 1
+            rerun_fragment()
+        if i < total - 1:
+            if col_next.button("Soal Berikutnya ➡"):
+                exam["answers"][i] = answer
+                exam["current"] += 1
+                rerun_fragment()
+        elif col_next.button("📝 Kumpulkan & Nilai Semua", type="primary"):
+            exam["answers"][i] = answer
+            if not all(a.strip() for a in exam["answers"]):
+                st.warning("Harap isi semua jawaban dulu.")
+            else:
+                with st.spinner(f"👨‍⚖ AI sedang menilai {total} lembar jawaban secara paralel..."):
+                    started = time.perf_counter()
+                    results = grade_exam(exam["questions"], exam["answers"], exam["job"], api_key)
+                    exam["feedbacks"] = [fb.dict() if fb else None for fb in results]
+                    exam["summary"] = summarize_exam(exam["feedbacks"])
+                    exam["summary"]["waktu_penilaian_s"] = round(time.perf_counter() - started, 2)
+                rerun_fragment()
+        return
+
+    # Hasil ujian
+    summary = exam["summary"]
+    st.markdown("---")
+    st.markdown("### 📊 Hasil Ujian Lengkap & Raport")
+    col_score, col_details = st.columns([1, 3])
+    with col_score:
+        st.markdown("Skor Rata-rata:")
+        st.markdown(f"<div class='score-card' style='background-color: {score_color(summary['skor_rata_rata'])}'>{summary['skor_rata_rata']}/100</div>", unsafe_allow_html=True)
+    with col_details:
+        st.markdown(
+            f"Tertinggi **{summary['skor_tertinggi']}** · Terendah **{summary['skor_terendah']}** · "
+            f"Dinilai {summary['dinilai']}/{len(exam['questions'])} soal dalam {summary['waktu_penilaian_s']}s"
+        )
+        st.table({"Rubrik": list(summary["rubrik"].keys()), "Jumlah Soal": list(summary["rubrik"].values())})
+
+    for i, (q, fb) in enumerate(zip(exam["questions"], exam["feedbacks"])):
+        label = f"Soal {i + 1}: {fb['skor']}/100" if fb else f"Soal {i + 1}: gagal dinilai"
+        with st.expander(label):
+            st.markdown(f"🗣 *{q}*")
+            st.markdown(f"**Jawaban Anda:** {exam['answers'][i]}")
+            if fb:
+                st.markdown("✅ *Poin Plus:*"); st.write(fb['feedback_positif'])
+                st.markdown("⚠ *Koreksi:*"); st.write(fb['feedback_negatif'])
+                st.info(f"💡 {fb['jawaban_saran']}")
+
+    if st.button("🔁 Ulangi Ujian"):
+        st.session_state.exam = None
+        rerun_fragment()
+
+def render_single_question(selected_job, difficulty, api_key):
+    if st.button("🎲 Generate Soal Ujian", type="primary"):
+        with st.spinner("🤖 AI sedang menyiapkan soal ujian..."):
+            bank = get_question_bank(generate_fn=generate_interview_questions)
+            st.session_state.interview_job = selected_job
+            st.session_state.interview_q = (
+                bank.next(st.session_state.session_id, selected_job, difficulty, api_key)
+                or generate_interview_question(selected_job, api_key)
+            )
+            st.session_state.interview_feedback = None
+
+    if st.session_state.interview_q:
+        st.markdown("---")
+        st.markdown(f"### 🤖 Penguji ({st.session_state.interview_job}) bertanya:")
+        st.info(f"🗣 *{st.session_state.interview_q}*")
+
+        user_answer = st.text_area("Jawaban Ujian Anda:", height=150, placeholder="Jawablah selengkap mungkin menggunakan metode STAR (Situation, Task, Action, Result)...")
+
+        if st.button("📝 Kumpulkan Jawaban"):
+            if not user_answer:
+                st.warning("Harap isi jawaban ujian dulu.")
+            else:
+                with st.spinner("👨‍⚖ AI sedang menilai lembar jawaban..."):
+                    feedback = evaluate_interview_answer(
+                        st.session_state.interview_q, 
+                        user_answer, 
+                        st.session_state.interview_job, 
+                        api_key
+                    )
+                    if feedback:
+                        st.session_state.interview_feedback = feedback.dict()
+                    else:
+                        st.error("Gagal melakukan penilaian.")
+
+    if st.session_state.interview_feedback:
+        fb = st.session_state.interview_feedback
+        st.markdown("---")
+        st.markdown("### 📊 Hasil Ujian & Raport")
+
+        col_score, col_details = st.columns([1, 3])
+        with col_score:
+            st.markdown("Skor Akhir:")
+            color = score_color(fb['skor'])
+            st.markdown(f"<div class='score-card' style='background-color: {color}'>{fb['skor']}/100</div>", unsafe_allow_html=True)
+
+        with col_details:
+            with st.container():
+                st.markdown("✅ *Poin Plus:*")
+                st.write(fb['feedback_positif'])
+                st.markdown("⚠ *Koreksi:*")
+                st.write(fb['feedback_negatif'])
+
+        with st.expander("💡 Kunci Jawaban (Saran AI)"):
+            st.info(fb['jawaban_saran'])
+
+# PERSISTENSI SESI: state dipulihkan dari SQLite saat halaman dibuka ulang (?sid=...)
+PERSISTED_KEYS = ("interview_q", "interview_job", "interview_feedback", "exam")
+CHAT_RESTORE_MESSAGES = 20   # jumlah pesan terbaru yang dimuat saat sesi dibuka ulang
+CHAT_PAGE_MESSAGES = 20      # pesan lama yang dimuat per klik "Muat pesan sebelumnya"
+
+def restore_session(store, session_id=None):
+    """Isi session_state dari store tanpa panggilan LLM. Return True jika sesi lama ditemukan."""
+    st.session_state.session_id = session_id or uuid.uuid4().hex
+    st.query_params["sid"] = st.session_state.session_id
+    cv_hash, state = store.load_session(session_id) if session_id else (None, None)
+    if state is None: return False
+    st.session_state.cv_hash = cv_hash
+    if cv_hash:
+        st.session_state.parsed_data, st.session_state.career_advice = store.load_profile(cv_hash)
+        st.session_state.analysis_hash = analysis_hash(st.session_state.parsed_data, st.session_state.career_advice)
+    for key in PERSISTED_KEYS:
+        if key in state: st.session_state[key] = state[key]
+
+    # Transkrip dimuat sebagian: semua pesan yang belum diringkas + pesan terbaru untuk ditampilkan
+    memory_state = state.get("memory") or {}
+    summarized = memory_state.get("summarized_upto", 0)
+    start = max(0, min(summarized, store.count_messages(session_id) - CHAT_RESTORE_MESSAGES))
+    st.session_state.chat_history = store.load_messages(session_id, start)
+    st.session_state.chat_offset = start
+    memory = ChatMemory(summarize_fn=None)
+    memory.summary, memory.summarized_upto = memory_state.get("summary", ""), summarized - start
+    st.session_state.chat_memory = memory
+    return True
+
+def end_session(store, delete=False):
+    """Tinggalkan sesi aktif (opsional: hapus dari store) lalu mulai sesi baru."""
+    session_id = st.session_state.session_id
+    st.session_state.prefetcher.cancel()
+    get_question_bank(generate_fn=generate_interview_questions).reset_session(session_id)
+    if delete: store.delete_session(session_id)
+    for key in list(st.session_state.keys()): del st.session_state[key]
+    st.query_params.clear()
+    st.rerun()
+
+def load_older_messages(store):
+    offset = st.session_state.chat_offset
+    older = store.load_messages(st.session_state.session_id, max(0, offset - CHAT_PAGE_MESSAGES), offset)
+    st.session_state.chat_history[:0] = older
+    st.session_state.chat_offset -= len(older)
+    st.session_state.chat_memory.summarized_upto += len(older)
+
+def persist_session(store):
+    """Simpan state kecil sesi ini (hanya jika berubah sejak penyimpanan terakhir)."""
+    memory = st.session_state.chat_memory
+    state = {key: st.session_state[key] for key in PERSISTED_KEYS}
+    state["memory"] = {"summary": memory.summary, "summarized_upto": memory.summarized_upto + st.session_state.chat_offset}
+    snapshot = (st.session_state.cv_hash, pack(state))
+    if snapshot != st.session_state.get("persisted_snapshot"):
+        store.save_session(st.session_state.session_id, st.session_state.cv_hash, state)
+        st.session_state.persisted_snapshot = snapshot
+
+# RENDERING PER FRAGMENT: profil, rekomendasi, chat & interview dijalankan ulang sendiri-sendiri
+# (klik di chat/interview tidak menjalankan ulang seluruh script). HTML kartu profil & pekerjaan
+# dibangun sekali per hash analisis; transkrip chat hanya menggambar jendela pesan terbaru.
+HTML_CACHE_SIZE = 64
+CHAT_RENDER_WINDOW = int(os.environ.get("PAKAR_CHAT_RENDER_WINDOW", "30"))  # pesan yang digambar per rerun
+_html_cache = OrderedDict()
+_html_lock = threading.Lock()
+
+def analysis_hash(data, advice):
+    return content_hash(json.dumps([data, advice], sort_keys=True, default=str).encode("utf-8"))
+
+def memo_html(key, build):
+    """HTML hasil `build()` per key (LRU global, dipakai bersama semua sesi)."""
+    with _html_lock:
+        if key in _html_cache:
+            _html_cache.move_to_end(key)
+            return _html_cache[key]
+    html = build()
+    with _html_lock:
+        _html_cache[key] = html
+        while len(_html_cache) > HTML_CACHE_SIZE: _html_cache.popitem(last=False)
+    return html
+
+def in_fragment_rerun():
+    ctx = get_script_run_ctx()
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+def rerun_fragment():
+    """Rerun fragment yang sedang berjalan; saat full run (fragment dipanggil dari main) rerun seluruh app."""
+    st.rerun(scope="fragment" if in_fragment_rerun() else "app")
+
+def rerun_timer(scope):
+    """Catat durasi rerun sebagai event 'rerun'. Fragment hanya dicatat saat rerun fragment itu sendiri."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if scope != "app" and not in_fragment_rerun(): return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try: return fn(*args, **kwargs)
+            finally: record_event("rerun", scope=scope, ms=round((time.perf_counter() - started) * 1000, 1))
+        return wrapper
+    return decorator
+
+def rerun_summary(records):
+    """p50 durasi rerun (ms) per scope dari trace sesi."""
+    by_scope = {}
+    for r in records:
+        if r["kind"] == "rerun": by_scope.setdefault(r["scope"], []).append(r["ms"])
+    return {scope: sorted(values)[len(values) // 2] for scope, values in by_scope.items()}
+
+def profile_html(data):
+    return f"""
+            <div class="profile-container">
+                <div style="display: flex; justify-content: space-between; align-items: start; flex-wrap: wrap;">
+                    <div style="flex: 1; min-width: 300px;">
+                        <p class="profile-name">{data['nama_kandidat']}</p>
+                        <p class="profile-degree">🎓 {data['pendidikan_tertinggi']}</p>
+                    </div>
+                    <div style="flex: 1.5; min-width: 300px;">
+                         <p class="profile-summary">"{data['ringkasan_cv']}"</p>
+                    </div>
+                </div>
+                <div style="margin-top: 15px;">
+                    <p style="color: #8b949e; font-size: 0.9rem; margin-bottom: 8px;">🛠 <b>TOP SKILLS DETECTED:</b></p>
+                    {' '.join([f'<span class="skill-tag">{s}</span>' for s in data['skills_utama']])}
+                </div>
+            </div>
+            """
+
+def job_card_html(job):
+    score_int = job.get('skor', 0)
+    bar_color = "#238636" if score_int >= 80 else "#d29922" if score_int >= 60 else "#da3633"
+    return f"""
+                    <div class="job-card">
+                        <div class="job-title">{job['judul_pekerjaan']}</div>
+                        <div style="display: flex; justify-content: space-between; align-items: center;">
+                            <span class="match-badge" style="background-color: {bar_color}33; color: {bar_color}; border: 1px solid {bar_color};">
+                                Match: {score_int}%
+                            </span>
+                        </div>
+                        <div class="progress-bg">
+                            <div class="progress-fill" style="width: {score_int}%; background-color: {bar_color};"></div>
+                        </div>
+                        <p class="job-desc">{job['alasan']}</p>
+                    </div>
+                    """
+
+def gap_html(advice):
+    return f"""
+            <div class="gap-box">
+                <h4 style="margin:0; margin-bottom: 10px;">🚀 Strategi Pengembangan Karir</h4>
+                <p style="margin:0; line-height: 1.6;">{advice['analisis_gap']}</p>
+            </div>
+            """
+
+@st.fragment
+@rerun_timer("profile")
+def profile_fragment(data, key):
+    st.markdown(memo_html(("profile", key), lambda: profile_html(data)), unsafe_allow_html=True)
+
+@st.fragment
+@rerun_timer("recommendations")
+def recommendations_fragment(advice, key):
+    st.markdown("### 🎯 Rekomendasi Karir & Kecocokan")
+    cols = st.columns(3)
+    for i, job in enumerate(advice['rekomendasi']):
+        with cols[i]: st.markdown(memo_html(("job", key, i), lambda: job_card_html(job)), unsafe_allow_html=True)
+    st.markdown(memo_html(("gap", key), lambda: gap_html(advice)), unsafe_allow_html=True)
+
+@st.fragment
+@rerun_timer("chat")
+def chat_fragment(api_key, store):
+    if not st.session_state.parsed_data:
+        st.info("⚠ Harap lakukan analisis CV di Tab 1 terlebih dahulu agar Agent memiliki konteks.")
+        return
+    st.subheader("💬 Konsultasi & Pembuatan Dokumen")
+    st.caption("Agent cerdas yang dapat membuatkan dokumen atau rencana belajar untuk Anda.")
+
+    # QUICK ACTION BUTTONS
+    st.markdown("##### ⚡ Tindakan Cepat:")
+    b_col1, b_col2, b_col3 = st.columns(3)
+    
+    clicked_prompt = None
+    clicked_tool = None  # (nama_tool, argumen) -> dieksekusi langsung tanpa agent
+    
+    # Mendapatkan data skill dan job untuk prompt otomatis
+    first_skill, target_job = quick_action_targets(st.session_state.parsed_data, st.session_state.career_advice)
+
+    if b_col1.button("📅 Buat Rencana Belajar", use_container_width=True, help=f"Buat study plan untuk {first_skill}"):
+        clicked_prompt = f"Buatkan rencana belajar 4 minggu lengkap untuk menguasai skill: {first_skill}. Saya ingin fokus pada praktik."
+        clicked_tool = ("tool_study_plan", first_skill)
+    
+    if b_col2.button("✍️ Draft Cover Letter", use_container_width=True, help=f"Buat surat lamaran untuk {target_job}"):
+        clicked_prompt = f"Buatkan draft Cover Letter profesional untuk posisi {target_job}. Tekankan bahwa saya cepat belajar."
+        clicked_tool = ("tool_cover_letter", target_job)
+        
+    if b_col3.button("💼 Optimasi LinkedIn", use_container_width=True, help=f"Saran profil untuk {target_job}"):
+        clicked_prompt = f"Berikan saran optimasi profil LinkedIn (Headline & About) agar menarik rekruter untuk posisi {target_job}."
+        clicked_tool = ("tool_linkedin_optimization", target_job)
+
+    # History Chat: hanya jendela pesan terbaru yang digambar; pesan di luar jendela
+    # (atau yang belum dimuat dari sesi tersimpan) ditampilkan saat diminta
+    history = st.session_state.chat_history
+    hidden = max(0, len(history) - st.session_state.chat_window)
+    if (hidden or st.session_state.chat_offset) and st.button(f"⬆ Muat pesan sebelumnya ({hidden + st.session_state.chat_offset})"):
+        if hidden: st.session_state.chat_window += CHAT_PAGE_MESSAGES
+        else:
+            load_older_messages(store)
+            st.session_state.chat_window = len(history)
+        hidden = max(0, len(history) - st.session_state.chat_window)
+    transcript_box = st.container()
+    with transcript_box:
+        for msg in history[hidden:]:
+            role = "user" if isinstance(msg, HumanMessage) else "assistant"
+            with st.chat_message(role): st.write(msg.content)
+    
+    # Input Logic (Gabungan Manual & Button)
+    manual_input = st.chat_input("Diskusikan strategi karir Anda di sini...")
+    
+    # Tentukan input final (prioritas tombol jika diklik, jika tidak maka input manual)
+    final_query = clicked_prompt if clicked_prompt else manual_input
+
+    if final_query:
+        # Pesan baru digambar langsung di bawah transkrip (tanpa rerun untuk menggambar ulang riwayat)
+        with transcript_box:
+            # 1. Tampilkan pesan user
+            with st.chat_message("user"): st.write(final_query)
+            
+            # 2. Agent Berpikir & Menjawab (streaming token)
+            with st.chat_message("assistant"):
+                data = st.session_state.parsed_data
+                advice = st.session_state.career_advice
+                memory = st.session_state.chat_memory
+                memory.summarize_fn = lambda summary, messages: summarize_chat(summary, messages, api_key)
+                context, recent_history, turn_tokens = prepare_agent_turn(memory, history, final_query, data, advice)
+                history.append(HumanMessage(content=final_query))
+
+                status = st.empty()
+                started, first_token_at = time.perf_counter(), None
+
+                # Hasil prefetch hanya dipakai jika sudah selesai; yang masih berjalan dibatalkan
+                response = st.session_state.prefetcher.take_ready(clicked_tool) if clicked_tool else None
+                if response:
+                    # Sudah disiapkan di background setelah analisis
+                    status.caption("⚡ Output sudah disiapkan sebelumnya (prefetch).")
+                    first_token_at = time.perf_counter() - started
+
+                if response:
+                    st.write(response)
+                elif clicked_tool:
+                    # Fast path: tombol sudah tahu tool-nya -> panggil langsung tanpa round-trip agent
+                    tool_name, argument = clicked_tool
+                    status.caption(f"⚡ Menjalankan {tool_name} secara langsung…")
+
+                    def quick_action_chunks():
+                        nonlocal first_token_at
+                        with llm_lane("interactive"):
+                            for text in stream_quick_action(tool_name, argument, context, api_key):
+                                if first_token_at is None: first_token_at = time.perf_counter() - started
+                                yield text
+
+                    response = st.write_stream(quick_action_chunks())
+                else:
+                    status.caption("⏳ Agent sedang berpikir & memilih tools yang tepat...")
+                    tool_box, tool_text = None, ""
+                    answer_box, answer_text = st.empty(), ""
+
+                    st.session_state.chat_tokens.append(turn_tokens)
+                    for event, value in stream_agent_response(final_query, recent_history, context, api_key):
+                        if event in ("token", "tool_token") and first_token_at is None:
+                            first_token_at = time.perf_counter() - started
+                        if event == "tool_start":
+                            status.caption(f"🔧 Memanggil {value}…")
+                            tool_box, tool_text = st.expander(f"🔧 Output {value}", expanded=True).empty(), ""
+                        elif event == "tool_token" and tool_box:
+                            tool_text += value
+                            tool_box.markdown(tool_text + "▌")
+                        elif event == "tool_end":
+                            if tool_box: tool_box.markdown(tool_text)
+                            status.caption(f"✅ {value} selesai, menyusun jawaban…")
+                        elif event == "token":
+                            answer_text += value
+                            answer_box.markdown(answer_text + "▌")
+                        elif event == "final":
+                            response = value
+
+                    answer_box.markdown(response)
+
+                total = time.perf_counter() - started
+                ttft = f"{first_token_at:.2f}s" if first_token_at is not None else "-"
+                status.caption(f"⏱ Token pertama {ttft} · total {total:.2f}s")
+                st.session_state.chat_latency.append({"ttft_s": first_token_at, "total_s": total})
+        
+        # 3. Simpan respon (juga ke store); pesan sudah tergambar sehingga tidak perlu rerun
+        history.append(AIMessage(content=response))
+        store.append_messages(st.session_state.session_id, st.session_state.chat_offset + len(history) - 2, history[-2:])
+    if in_fragment_rerun(): persist_session(store)
+
+@st.fragment
+@rerun_timer("interview")
+def interview_fragment(api_key, store):
+    st.subheader("📝 Ujian Simulasi Interview (Mock Test)")
+    st.write("Mode ujian terstruktur dengan penilaian skor otomatis oleh AI.")
+    
+    if not st.session_state.career_advice:
+        st.info("⚠ Harap lakukan analisis CV di Tab 1 terlebih dahulu.")
+        return
+    recs = [job['judul_pekerjaan'] for job in st.session_state.career_advice['rekomendasi']]
+    selected_job = st.selectbox("Pilih Posisi untuk Ujian:", recs)
+    difficulty = st.select_slider("Tingkat Kesulitan:", options=DIFFICULTIES, value=DEFAULT_DIFFICULTY)
+    
+    exam_mode = st.radio("Mode:", ["Soal Tunggal", "Ujian Lengkap"], horizontal=True)
+
+    if exam_mode == "Ujian Lengkap":
+        render_exam_mode(selected_job, difficulty, api_key)
+    else:
+        render_single_question(selected_job, difficulty, api_key)
+    if in_fragment_rerun(): persist_session(store)
 
 # ==========================================
 # 5. MAIN APP
 # ==========================================
+@rerun_timer("app")
 def main():
-    # Session State Init
+    setup_page()
+
+    # Session State Init (sesi lama dipulihkan dari store jika URL membawa ?sid=)
+    store = get_session_store()
+    if "session_id" not in st.session_state: restore_session(store, st.query_params.get("sid"))
     if "parsed_data" not in st.session_state: st.session_state.parsed_data = None
     if "career_advice" not in st.session_state: st.session_state.career_advice = None
     if "chat_history" not in st.session_state: st.session_state.chat_history = []
+    if "chat_latency" not in st.session_state: st.session_state.chat_latency = []
+    if "chat_tokens" not in st.session_state: st.session_state.chat_tokens = []
+    if "chat_memory" not in st.session_state: st.session_state.chat_memory = ChatMemory(summarize_fn=None)
+    if "prefetcher" not in st.session_state: st.session_state.prefetcher = Prefetcher()
+    if "chat_offset" not in st.session_state: st.session_state.chat_offset = 0  # jumlah pesan lama yang belum dimuat
+    if "chat_window" not in st.session_state: st.session_state.chat_window = CHAT_RENDER_WINDOW
+    if "cv_hash" not in st.session_state: st.session_state.cv_hash = None
+    if "analysis_hash" not in st.session_state: st.session_state.analysis_hash = None
+    set_session(st.session_state.session_id)
     if "interview_q" not in st.session_state: st.session_state.interview_q = None
     if "interview_job" not in st.session_state: st.session_state.interview_job = None
     if "interview_feedback" not in st.session_state: st.session_state.interview_feedback = None
+    if "exam" not in st.session_state: st.session_state.exam = None
 
     # SIDEBAR 
     with st.sidebar:
         st.header("🔑 Akses Sistem")
         api_key = st.text_input("Masukkan Gemini API Key", type="password", help="Dapatkan di aistudio.google.com")
         st.divider()
+        cache_stats = get_result_cache().stats()
+        st.caption(
+            f"🗄 Cache analisis: {cache_stats['hits']} hit / {cache_stats['misses']} miss "
+            f"({cache_stats['hit_rate']:.0%}) · {cache_stats['entries']} entri, {cache_stats['bytes'] / 1024:.0f} KB"
+        )
+        sem_stats = get_semantic_cache().stats()
+        st.caption(
+            f"🧠 Cache semantik (chat & tools): {sem_stats['hits']} hit / {sem_stats['misses']} miss "
+            f"({sem_stats['hit_rate']:.0%}) · {sem_stats['entries']} entri"
+        )
+        fused_enabled = st.toggle("🔗 Analisis CV satu panggilan", value=FUSED_PIPELINE, help="Eksperimental: profil & rekomendasi karir dari satu panggilan LLM (profil tampil lebih dulu, posisi dipilih LLM). Jika gagal, otomatis memakai jalur dua langkah.")
+        prefetch_enabled = st.toggle("⚡ Prefetch spekulatif", value=True, help="Siapkan soal interview & output Tindakan Cepat di background setelah analisis selesai.")
+        pf_stats = st.session_state.prefetcher.stats
+        st.caption(
+            f"🔮 Prefetch: {pf_stats['submitted']}/{st.session_state.prefetcher.max_calls} dijadwalkan · "
+            f"{pf_stats['used']} terpakai · {st.session_state.prefetcher.pending()} berjalan"
+        )
+        bank_stats = get_question_bank(generate_fn=generate_interview_questions).summary()
+        st.caption(
+            f"🗂 Bank soal: {bank_stats['questions']} soal · {bank_stats['served_local']} dilayani lokal / "
+            f"{bank_stats['served_after_generate']} perlu generate"
+        )
+        pool_stats = get_llm_pool().stats()
+        st.caption(
+            f"🔌 Client LLM: {pool_stats['clients']} aktif · {pool_stats['created']} dibuat / "
+            f"{pool_stats['reused']} dipakai ulang ({pool_stats['reuse_rate']:.0%})"
+        )
+        sched = get_scheduler().stats()
+        waits = sched["wait_ms"].get("interactive") or sched["wait_ms"].get("normal")
+        st.caption(
+            f"🚦 Scheduler LLM: antrian {sum(sched['queue_depth'].values())} · {sched['coalesced']} digabung · "
+            f"{sched['retries']} retry" + (f" · tunggu p95 {waits['p95']:.0f} ms" if waits else "")
+        )
+        routes = get_router().stats()
+        demoted = [f"{task}→{r['tier']}" for task, r in routes.items() if r["tier"] != r["primary"]]
+        st.caption("🧭 Routing model: " + (f"turun tier ({', '.join(demoted)})" if demoted else "semua tugas di tier utama"))
+        used = {task: r for task, r in routes.items() if r["tiers"]}
+        if used:
+            with st.expander("🧭 Kualitas per tugas & tier"):
+                st.dataframe([
+                    {"tugas": task, "tier": tier, "panggilan": t["calls"], "p95 ms": t["p95_ms"],
+                     "parse ok": f"{t['parse_rate']:.0%}" if t["parse_rate"] is not None else "-",
+                     "error": f"{t['error_rate']:.0%}", "eskalasi": t["escalated"], "biaya USD": t["cost_usd"]}
+                    for task, r in used.items() for tier, t in r["tiers"].items()
+                ], hide_index=True)
+        if st.session_state.chat_latency:
+            last = st.session_state.chat_latency[-1]
+            ttft = f"{last['ttft_s']:.2f}s" if last['ttft_s'] is not None else "-"
+            st.caption(f"⏱ Chat terakhir: token pertama {ttft} · total {last['total_s']:.2f}s")
+        if st.session_state.chat_tokens:
+            last = st.session_state.chat_tokens[-1]
+            saved = 1 - last['prompt_tokens'] / last['unbounded_tokens'] if last['unbounded_tokens'] else 0
+            st.caption(f"🧮 Prompt agent: ~{last['prompt_tokens']} token (tanpa memori: ~{last['unbounded_tokens']}, hemat {saved:.0%})")
+        records = get_trace_log().records(st.session_state.session_id)
+        last_extract = next((i for i in range(len(records) - 1, -1, -1) if records[i]["kind"] == "extract"), None)
+        if last_extract is not None:
+            ex = records[last_extract]
+            st.caption(
+                f"📄 Ekstraksi: {ex['pages']}/{ex['total_pages']} halaman · {ex['ms']:.0f} ms"
+                + (" · dipotong di token budget" if ex["truncated"] else "")
+            )
+            compact = next((r for r in records[last_extract:] if r["kind"] == "compact"), None)
+            if compact and compact["tokens_before"]:
+                saved = 1 - compact["tokens_after"] / compact["tokens_before"]
+                st.caption(f"✂️ Compaction CV: ~{compact['tokens_before']} → ~{compact['tokens_after']} token (hemat {saved:.0%})")
+            page_rows = [r for r in records[max(0, last_extract - ex["pages"]):last_extract] if r["kind"] == "extract_page"]
+            if page_rows:
+                with st.expander("📑 Waktu ekstraksi per halaman"):
+                    st.dataframe([{"halaman": r["page"], "token": r["tokens"], "ms": r["ms"]} for r in page_rows], hide_index=True)
+        reruns = rerun_summary(records)
+        if reruns: st.caption("🔁 Rerun p50: " + " · ".join(f"{scope} {ms:.0f} ms" for scope, ms in reruns.items()))
+        st.caption(f"💾 Sesi tersimpan: {st.session_state.session_id[:8]} · buka ulang URL ini untuk melanjutkan")
+        new_col, delete_col = st.columns(2)
+        if new_col.button("🆕 Mulai Sesi Baru", use_container_width=True): end_session(store)
+        if delete_col.button("🗑️ Hapus Sesi Ini", use_container_width=True, help="Hapus profil sesi & transkrip chat dari penyimpanan"):
+            end_session(store, delete=True)
+        breakdown = get_trace_log().breakdown(st.session_state.session_id)
+        if breakdown:
+            with st.expander("📈 Latensi per tahap (sesi ini)"):
+                st.dataframe([
+                    {"tahap": stage, "panggilan": b["calls"], "rata2 ms": b["avg_wall_ms"], "TTFT ms": b["avg_ttft_ms"],
+                     "token in": b["input_tokens"], "token out": b["output_tokens"],
+                     "cache hit/miss": f"{b['cache_hits']}/{b['cache_misses']}", "parse ok/gagal": f"{b['parse_ok']}/{b['parse_failed']}"}
+                    for stage, b in sorted(breakdown.items(), key=lambda kv: -kv[1]["wall_ms"])
+                ], hide_index=True)
 
     # HERO SECTION
     st.markdown('<p class="hero-title">PAKAR</p>', unsafe_allow_html=True)
@@ -366,23 +1336,41 @@ def main():
     # TAB 1: ANALYZER 
     with tab1:
         st.markdown("### 📂 Upload CV Kandidat")
-        uploaded_file = st.file_uploader("Format PDF atau TXT", type=['pdf', 'txt'])
+        # CV baru -> hasil prefetch untuk CV lama tidak relevan lagi
+        uploaded_file = st.file_uploader("Format PDF, DOCX, TXT atau Markdown", type=[ext.lstrip(".") for ext in supported_extensions()], on_change=st.session_state.prefetcher.cancel)
         
         if uploaded_file:
             if st.button("🚀 Mulai Analisis Profil", type="primary", use_container_width=True):
+                st.session_state.prefetcher.cancel()
+                preview = st.empty()
+
+                def show_profile(profile):
+                    # Profil tampil selagi rekomendasi karir masih dibuat
+                    with preview.container():
+                        st.markdown(profile_html(profile.dict()), unsafe_allow_html=True)
+                        st.caption("⏳ Menyusun rekomendasi karir...")
+
                 with st.spinner("🔍 Sedang mengekstrak informasi dan mencocokkan karir..."):
-                    text = load_and_read_file(uploaded_file)
-                    if text:
-                        p_data = parse_resume_with_llm(text, api_key)
-                        if p_data:
-                            st.session_state.parsed_data = p_data.dict()
-                            c_advice = analyze_career_path(p_data.dict(), api_key)
-                            if c_advice:
-                                st.session_state.career_advice = c_advice.dict()
-                                st.session_state.interview_q = None
-                                st.session_state.interview_feedback = None
-                            else: st.error("Gagal analisis karir.")
-                        else: st.error("Gagal parsing CV.")
+                    p_data, c_advice, from_cache = analyze_cv_file(uploaded_file, api_key, fused=fused_enabled, on_profile=show_profile)
+                    preview.empty()  # hasil lengkap digambar oleh fragment profil & rekomendasi di bawah
+                    if p_data:
+                        st.session_state.parsed_data = p_data.dict()
+                        st.session_state.analysis_hash = None
+                        if c_advice:
+                            st.session_state.career_advice = c_advice.dict()
+                            st.session_state.analysis_hash = analysis_hash(st.session_state.parsed_data, st.session_state.career_advice)
+                            st.session_state.cv_hash = content_hash(bytes(uploaded_file.getbuffer()))
+                            store.save_profile(st.session_state.cv_hash, st.session_state.parsed_data, st.session_state.career_advice)
+                            st.session_state.interview_q = None
+                            st.session_state.interview_feedback = None
+                            st.session_state.exam = None
+                            # Profil baru: soal interview yang pernah diterima sesi ini boleh muncul lagi
+                            get_question_bank(generate_fn=generate_interview_questions).reset_session(st.session_state.session_id)
+                            if from_cache: st.toast("⚡ Hasil analisis diambil dari cache.")
+                            if prefetch_enabled:
+                                start_prefetch(st.session_state.prefetcher, st.session_state.parsed_data, st.session_state.career_advice, api_key)
+                        else: st.error("Gagal analisis karir.")
+                    else: st.error("Gagal parsing CV.")
         
         # Tampilan Hasil Analisis
         if st.session_state.parsed_data and st.session_state.career_advice:
@@ -390,175 +1378,17 @@ def main():
             advice = st.session_state.career_advice
             
             st.markdown("---")
-            
-            # Profile
-            st.markdown(f"""
-            <div class="profile-container">
-                <div style="display: flex; justify-content: space-between; align-items: start; flex-wrap: wrap;">
-                    <div style="flex: 1; min-width: 300px;">
-                        <p class="profile-name">{data['nama_kandidat']}</p>
-                        <p class="profile-degree">🎓 {data['pendidikan_tertinggi']}</p>
-                    </div>
-                    <div style="flex: 1.5; min-width: 300px;">
-                         <p class="profile-summary">"{data['ringkasan_cv']}"</p>
-                    </div>
-                </div>
-                <div style="margin-top: 15px;">
-                    <p style="color: #8b949e; font-size: 0.9rem; margin-bottom: 8px;">🛠 <b>TOP SKILLS DETECTED:</b></p>
-                    {' '.join([f'<span class="skill-tag">{s}</span>' for s in data['skills_utama']])}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Job Recommendations
-            st.markdown("### 🎯 Rekomendasi Karir & Kecocokan")
-            cols = st.columns(3)
-            for i, job in enumerate(advice['rekomendasi']):
-                try: score_int = int(job['skor_kecocokan'].replace('%', ''))
-                except: score_int = 0
-                bar_color = "#238636" if score_int >= 80 else "#d29922" if score_int >= 60 else "#da3633"
-                
-                with cols[i]:
-                    st.markdown(f"""
-                    <div class="job-card">
-                        <div class="job-title">{job['judul_pekerjaan']}</div>
-                        <div style="display: flex; justify-content: space-between; align-items: center;">
-                            <span class="match-badge" style="background-color: {bar_color}33; color: {bar_color}; border: 1px solid {bar_color};">
-                                Match: {job['skor_kecocokan']}
-                            </span>
-                        </div>
-                        <div class="progress-bg">
-                            <div class="progress-fill" style="width: {score_int}%; background-color: {bar_color};"></div>
-                        </div>
-                        <p class="job-desc">{job['alasan']}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-            
-            # Gap Analysis
-            st.markdown(f"""
-            <div class="gap-box">
-                <h4 style="margin:0; margin-bottom: 10px;">🚀 Strategi Pengembangan Karir</h4>
-                <p style="margin:0; line-height: 1.6;">{advice['analisis_gap']}</p>
-            </div>
-            """, unsafe_allow_html=True)
+            key = st.session_state.get("analysis_hash") or analysis_hash(data, advice)
+            profile_fragment(data, key)
+            recommendations_fragment(advice, key)
 
     # TAB 2: AGENT CHATBOT (DENGAN BUTTON SHORTCUTS)
-    with tab2:
-        if not st.session_state.parsed_data:
-            st.info("⚠ Harap lakukan analisis CV di Tab 1 terlebih dahulu agar Agent memiliki konteks.")
-        else:
-            st.subheader("💬 Konsultasi & Pembuatan Dokumen")
-            st.caption("Agent cerdas yang dapat membuatkan dokumen atau rencana belajar untuk Anda.")
-
-            # QUICK ACTION BUTTONS
-            st.markdown("##### ⚡ Tindakan Cepat:")
-            b_col1, b_col2, b_col3 = st.columns(3)
-            
-            clicked_prompt = None
-            
-            # Mendapatkan data skill dan job untuk prompt otomatis
-            first_skill = st.session_state.parsed_data['skills_utama'][0] if st.session_state.parsed_data['skills_utama'] else "Python"
-            target_job = st.session_state.career_advice['rekomendasi'][0]['judul_pekerjaan'] if st.session_state.career_advice['rekomendasi'] else "Data Scientist"
-
-            if b_col1.button("📅 Buat Rencana Belajar", use_container_width=True, help=f"Buat study plan untuk {first_skill}"):
-                clicked_prompt = f"Buatkan rencana belajar 4 minggu lengkap untuk menguasai skill: {first_skill}. Saya ingin fokus pada praktik."
-            
-            if b_col2.button("✍️ Draft Cover Letter", use_container_width=True, help=f"Buat surat lamaran untuk {target_job}"):
-                clicked_prompt = f"Buatkan draft Cover Letter profesional untuk posisi {target_job}. Tekankan bahwa saya cepat belajar."
-                
-            if b_col3.button("💼 Optimasi LinkedIn", use_container_width=True, help=f"Saran profil untuk {target_job}"):
-                clicked_prompt = f"Berikan saran optimasi profil LinkedIn (Headline & About) agar menarik rekruter untuk posisi {target_job}."
-
-            # History Chat
-            for msg in st.session_state.chat_history:
-                role = "user" if isinstance(msg, HumanMessage) else "assistant"
-                with st.chat_message(role): st.write(msg.content)
-            
-            # Input Logic (Gabungan Manual & Button)
-            manual_input = st.chat_input("Diskusikan strategi karir Anda di sini...")
-            
-            # Tentukan input final (prioritas tombol jika diklik, jika tidak maka input manual)
-            final_query = clicked_prompt if clicked_prompt else manual_input
-
-            if final_query:
-                # 1. Tampilkan pesan user
-                with st.chat_message("user"): st.write(final_query)
-                st.session_state.chat_history.append(HumanMessage(content=final_query))
-                
-                # 2. Agent Berpikir & Menjawab
-                with st.chat_message("assistant"):
-                    with st.spinner("Agent sedang berpikir & memilih tools yang tepat..."):
-                        data = st.session_state.parsed_data
-                        advice = st.session_state.career_advice
-                        context = f"Data Kandidat: {data}\nRekomendasi Sistem: {advice['rekomendasi']}\nGap Analysis: {advice['analisis_gap']}"
-                        
-                        response = get_agent_response(final_query, st.session_state.chat_history, context, api_key)
-                        st.write(response)
-                
-                # 3. Simpan respon & Rerun untuk update UI
-                st.session_state.chat_history.append(AIMessage(content=response))
-                st.rerun()
+    with tab2: chat_fragment(api_key, store)
 
     # TAB 3: MOCK INTERVIEW
-    with tab3:
-        st.subheader("📝 Ujian Simulasi Interview (Mock Test)")
-        st.write("Mode ujian terstruktur dengan penilaian skor otomatis oleh AI.")
-        
-        if not st.session_state.career_advice:
-            st.info("⚠ Harap lakukan analisis CV di Tab 1 terlebih dahulu.")
-        else:
-            recs = [job['judul_pekerjaan'] for job in st.session_state.career_advice['rekomendasi']]
-            selected_job = st.selectbox("Pilih Posisi untuk Ujian:", recs)
-            
-            if st.button("🎲 Generate Soal Ujian", type="primary"):
-                with st.spinner("🤖 AI sedang menyiapkan soal ujian..."):
-                    st.session_state.interview_job = selected_job
-                    st.session_state.interview_q = generate_interview_question(selected_job, api_key)
-                    st.session_state.interview_feedback = None
-            
-            if st.session_state.interview_q:
-                st.markdown("---")
-                st.markdown(f"### 🤖 Penguji ({st.session_state.interview_job}) bertanya:")
-                st.info(f"🗣 *{st.session_state.interview_q}*")
-                
-                user_answer = st.text_area("Jawaban Ujian Anda:", height=150, placeholder="Jawablah selengkap mungkin menggunakan metode STAR (Situation, Task, Action, Result)...")
-                
-                if st.button("📝 Kumpulkan Jawaban"):
-                    if not user_answer:
-                        st.warning("Harap isi jawaban ujian dulu.")
-                    else:
-                        with st.spinner("👨‍⚖ AI sedang menilai lembar jawaban..."):
-                            feedback = evaluate_interview_answer(
-                                st.session_state.interview_q, 
-                                user_answer, 
-                                st.session_state.interview_job, 
-                                api_key
-                            )
-                            if feedback:
-                                st.session_state.interview_feedback = feedback.dict()
-                            else:
-                                st.error("Gagal melakukan penilaian.")
-
-            if st.session_state.interview_feedback:
-                fb = st.session_state.interview_feedback
-                st.markdown("---")
-                st.markdown("### 📊 Hasil Ujian & Raport")
-                
-                col_score, col_details = st.columns([1, 3])
-                with col_score:
-                    st.markdown("Skor Akhir:")
-                    color = "#28a745" if fb['skor'] >= 75 else "#ffc107" if fb['skor'] >= 50 else "#dc3545"
-                    st.markdown(f"<div class='score-card' style='background-color: {color}'>{fb['skor']}/100</div>", unsafe_allow_html=True)
-                
-                with col_details:
-                    with st.container():
-                        st.markdown("✅ *Poin Plus:*")
-                        st.write(fb['feedback_positif'])
-                        st.markdown("⚠ *Koreksi:*")
-                        st.write(fb['feedback_negatif'])
-                
-                with st.expander("💡 Kunci Jawaban (Saran AI)"):
-                    st.info(fb['jawaban_saran'])
+    with tab3: interview_fragment(api_key, store)
+
+    persist_session(store)
 
 if __name__ == "__main__":
 
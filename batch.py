@@ -0,0 +1,198 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import app
+from cache import get_result_cache
+from extraction import supported_extensions
+from llm_pool import get_llm_pool
+
+# ==========================================
+# BATCH MODE (HEADLESS)
+# ==========================================
+# Menganalisis banyak CV sekaligus tanpa Streamlit:
+#   python batch.py ./cv_folder -o hasil.jsonl --concurrency 8
+#   python batch.py manifest.jsonl -o hasil.parquet --fake
+# Manifest JSONL: satu objek per baris, {"path": "...", "id": "..."} (id opsional).
+# Progres dicatat di file checkpoint sehingga run yang terputus bisa dilanjutkan.
+
+SUPPORTED_EXTENSIONS = tuple(supported_extensions())
+
+
+class LocalFile:
+    """Adapter file lokal dengan antarmuka yang dipakai `load_and_read_file` (name & getbuffer)."""
+
+    def __init__(self, path):
+        self.name = os.path.basename(path)
+        with open(path, "rb") as f:
+            self._data = f.read()
+
+    def getbuffer(self):
+        return memoryview(self._data)
+
+    def getvalue(self):
+        return self._data
+
+
+def collect_jobs(source):
+    """Daftar job {"id", "path"} dari folder atau manifest JSONL."""
+    if os.path.isdir(source):
+        jobs = []
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    jobs.append({"id": os.path.relpath(path, source), "path": path})
+        return sorted(jobs, key=lambda j: j["id"])
+
+    jobs = []
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip(): continue
+            entry = json.loads(line)
+            path = entry["path"] if os.path.isabs(entry["path"]) else os.path.join(base, entry["path"])
+            jobs.append({"id": entry.get("id", entry["path"]), "path": path})
+    return jobs
+
+
+def load_checkpoint(path):
+    if not path or not os.path.exists(path): return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def analyze_job(job, api_key, cache):
+    record = {"id": job["id"], "path": job["path"], "status": "ok", "sha256": None,
+              "from_cache": False, "elapsed_s": None, "resume": None, "career": None, "error": None}
+    start = time.perf_counter()
+    try:
+        uploaded = LocalFile(job["path"])
+        record["sha256"] = hashlib.sha256(uploaded.getvalue()).hexdigest()
+        p_data, c_advice, from_cache = app.analyze_cv_file(uploaded, api_key, cache=cache)
+        record["from_cache"] = from_cache
+        if p_data: record["resume"] = p_data.dict()
+        if c_advice: record["career"] = c_advice.dict()
+        if not p_data: record.update(status="error", error="Gagal parsing CV.")
+        elif not c_advice: record.update(status="error", error="Gagal analisis karir.")
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+    record["elapsed_s"] = round(time.perf_counter() - start, 4)
+    return record
+
+
+class JsonlWriter:
+    def __init__(self, path):
+        self._f = open(path, "a", encoding="utf-8")
+
+    def write(self, record):
+        self._f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+class ParquetWriter:
+    """Tulis hasil per baris sebagai row group Parquet (butuh pyarrow)."""
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Output Parquet membutuhkan pyarrow: pip install pyarrow")
+        self._pa = pa
+        if os.path.exists(path):
+            # File Parquet tidak bisa di-append; hasil run lanjutan ditulis ke file baru
+            stem, ext = os.path.splitext(path)
+            path = f"{stem}-{int(time.time())}{ext}"
+        self.path = path
+        self._schema = pa.schema([
+            ("id", pa.string()), ("path", pa.string()), ("status", pa.string()), ("sha256", pa.string()),
+            ("from_cache", pa.bool_()), ("elapsed_s", pa.float64()),
+            ("resume", pa.string()), ("career", pa.string()), ("error", pa.string()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, record):
+        row = dict(record)
+        for field in ("resume", "career"):
+            if row[field] is not None: row[field] = json.dumps(row[field], ensure_ascii=False)
+        self._writer.write_table(self._pa.Table.from_pylist([row], schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def open_writer(path):
+    return ParquetWriter(path) if path.endswith(".parquet") else JsonlWriter(path)
+
+
+def run_batch(source, output, api_key, concurrency=4, checkpoint=None, cache=None, on_result=None):
+    """Jalankan pipeline atas semua CV dan stream hasil ke `output`. Return ringkasan run."""
+    checkpoint = checkpoint or f"{output}.ckpt"
+    cache = cache or get_result_cache()
+    done = load_checkpoint(checkpoint)
+    jobs = [job for job in collect_jobs(source) if job["id"] not in done]
+    summary = {"total": len(jobs) + len(done), "skipped": len(done), "ok": 0, "error": 0, "cached": 0}
+
+    writer = open_writer(output)
+    lock = threading.Lock()
+    start = time.perf_counter()
+    try:
+        with open(checkpoint, "a", encoding="utf-8") as ckpt, ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            futures = [pool.submit(analyze_job, job, api_key, cache) for job in jobs]
+            for future in as_completed(futures):
+                record = future.result()
+                with lock:
+                    writer.write(record)
+                    summary[record["status"]] += 1
+                    if record["from_cache"]: summary["cached"] += 1
+                    # Hanya job sukses yang di-checkpoint; job gagal dicoba ulang saat resume
+                    if record["status"] == "ok":
+                        ckpt.write(record["id"] + "\n")
+                        ckpt.flush()
+                if on_result: on_result(record)
+    finally:
+        writer.close()
+    summary["elapsed_s"] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PAKAR batch: analisis banyak CV sekaligus.")
+    parser.add_argument("source", help="Folder berisi CV (PDF/TXT) atau manifest JSONL.")
+    parser.add_argument("-o", "--output", default="hasil_batch.jsonl", help="File output (.jsonl atau .parquet).")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Jumlah CV yang diproses paralel.")
+    parser.add_argument("--checkpoint", help="File checkpoint (default: <output>.ckpt).")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"), help="Gemini API Key (default: env GEMINI_API_KEY).")
+    parser.add_argument("--fake", action="store_true", help="Gunakan chat model pengganti offline (tanpa panggilan Gemini).")
+    args = parser.parse_args(argv)
+
+    if args.fake:
+        from fake_llm import FakeChatModel
+        # Hasil model pengganti disimpan terpisah agar tidak mendesak (evict) cache produksi
+        os.environ.setdefault("PAKAR_CACHE_DIR", ".pakar_cache_fake")
+        get_llm_pool().set_factory(FakeChatModel)
+        args.api_key = args.api_key or "offline"
+    if not args.api_key:
+        parser.error("API Key tidak ditemukan. Gunakan --api-key atau set GEMINI_API_KEY.")
+
+    def report(record):
+        mark = "✔" if record["status"] == "ok" else "✘"
+        print(f"{mark} {record['id']} ({record['elapsed_s']}s){' [cache]' if record['from_cache'] else ''}"
+              f"{' - ' + record['error'] if record['error'] else ''}", flush=True)
+
+    summary = run_batch(args.source, args.output, args.api_key, args.concurrency, args.checkpoint, on_result=report)
+    print(json.dumps(summary))
+    return 0 if summary["error"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
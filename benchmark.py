@@ -0,0 +1,441 @@
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Benchmark tidak perlu menulis trace JSONL ke disk (kecuali diminta lewat env)
+os.environ.setdefault("PAKAR_TRACE_FILE", "")
+os.environ.setdefault("GEMINI_API_KEY", "offline")
+# Model pengganti tidak punya kuota: rate limit scheduler dimatikan kecuali diminta
+os.environ.setdefault("PAKAR_LLM_RPM", "0")
+
+import app
+import fake_llm
+from batch import LocalFile
+from fake_llm import FakeChatModel
+from llm_pool import get_llm_pool
+from llm_scheduler import get_scheduler
+from model_router import get_router
+from semantic_cache import CALIBRATION_PAIRS, calibration_report, get_semantic_cache
+from telemetry import get_trace_log, set_session
+
+# ==========================================
+# OFFLINE BENCHMARK
+# ==========================================
+# Menjalankan pipeline asli (ekstraksi -> parsing -> analisis -> agent -> penilaian)
+# dengan FakeChatModel sebagai pengganti Gemini. Latensi, kecepatan token dan
+# peluang JSON rusak dapat diatur sehingga hasil bisa dibandingkan antar commit:
+#   python benchmark.py --save-baseline benchmark_baseline.json
+#   python benchmark.py --baseline benchmark_baseline.json   # exit 1 jika regresi
+# Gate regresi memakai metrik deterministik (jumlah panggilan LLM, estimasi token, hit
+# rate cache, tingkat kegagalan) yang sama di mesin mana pun. Waktu hanya dilaporkan,
+# dinormalisasi terhadap run kalibrasi di mesin yang sama; gate waktu opsional lewat
+# --timing-tolerance. Baseline diperbarui di commit tersendiri, bukan bersama perubahan
+# yang diukurnya.
+
+SAMPLE_PROFILES = [
+    ("Budi Santoso", "S1 Teknik Informatika, Universitas Indonesia", ["Python", "SQL", "Tableau", "Statistik"], "analis data"),
+    ("Sari Dewi", "Sarjana Desain Komunikasi Visual", ["Figma", "UI/UX", "JavaScript"], "desainer produk"),
+    ("Andi Wijaya", "S2 Ilmu Komputer, Institut Teknologi Bandung", ["Machine Learning", "PyTorch", "Python", "Docker"], "ML engineer"),
+    ("Rina Putri", "D3 Manajemen Pemasaran", ["Marketing", "Excel", "Komunikasi"], "digital marketer"),
+    ("Dimas Pratama", "S1 Sistem Informasi", ["Java", "Kubernetes", "AWS", "Linux", "Git"], "backend developer"),
+]
+
+AGENT_QUERIES = [
+    "Buatkan rencana belajar 4 minggu untuk skill: {skill}.",
+    "Buatkan draft Cover Letter profesional untuk posisi {job}.",
+    "Berikan saran optimasi profil LinkedIn untuk posisi {job}.",
+    "Apa langkah karir terbaik untuk saya tahun ini?",
+]
+
+STAGES = ["extract", "parse", "analyze", "agent", "grade"]
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_simple_pdf(path, pages):
+    """Tulis PDF teks sederhana (satu string per halaman) tanpa dependensi tambahan."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for text in pages:
+        lines = "".join(f"({_pdf_escape(line)}) Tj T* " for line in text.splitlines())
+        stream = f"BT /F1 11 Tf 14 TL 50 780 Td {lines}ET"
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{i} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1"))
+    for offset in offsets: out.write(f"{offset:010d} 00000 n \n".encode("latin-1"))
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1"))
+    with open(path, "wb") as f: f.write(out.getvalue())
+
+
+def sample_cv_pages(i):
+    name, edu, skills, role = SAMPLE_PROFILES[i % len(SAMPLE_PROFILES)]
+    header = f"{name} - Curriculum Vitae"
+    email = name.lower().replace(" ", ".") + "@contoh.id"
+    return [
+        f"{name}\n{email} | +62 812-0000-{i:04d}\n{edu}\nProfesional {role} dengan pengalaman {2 + i % 6} tahun.\nKeahlian: {', '.join(skills)}.\nHalaman 1 dari 3",
+        f"{header}\nPengalaman Kerja\n- {role.title()} di PT Contoh {i} (2020-2024)\n- Proyek utama memakai {skills[0]} dan {skills[-1]}.\nHalaman 2 dari 3",
+        f"{header}\nSertifikasi & Organisasi\n- Sertifikasi {skills[0]}\n- Anggota komunitas teknologi lokal.\nReferensi\nTersedia atas permintaan.\nHalaman 3 dari 3",
+    ]
+
+
+def build_corpus(directory, n_docs):
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(n_docs):
+        pages = sample_cv_pages(i)
+        if i % 2 == 0:
+            path = os.path.join(directory, f"cv_{i:03d}.pdf")
+            write_simple_pdf(path, pages)
+        else:
+            path = os.path.join(directory, f"cv_{i:03d}.txt")
+            with open(path, "w", encoding="utf-8") as f: f.write("\n\n".join(pages))
+        paths.append(path)
+    return paths
+
+
+def percentile(values, q):
+    if not values: return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+        self.failures = {stage: 0 for stage in STAGES}
+        self.wall = {stage: 0.0 for stage in STAGES}
+
+    def run(self, stage, fn, *args):
+        set_session(f"bench:{stage}")  # panggilan LLM & event dikelompokkan per tahap (lihat stage_counters)
+        start = time.perf_counter()
+        try: result = fn(*args)
+        except Exception: result = None
+        self.samples[stage].append((time.perf_counter() - start) * 1000)
+        if result is None: self.failures[stage] += 1
+        return result
+
+    def report(self, calibration_ms):
+        stages = {}
+        for stage in STAGES:
+            samples = self.samples[stage]
+            if not samples: continue
+            p50, p95 = percentile(samples, 0.50), percentile(samples, 0.95)
+            stages[stage] = dict(
+                count=len(samples),
+                failure_rate=round(self.failures[stage] / len(samples), 4),
+                **stage_counters(f"bench:{stage}"),
+                throughput_per_s=round(len(samples) / self.wall[stage], 2) if self.wall[stage] else None,
+                p50_ms=round(p50, 2),
+                p95_ms=round(p95, 2),
+                p99_ms=round(percentile(samples, 0.99), 2),
+                # Waktu relatif terhadap kalibrasi: sebanding antar mesin, tapi tetap tidak deterministik
+                p50_norm=round(p50 / calibration_ms, 3),
+                p95_norm=round(p95 / calibration_ms, 3),
+            )
+        return stages
+
+
+def stage_counters(session_id):
+    """Metrik deterministik satu tahap dari trace log: panggilan LLM, token, parse gagal."""
+    totals = {"llm_calls": 0, "input_tokens": 0, "output_tokens": 0, "parse_failed": 0}
+    for s in get_trace_log().breakdown(session_id).values():
+        totals["llm_calls"] += s["calls"]
+        for key in ("input_tokens", "output_tokens", "parse_failed"): totals[key] += s[key]
+    return totals
+
+
+def calibrate(latency_ms, tokens_per_s, rounds=5):
+    """Waktu referensi mesin ini (ms): p50 satu panggilan FakeChatModel langsung, tanpa pipeline."""
+    llm = FakeChatModel(latency_s=latency_ms / 1000, tokens_per_s=tokens_per_s)
+    prompt = app.RESUME_PROMPT.format(resume_text="\n".join(sample_cv_pages(0)))
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        llm.invoke(prompt)
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentile(samples, 0.5)
+
+
+def compaction_report(paths):
+    """Token sebelum/sesudah compaction dan kecocokan field hasil parser offline (proxy kualitas ekstraksi)."""
+    before = after = agree = 0
+    for path in paths:
+        raw = app.load_and_read_file(LocalFile(path), compact=False) or ""
+        compacted = app.load_and_read_file(LocalFile(path)) or ""
+        before += app.estimate_tokens(raw)
+        after += app.estimate_tokens(compacted)
+        a, b = fake_llm._fake_resume(raw), fake_llm._fake_resume(compacted)
+        agree += (a["nama_kandidat"], a["pendidikan_tertinggi"], set(a["skills_utama"])) == \
+                 (b["nama_kandidat"], b["pendidikan_tertinggi"], set(b["skills_utama"]))
+    return {"tokens_before": before, "tokens_after": after,
+            "saved_ratio": round(1 - after / before, 4) if before else 0.0,
+            "field_agreement": round(agree / len(paths), 4) if paths else 1.0}
+
+
+def parse_tier_latency(spec):
+    """"fast=20,pro=400" -> {nama model tier: latensi detik}."""
+    router = get_router()
+    pairs = (item.split("=", 1) for item in (spec or "").split(",") if item.strip())
+    return {router.model(tier.strip()): float(ms) / 1000 for tier, ms in pairs}
+
+def _profile_agreement(a, b):
+    """Kecocokan dua ResumeData: nama & pendidikan sama, Jaccard skill."""
+    skills_a, skills_b = {x.lower() for x in a.skills_utama}, {x.lower() for x in b.skills_utama}
+    union = skills_a | skills_b
+    return {"fields": (a.nama_kandidat, a.pendidikan_tertinggi) == (b.nama_kandidat, b.pendidikan_tertinggi),
+            "skills_jaccard": len(skills_a & skills_b) / len(union) if union else 1.0}
+
+
+def fused_comparison(texts, api_key, concurrency):
+    """Dua langkah (parse -> analyze) vs fused (satu panggilan) atas teks CV yang sama: latensi & kecocokan output."""
+    def run(text):
+        start = time.perf_counter()
+        profile = app.parse_resume_with_llm(text, api_key)
+        two_profile_s = time.perf_counter() - start
+        advice = app.analyze_career_path(profile.dict(), api_key) if profile else None
+        two_s = time.perf_counter() - start
+
+        start, seen = time.perf_counter(), []
+        f_profile, f_advice = app.fused_analysis(text, api_key, on_profile=lambda p: seen.append(time.perf_counter() - start))
+        fused_ok = f_advice is not None
+        if not fused_ok:
+            # Fallback yang sama dengan analyze_cv_file ikut dihitung: latensi sampai hasil bisa dipakai
+            fallback = f_profile or app.parse_resume_with_llm(text, api_key)
+            if fallback: app.analyze_career_path(fallback.dict(), api_key)
+        fused_s = time.perf_counter() - start
+        row = {"two_step_ms": two_s * 1000, "two_step_profile_ms": two_profile_s * 1000, "fused_ms": fused_s * 1000,
+               "fused_profile_ms": seen[0] * 1000 if seen else None, "fused_ok": fused_ok}
+        if profile and f_profile: row.update(_profile_agreement(profile, f_profile))
+        if advice and f_advice:
+            two_titles = {r.judul_pekerjaan for r in advice.rekomendasi}
+            fused_scores = {r.judul_pekerjaan: r.skor for r in f_advice.rekomendasi}
+            shared = [r for r in advice.rekomendasi if r.judul_pekerjaan in fused_scores]
+            row["title_overlap"] = len(two_titles & set(fused_scores)) / max(len(two_titles), 1)
+            row["score_diff"] = sum(abs(r.skor - fused_scores[r.judul_pekerjaan]) for r in shared) / len(shared) if shared else None
+        return row
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        rows = list(pool.map(run, [t for t in texts if t]))
+
+    def p50(key):
+        values = [r[key] for r in rows if r.get(key) is not None]
+        return round(percentile(values, 0.5), 2) if values else None
+
+    def mean(key):
+        values = [float(r[key]) for r in rows if r.get(key) is not None]
+        return round(sum(values) / len(values), 4) if values else None
+
+    return {"docs": len(rows), "two_step_p50_ms": p50("two_step_ms"), "fused_p50_ms": p50("fused_ms"),
+            "two_step_profile_p50_ms": p50("two_step_profile_ms"), "fused_profile_p50_ms": p50("fused_profile_ms"),
+            "fused_success_rate": mean("fused_ok"), "profile_field_agreement": mean("fields"),
+            "skills_jaccard": mean("skills_jaccard"), "title_overlap": mean("title_overlap"), "score_diff": mean("score_diff")}
+
+
+def run_benchmark(n_docs=10, concurrency=4, latency_ms=50, tokens_per_s=400, malformed_rate=0.1, seed=0, corpus_dir=None, tier_latency=None):
+    fake_llm.seed(seed)
+    get_llm_pool().set_factory(fake_llm.tiered_factory(
+        parse_tier_latency(tier_latency), latency_s=latency_ms / 1000, tokens_per_s=tokens_per_s, malformed_rate=malformed_rate,
+    ))
+    get_router().reset()
+    api_key = os.environ["GEMINI_API_KEY"]
+    corpus_dir = corpus_dir or os.path.join(".bench_corpus", f"n{n_docs}")
+    paths = build_corpus(corpus_dir, n_docs)
+    timer = StageTimer()
+
+    def phase(stage, fn, items):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda item: timer.run(stage, fn, *item), items))
+        timer.wall[stage] = time.perf_counter() - start
+        return results
+
+    # Warm-up: import loader PDF & inisialisasi client pertama tidak ikut diukur
+    with contextlib.redirect_stdout(io.StringIO()):
+        for path in paths[:2]: app.load_and_read_file(LocalFile(path))
+    calibration_ms = calibrate(latency_ms, tokens_per_s)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    # verbose=True di AgentExecutor mencetak ke stdout; bisukan agar laporan tetap bersih
+    with contextlib.redirect_stdout(io.StringIO()):
+        texts = phase("extract", app.load_and_read_file, [(LocalFile(p),) for p in paths])
+        profiles = phase("parse", app.parse_resume_with_llm, [(t or "", api_key) for t in texts])
+        profiles = [p.dict() for p in profiles if p]
+        analyses = phase("analyze", app.analyze_career_path, [(p, api_key) for p in profiles])
+
+        agent_items = []
+        for profile, analysis in zip(profiles, analyses):
+            if not analysis: continue
+            job = analysis.rekomendasi[0].judul_pekerjaan
+            skill = profile["skills_utama"][0]
+            digest = app.build_profile_digest(profile, analysis.dict())
+            for query in AGENT_QUERIES:
+                agent_items.append((query.format(skill=skill, job=job), [], digest, api_key))
+        phase("agent", app.get_agent_response, agent_items)
+
+        grade_items = [
+            (f"Jelaskan pengalaman Anda dengan {p['skills_utama'][0]}.", "Saya memimpin proyek migrasi data dan menurunkan waktu proses 40%.", "Data Analyst", api_key)
+            for p in profiles
+        ]
+        phase("grade", app.evaluate_interview_answer, grade_items)
+        fused = fused_comparison(texts, api_key, concurrency)
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    with contextlib.redirect_stdout(io.StringIO()):
+        compaction = compaction_report(paths)
+
+    return {
+        "config": {"n_docs": n_docs, "concurrency": concurrency, "latency_ms": latency_ms,
+                   "tokens_per_s": tokens_per_s, "malformed_rate": malformed_rate, "seed": seed, "tier_latency": tier_latency},
+        "calibration_ms": round(calibration_ms, 2),
+        "total_s": round(total, 3),
+        "peak_memory_mb": round(peak / 1024 / 1024, 2),
+        "stages": timer.report(calibration_ms),
+        "compaction": compaction,
+        "fused": fused,
+        "semantic_cache": dict({k: v for k, v in get_semantic_cache().stats().items() if k in ("hits", "misses", "hit_rate", "entries")},
+                               calibration_errors=len(calibration_report()), calibration_pairs=len(CALIBRATION_PAIRS)),
+        "scheduler": {k: v for k, v in get_scheduler().stats().items() if k in ("requests", "upstream_calls", "coalesced", "retries", "failures")},
+        "routing": {task: {"tier": r["tier"], "tiers": {tier: {k: t[k] for k in ("calls", "p95_ms", "parse_rate", "errors", "escalated")}
+                                                         for tier, t in r["tiers"].items()}}
+                    for task, r in get_router().stats().items() if r["tiers"]},
+    }
+
+
+# (bagian, metrik, arah): "max" = tidak boleh naik, "min" = tidak boleh turun
+DETERMINISTIC_GATES = [
+    ("stages", "llm_calls", "max"), ("stages", "input_tokens", "max"), ("stages", "output_tokens", "max"),
+    ("stages", "parse_failed", "max"), ("stages", "failure_rate", "max"),
+    ("compaction", "tokens_after", "max"), ("compaction", "field_agreement", "min"),
+    ("fused", "fused_success_rate", "min"), ("fused", "profile_field_agreement", "min"), ("fused", "title_overlap", "min"),
+    ("semantic_cache", "hit_rate", "min"),
+    ("scheduler", "upstream_calls", "max"), ("scheduler", "retries", "max"), ("scheduler", "failures", "max"),
+]
+
+
+def _regressed(cur, base, direction, tolerance):
+    if cur is None or base is None: return False
+    return cur > base * (1 + tolerance) if direction == "max" else cur < base * (1 - tolerance)
+
+
+def compare(result, baseline, token_tolerance=0.0, timing_tolerance=None):
+    """Daftar regresi terhadap baseline (kosong jika aman).
+
+    Metrik deterministik dibandingkan langsung (token dengan `token_tolerance`); waktu ternormalisasi
+    hanya dibandingkan jika `timing_tolerance` diisi.
+    """
+    problems = []
+    for stage in baseline.get("stages", {}):
+        if stage not in result["stages"]: problems.append(f"{stage}: tidak ada hasil")
+    for section, metric, direction in DETERMINISTIC_GATES:
+        base_section, cur_section = baseline.get(section) or {}, result.get(section) or {}
+        pairs = ([(f"{stage}.{metric}", cur_section[stage].get(metric), base.get(metric))
+                  for stage, base in base_section.items() if stage in cur_section] if section == "stages"
+                 else [(f"{section}.{metric}", cur_section.get(metric), base_section.get(metric))])
+        tolerance = token_tolerance if metric.endswith("tokens") or metric == "tokens_after" else 0.0
+        for name, cur, base in pairs:
+            if _regressed(cur, base, direction, tolerance):
+                problems.append(f"{name}: {cur} {'>' if direction == 'max' else '<'} {base}" + (f" (±{tolerance:.0%})" if tolerance else ""))
+    sem = result.get("semantic_cache") or {}
+    if sem.get("calibration_errors"):
+        problems.append(f"semantic_cache.calibration_errors: {sem['calibration_errors']}/{sem['calibration_pairs']} pasangan salah (python semantic_cache.py)")
+    if timing_tolerance is not None:
+        for stage, base in baseline.get("stages", {}).items():
+            cur = result["stages"].get(stage) or {}
+            for metric in ("p50_norm", "p95_norm"):
+                if _regressed(cur.get(metric), base.get(metric), "max", timing_tolerance):
+                    problems.append(f"{stage}.{metric}: {cur[metric]} > {base[metric]} (+{timing_tolerance:.0%})")
+    return problems
+
+
+def print_report(result):
+    print(f"Total {result['total_s']}s · peak memory {result['peak_memory_mb']} MB · kalibrasi {result['calibration_ms']} ms · config {result['config']}")
+    print(f"{'stage':<10}{'n':>5}{'llm':>6}{'tok in':>9}{'tok out':>9}{'ops/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p50/kal':>9}{'fail':>8}")
+    for stage, s in result["stages"].items():
+        print(f"{stage:<10}{s['count']:>5}{s['llm_calls']:>6}{s['input_tokens']:>9}{s['output_tokens']:>9}{s['throughput_per_s'] or 0:>9}"
+              f"{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p50_norm']:>9}{s['failure_rate']:>8.1%}")
+    comp = result.get("compaction")
+    if comp:
+        print(f"Compaction: ~{comp['tokens_before']} → ~{comp['tokens_after']} token (hemat {comp['saved_ratio']:.0%}) · "
+              f"kecocokan field {comp['field_agreement']:.0%}")
+    fused = result.get("fused")
+    if fused:
+        print(f"Fused vs dua langkah ({fused['docs']} CV): total p50 {fused['fused_p50_ms']} vs {fused['two_step_p50_ms']} ms · "
+              f"profil tampil p50 {fused['fused_profile_p50_ms']} vs {fused['two_step_profile_p50_ms']} ms · "
+              f"sukses fused {fused['fused_success_rate']:.0%}")
+        print(f"  kecocokan: field profil {fused['profile_field_agreement']:.0%} · skill (Jaccard) {fused['skills_jaccard']:.2f} · "
+              f"posisi sama {fused['title_overlap']:.0%} · selisih skor {fused['score_diff']}")
+    sem = result.get("semantic_cache")
+    if sem:
+        print(f"Cache semantik: {sem['hits']} hit / {sem['misses']} miss ({sem['hit_rate']:.0%}) · {sem['entries']} entri · "
+              f"kalibrasi {sem['calibration_pairs'] - sem['calibration_errors']}/{sem['calibration_pairs']} benar")
+    sched = result.get("scheduler")
+    if sched:
+        print(f"Scheduler LLM: {sched['requests']} request → {sched['upstream_calls']} panggilan upstream · "
+              f"{sched['coalesced']} digabung · {sched['retries']} retry")
+    for task, route in (result.get("routing") or {}).items():
+        parts = []
+        for tier, t in route["tiers"].items():
+            parse = f", parse {t['parse_rate']:.0%}" if t["parse_rate"] is not None else ""
+            parts.append(f"{tier} {t['calls']}x p95 {t['p95_ms']} ms{parse}")
+        print(f"Routing {task:<9} → {route['tier']:<9} " + " · ".join(parts))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PAKAR offline benchmark (FakeChatModel).")
+    parser.add_argument("--docs", type=int, default=10, help="Jumlah CV sintetis (PDF & TXT).")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=50, help="Latensi sebelum token pertama per panggilan LLM.")
+    parser.add_argument("--tokens-per-s", type=float, default=400, help="Kecepatan output token (0 = instan).")
+    parser.add_argument("--malformed-rate", type=float, default=0.1, help="Peluang output JSON terpotong.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus", help="Folder korpus (default .bench_corpus/n<docs>).")
+    parser.add_argument("--tier-latency-ms", help="Latensi per tier model, mis. fast=20,standard=50,pro=300 (default: --latency-ms untuk semua).")
+    parser.add_argument("--json", help="Simpan hasil lengkap ke file JSON.")
+    parser.add_argument("--save-baseline", help="Simpan hasil sebagai baseline.")
+    parser.add_argument("--baseline", help="Bandingkan dengan baseline; exit 1 jika regresi.")
+    parser.add_argument("--token-tolerance", type=float, default=0.02, help="Toleransi kenaikan estimasi token (default 2%%).")
+    parser.add_argument("--timing-tolerance", type=float, help="Gate waktu ternormalisasi (p50/p95 ÷ kalibrasi), mis. 0.5; default tidak di-gate.")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args.docs, args.concurrency, args.latency_ms, args.tokens_per_s, args.malformed_rate, args.seed, args.corpus, args.tier_latency_ms)
+    print_report(result)
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f: json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f: baseline = json.load(f)
+        if baseline.get("config") != result["config"]:
+            print(f"⚠ Konfigurasi berbeda dari baseline: {baseline.get('config')}")
+        problems = compare(result, baseline, args.token_tolerance, args.timing_tolerance)
+        if problems:
+            print("\n❌ REGRESI PERFORMA TERDETEKSI:")
+            for p in problems: print(f"  - {p}")
+            return 1
+        print("\n✅ Tidak ada regresi terhadap baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+# ==========================================
+# RESULT CACHE (CONTENT-ADDRESSED, DISK-BACKED)
+# ==========================================
+# Menyimpan hasil tervalidasi (ResumeData / CareerAnalysis) di disk sehingga
+# CV yang sama tidak perlu dikirim ulang ke LLM. Key dibentuk dari hash isi
+# file + nama model + temperature + versi prompt.
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def cache_key(content: bytes, stage: str, model: str, temperature: float, prompt_version: str) -> str:
+    """Key deterministik untuk satu tahap pipeline atas satu file."""
+    meta = json.dumps([stage, model, temperature, prompt_version], separators=(",", ":"))
+    return hashlib.sha256(f"{content_hash(content)}|{meta}".encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, directory=".pakar_cache", max_entries=500, max_bytes=50 * 1024 * 1024, max_age=7 * 24 * 3600):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key, model_cls):
+        """Kembalikan instance `model_cls` jika ada & belum kedaluwarsa, selain itu None."""
+        path = self._path(key)
+        with self._lock:
+            try:
+                if time.time() - os.path.getmtime(path) > self.max_age:
+                    self._remove(path)
+                    self._stats["misses"] += 1
+                    return None
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+                obj = model_cls(**entry["data"])
+            except Exception:
+                # File hilang, rusak, atau skema model berubah -> anggap miss
+                if os.path.exists(path): self._remove(path)
+                self._stats["misses"] += 1
+                return None
+            os.utime(path)  # tandai baru dipakai (untuk eviksi LRU)
+            self._stats["hits"] += 1
+            return obj
+
+    def put(self, key, obj):
+        entry = {"model": type(obj).__name__, "created": time.time(), "data": obj.dict()}
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, path)
+            self._stats["writes"] += 1
+            self._evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"): continue
+            path = os.path.join(self.directory, name)
+            try: info = os.stat(path)
+            except OSError: continue
+            entries.append((info.st_mtime, info.st_size, path))
+        return entries
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            self._stats["evictions"] += 1
+        except OSError:
+            pass
+
+    def _evict(self):
+        now = time.time()
+        entries = []
+        for mtime, size, path in self._entries():
+            if now - mtime > self.max_age: self._remove(path)
+            else: entries.append((mtime, size, path))
+        # Hapus entry yang paling lama tidak dipakai sampai di bawah batas
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+            _, size, path = entries.pop(0)
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            for _, _, path in self._entries(): self._remove(path)
+
+    def stats(self):
+        with self._lock:
+            entries = self._entries()
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["entries"] = len(entries)
+        stats["bytes"] = sum(size for _, size, _ in entries)
+        return stats
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_result_cache():
+    """Cache global per proses (bertahan antar rerun Streamlit)."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache(
+                directory=os.environ.get("PAKAR_CACHE_DIR", ".pakar_cache"),
+                max_bytes=int(float(os.environ.get("PAKAR_CACHE_MAX_MB", "50")) * 1024 * 1024),
+                max_age=float(os.environ.get("PAKAR_CACHE_TTL_HOURS", "168")) * 3600,
+            )
+        return _default_cache
@@ -0,0 +1,88 @@
+from langchain_core.messages import HumanMessage
+
+# ==========================================
+# CHAT MEMORY (TOKEN-BUDGETED)
+# ==========================================
+# Prompt agent tidak lagi membawa seluruh chat_history: N giliran terakhir dikirim
+# apa adanya, giliran yang lebih lama dilipat ke ringkasan yang diperbarui bertahap,
+# dan profil dikirim sebagai digest ringkas (bukan str(parsed_data)).
+
+def estimate_tokens(text):
+    """Estimasi kasar jumlah token (~4 karakter per token), tanpa panggilan API."""
+    return (len(text) + 3) // 4 if text else 0
+
+
+def messages_tokens(messages):
+    return sum(estimate_tokens(str(m.content)) for m in messages)
+
+
+def _clip(text, max_chars):
+    text = " ".join(str(text).split())
+    return text if len(text) <= max_chars else text[: max_chars - 1].rstrip() + "…"
+
+
+def build_profile_digest(data, advice, max_chars=240):
+    """Ringkasan profil + hasil analisis dalam beberapa baris pendek."""
+    lines = [
+        f"Nama: {data['nama_kandidat']} | Pendidikan: {_clip(data['pendidikan_tertinggi'], 80)}",
+        f"Skill: {', '.join(data['skills_utama'][:10])}",
+        f"Ringkasan: {_clip(data['ringkasan_cv'], max_chars)}",
+    ]
+    if advice:
+        recs = ", ".join(f"{r['judul_pekerjaan']} ({r['skor_kecocokan']})" for r in advice['rekomendasi'])
+        lines.append(f"Rekomendasi: {recs}")
+        lines.append(f"Gap: {_clip(advice['analisis_gap'], max_chars)}")
+    return "\n".join(lines)
+
+
+def transcript(messages, max_chars_per_message=400):
+    return "\n".join(
+        f"{'User' if isinstance(m, HumanMessage) else 'Coach'}: {_clip(m.content, max_chars_per_message)}"
+        for m in messages
+    )
+
+
+class ChatMemory:
+    """Jendela percakapan: maksimal `recent_turns` giliran terakhir verbatim + ringkasan sisanya.
+
+    `summarize_fn(previous_summary, messages) -> str` dipanggil hanya ketika minimal
+    `fold_every` giliran baru keluar dari jendela (biaya ringkasan teramortisasi), atau
+    ketika giliran verbatim melebihi `recent_token_budget`.
+    """
+
+    def __init__(self, summarize_fn, recent_turns=4, fold_every=2, recent_token_budget=1500, summary_token_budget=300):
+        self.summarize_fn = summarize_fn
+        self.recent_turns = recent_turns
+        self.fold_every = fold_every
+        self.recent_token_budget = recent_token_budget
+        self.summary_token_budget = summary_token_budget
+        self.summary = ""
+        self.summarized_upto = 0
+
+    def reset(self):
+        self.summary = ""
+        self.summarized_upto = 0
+
+    def window(self, history):
+        """Return (summary, recent_messages) untuk history (tanpa pesan query saat ini)."""
+        if self.summarized_upto > len(history): self.reset()  # history di-reset dari luar
+        cut = max(0, len(history) - 2 * self.recent_turns)
+        over_budget = messages_tokens(history[self.summarized_upto:]) > self.recent_token_budget
+        if over_budget:
+            # Giliran terakhir selalu dikirim verbatim; sisanya dilipat sampai muat budget
+            cut = max(cut, self.summarized_upto)
+            while cut < len(history) - 2 and messages_tokens(history[cut:]) > self.recent_token_budget:
+                cut += 2
+        if cut > self.summarized_upto and (over_budget or cut - self.summarized_upto >= 2 * self.fold_every):
+            self._fold(history[self.summarized_upto:cut])
+            self.summarized_upto = cut
+        return self.summary, history[self.summarized_upto:]
+
+    def _fold(self, messages):
+        try:
+            summary = self.summarize_fn(self.summary, messages)
+        except Exception:
+            # Gagal meringkas -> tetap batasi ukuran dengan transkrip terpotong
+            summary = f"{self.summary}\n{transcript(messages, 120)}".strip()
+        max_chars = self.summary_token_budget * 4
+        self.summary = summary if len(summary) <= max_chars else "…" + summary[-max_chars:]
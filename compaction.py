@@ -0,0 +1,190 @@
+import re
+import math
+from collections import Counter
+from dataclasses import dataclass, field
+
+from chat_memory import estimate_tokens
+
+# ==========================================
+# CV TEXT COMPACTION (SEBELUM PANGGILAN LLM)
+# ==========================================
+# Teks hasil ekstraksi dirapikan sebelum dikirim ke parser resume: header/footer
+# yang berulang di tiap halaman & nomor halaman dibuang, spasi dinormalisasi, kata
+# yang terpotong tanda hubung di akhir baris disambung, dan baris kontak/referensi
+# dihapus. Jika masih melebihi token budget, bagian CV diprioritaskan (pengalaman &
+# skill dulu) dan bagian berprioritas rendah dipotong lebih dulu.
+
+# (nama bagian, prioritas: makin kecil makin penting, kata kunci heading)
+SECTIONS = [
+    ("experience", 1, ("pengalaman", "experience", "pengalaman kerja", "work experience", "professional experience",
+                       "work history", "riwayat pekerjaan", "riwayat kerja", "employment")),
+    ("skills", 1, ("keahlian", "skills", "skill", "kemampuan", "kompetensi", "technical skills")),
+    ("summary", 2, ("ringkasan", "profil", "profile", "summary", "tentang saya", "about me", "objective")),
+    ("education", 3, ("pendidikan", "education", "riwayat pendidikan")),
+    ("projects", 4, ("proyek", "projects", "portofolio", "portfolio")),
+    ("certifications", 5, ("sertifikasi", "sertifikat", "certifications", "certificates", "pelatihan", "training", "kursus")),
+    ("organization", 6, ("organisasi", "organization", "volunteer", "kepanitiaan")),
+    ("awards", 7, ("penghargaan", "prestasi", "awards", "achievements")),
+    ("languages", 8, ("bahasa", "languages")),
+    ("interests", 10, ("hobi", "minat", "interests", "hobbies")),
+    ("contact", 11, ("kontak", "contact", "data pribadi", "personal information", "informasi pribadi")),
+    ("references", 12, ("referensi", "references", "referees")),
+]
+IDENTITY_LINES = 2    # baris pertama CV (nama kandidat) selalu dipertahankan
+HEADER_PRIORITY = 2   # sisa blok sebelum heading pertama (biasanya ringkasan singkat)
+OTHER_PRIORITY = 9
+DROP_SECTIONS = {"references"}
+
+# Nomor halaman berlabel ("Page 2", "Halaman 1 dari 3", "2 / 5"); angka polos hanya dibuang
+# jika berulang di batas halaman (lihat _page_number_lines), agar baris tahun tetap utuh
+_PAGE_NUMBER_RE = re.compile(r"^((page|halaman|hal\.?)\s*\d+(\s*(of|dari|/)\s*\d+)?|\d+\s*(of|dari|/)\s*\d+)$", re.I)
+_BARE_NUMBER_RE = re.compile(r"^\d{1,4}$")
+_CONTACT_RE = re.compile(
+    r"[\w.+-]+@[\w-]+\.[\w.]+|https?://\S+|www\.\S+|linkedin\.com/\S*|github\.com/\S*|(\+62|\b0)\s?8\d[\d\s-]{6,}",
+    re.I,
+)
+_CONTACT_LABEL_RE = re.compile(r"^(e-?mail|telp|telepon|phone|hp|no\.? ?hp|whatsapp|wa|alamat|address|linkedin|github)\s*[:|]", re.I)
+
+
+@dataclass
+class CompactionResult:
+    text: str
+    tokens_before: int
+    tokens_after: int
+    dropped_repeated: int = 0
+    dropped_boilerplate: int = 0
+    truncated_sections: list = field(default_factory=list)
+
+    @property
+    def saved_ratio(self):
+        return 1 - self.tokens_after / self.tokens_before if self.tokens_before else 0.0
+
+
+def _normalize(line):
+    return " ".join(line.split())
+
+
+def _fingerprint(line):
+    # Angka diabaikan agar "Halaman 1 dari 3" / "Page 2" dianggap baris yang sama
+    return re.sub(r"\d+", "#", line.lower())
+
+
+def _dehyphenate(lines):
+    out = []
+    for line in lines:
+        if out and re.search(r"[A-Za-z]{2}-$", out[-1]) and re.match(r"[a-z]", line):
+            word, _, rest = line.partition(" ")
+            out[-1] = out[-1][:-1] + word
+            if rest: out.append(rest)
+        else:
+            out.append(line)
+    return out
+
+
+def _section_of(line):
+    """Nama bagian jika `line` terlihat seperti heading, selain itu None."""
+    raw = line.strip(" #*-•|")
+    text = raw.lower()
+    if not text: return None
+    # Heading = persis kata kunci ("Keahlian"), berlabel ("Keahlian: Python, SQL"), atau baris pendek
+    # huruf besar / berakhiran titik dua ("PENGALAMAN KERJA", "Pengalaman Kerja:"). Item daftar
+    # seperti "Bahasa Inggris (aktif)" di bagian skill bukan heading.
+    title = text.rstrip(": ")
+    heading_like = len(text) <= 40 and len(text.split()) <= 4 and (raw.isupper() or text.endswith(":"))
+    for name, _, keywords in SECTIONS:
+        for k in keywords:
+            if title == k or text.startswith(k + ":") or (heading_like and title.startswith(k + " ")): return name
+    return None
+
+
+def _page_number_lines(pages):
+    """Posisi (halaman, baris) nomor halaman: baris berlabel, atau angka polos di baris pertama/terakhir
+    halaman yang muncul di batas halaman pada minimal dua halaman."""
+    marked = {(p, i) for p, page in enumerate(pages) for i, line in enumerate(page) if _PAGE_NUMBER_RE.match(line)}
+    bare = {(p, i) for p, page in enumerate(pages) for i in {0, len(page) - 1}
+            if page and _BARE_NUMBER_RE.match(page[i])}
+    if len({p for p, _ in bare}) >= 2: marked |= bare
+    return marked
+
+
+def _drop_repeated(pages):
+    """Buang baris yang muncul di banyak halaman (header/footer) & nomor halaman. Return (pages, dropped)."""
+    page_numbers = _page_number_lines(pages)
+    # Hanya baris berhuruf yang dihitung sebagai header/footer berulang ("2019" di dua halaman bukan footer)
+    counts = Counter(fp for page in pages for fp in {_fingerprint(l) for l in page} if re.search(r"[a-z]", fp))
+    threshold = max(2, math.ceil(len(pages) / 2))
+    seen, result, dropped = set(), [], 0
+    for p, page in enumerate(pages):
+        kept = []
+        for i, line in enumerate(page):
+            fp = _fingerprint(line)
+            repeated = len(pages) > 1 and counts[fp] >= threshold
+            if (p, i) in page_numbers or (repeated and fp in seen):
+                dropped += 1
+                continue
+            if repeated: seen.add(fp)  # kemunculan pertama tetap dipakai (mis. nama kandidat)
+            kept.append(line)
+        result.append(kept)
+    return result, dropped
+
+
+def _split_sections(lines):
+    sections = [["identity", 0, []], ["header", HEADER_PRIORITY, []]]
+    priorities = {name: prio for name, prio, _ in SECTIONS}
+    for line in lines:
+        name = _section_of(line)
+        if name: sections.append([name, priorities[name], []])
+        elif len(sections) == 2 and len(sections[0][2]) < IDENTITY_LINES: sections[0][2].append(line); continue
+        sections[-1][2].append(line)
+    return [s for s in sections if s[2]]
+
+
+def compact_cv(pages, token_budget=3000):
+    """Ringkas teks CV (list teks per halaman atau satu string) agar muat di `token_budget` token."""
+    if isinstance(pages, str): pages = [pages]
+    tokens_before = estimate_tokens("\n\n".join(pages))
+    page_lines = [[_normalize(l) for l in page.splitlines()] for page in pages]
+    page_lines = [[l for l in page if l] for page in page_lines]
+    page_lines, dropped_repeated = _drop_repeated(page_lines)
+    lines = _dehyphenate([l for page in page_lines for l in page])
+
+    dropped_boilerplate = 0
+    sections = []
+    for name, prio, section_lines in _split_sections(lines):
+        if name in DROP_SECTIONS:
+            dropped_boilerplate += len(section_lines)
+            continue
+        kept = []
+        for line in section_lines:
+            # Baris kontak (email, telepon, URL, alamat) tidak dipakai oleh skema resume
+            if _CONTACT_LABEL_RE.match(line):
+                dropped_boilerplate += 1
+                continue
+            if _CONTACT_RE.search(line):
+                line = _CONTACT_RE.sub("", line).strip(" |,;:-•")
+                if len(line) < 12:
+                    dropped_boilerplate += 1
+                    continue
+            kept.append(line)
+        if kept: sections.append((name, prio, kept))
+
+    # Alokasikan budget per prioritas; urutan asli bagian tetap dipertahankan di output
+    remaining = token_budget
+    budgeted = {}
+    truncated = []
+    for idx in sorted(range(len(sections)), key=lambda i: (sections[i][1], i)):
+        name, _, section_lines = sections[idx]
+        kept = []
+        for line in section_lines:
+            cost = estimate_tokens(line) + 1
+            if cost > remaining: break
+            kept.append(line)
+            remaining -= cost
+        if len(kept) == 1 < len(section_lines) and name not in ("identity", "header"):
+            remaining += estimate_tokens(kept.pop()) + 1  # heading tanpa isi tidak berguna
+        if len(kept) < len(section_lines): truncated.append(name)
+        budgeted[idx] = kept
+    text = "\n".join(line for idx in range(len(sections)) for line in budgeted.get(idx, []))
+    return CompactionResult(text=text, tokens_before=tokens_before, tokens_after=estimate_tokens(text),
+                            dropped_repeated=dropped_repeated, dropped_boilerplate=dropped_boilerplate,
+                            truncated_sections=truncated)
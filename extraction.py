@@ -0,0 +1,196 @@
+import io
+import os
+import re
+import time
+import zipfile
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
+
+from chat_memory import estimate_tokens
+
+# ==========================================
+# DOCUMENT EXTRACTION (IN-MEMORY, PER HALAMAN)
+# ==========================================
+# Upload dibaca langsung dari buffer memori (tanpa file sementara di disk).
+# Setiap format didaftarkan lewat `register_loader`; loader mengembalikan daftar
+# fungsi ekstraksi per halaman yang dijalankan paralel di worker pool. Teks
+# halaman dikonsumsi berurutan dan ekstraksi dihentikan begitu token budget
+# tercapai (halaman sisanya dibatalkan).
+
+_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("PAKAR_EXTRACT_WORKERS", "4")),
+    thread_name_prefix="pakar-extract",
+)
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("PAKAR_EXTRACT_TOKEN_BUDGET", "12000"))
+
+_LOADERS = {}
+
+
+def register_loader(*extensions):
+    """Decorator: daftarkan loader `fn(data: bytes) -> list[callable() -> str]` untuk ekstensi tertentu."""
+    def decorator(fn):
+        for ext in extensions: _LOADERS[ext.lower()] = fn
+        return fn
+    return decorator
+
+
+def supported_extensions():
+    return sorted(_LOADERS)
+
+
+def get_loader(filename):
+    return _LOADERS.get(os.path.splitext(filename)[1].lower())
+
+
+class DocumentError(ValueError):
+    """File upload tidak bisa dibaca (format tidak didukung, rusak, atau terenkripsi)."""
+
+
+@dataclass
+class PageText:
+    page: int
+    text: str
+    tokens: int
+    ms: float
+
+
+@dataclass
+class ExtractionResult:
+    text: str
+    pages: list = field(default_factory=list)  # [PageText] yang benar-benar dipakai
+    total_pages: int = 0
+    truncated: bool = False
+    ms: float = 0.0
+
+
+def _decode(data):
+    for encoding in ("utf-8-sig", "cp1252"):
+        try: return bytes(data).decode(encoding)
+        except UnicodeDecodeError: continue
+    return bytes(data).decode("utf-8", errors="replace")
+
+
+def _static_pages(texts):
+    return [lambda t=t: t for t in texts]
+
+
+@register_loader(".pdf")
+def load_pdf(data):
+    from pypdf import PdfReader
+    data = bytes(data)
+    # PdfReader membaca objek secara lazy dari stream yang sama -> satu reader per thread
+    local = threading.local()
+
+    def reader():
+        if not hasattr(local, "reader"): local.reader = PdfReader(io.BytesIO(data))
+        return local.reader
+
+    return [lambda i=i: reader().pages[i].extract_text() or "" for i in range(len(reader().pages))]
+
+
+@register_loader(".txt")
+def load_text(data):
+    # Form feed dianggap pemisah halaman (mis. hasil pdftotext)
+    return _static_pages(_decode(data).split("\f"))
+
+
+_MD_PATTERNS = [
+    (re.compile(r"^```.*$", re.M), ""),                 # pagar blok kode
+    (re.compile(r"!\[([^\]]*)\]\([^)]*\)"), r"\1"),      # gambar -> alt text
+    (re.compile(r"\[([^\]]+)\]\([^)]*\)"), r"\1"),       # link -> teks link
+    (re.compile(r"^\s{0,3}#{1,6}\s*", re.M), ""),         # heading
+    (re.compile(r"^\s{0,3}>\s?", re.M), ""),              # blockquote
+    (re.compile(r"(\*\*|\*|`)(?=\S)(.+?)(?<=\S)\1"), r"\2"),         # bold/italic & inline code
+    (re.compile(r"(?<!\w)(__|_)(?=\S)(.+?)(?<=\S)\1(?!\w)"), r"\2"),  # _italic_ (bukan snake_case)
+    (re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$", re.M), ""),  # garis horizontal
+]
+
+
+@register_loader(".md", ".markdown")
+def load_markdown(data):
+    text = _decode(data)
+    for pattern, repl in _MD_PATTERNS: text = pattern.sub(repl, text)
+    return _static_pages([text])
+
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+@register_loader(".docx")
+def load_docx(data):
+    with zipfile.ZipFile(io.BytesIO(bytes(data))) as archive:
+        root = ElementTree.fromstring(archive.read("word/document.xml"))
+    pages, lines = [], []
+    for para in root.iter(f"{_W}p"):
+        parts = []
+        for node in para.iter():
+            if node.tag == f"{_W}t": parts.append(node.text or "")
+            elif node.tag == f"{_W}tab": parts.append("\t")
+            elif node.tag == f"{_W}br" and node.get(f"{_W}type") == "page":
+                lines.append("".join(parts))
+                pages.append("\n".join(lines))
+                parts, lines = [], []
+        lines.append("".join(parts))
+    pages.append("\n".join(lines))
+    return _static_pages(pages)
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    text = fn()
+    return text, (time.perf_counter() - start) * 1000
+
+
+def _page_fns(filename, data):
+    loader = get_loader(filename)
+    if loader is None: raise DocumentError(f"Format file tidak didukung: {filename}")
+    try: return loader(data)
+    except Exception as e: raise DocumentError(f"Gagal membaca {filename}: {e}") from e
+
+
+def _iter_pages(page_fns, token_budget, executor):
+    executor = executor or _EXECUTOR
+    window = max(1, getattr(executor, "_max_workers", 4))
+    futures = {}
+    used = 0
+    try:
+        for i in range(len(page_fns)):
+            for j in range(i, min(i + window, len(page_fns))):
+                if j not in futures: futures[j] = executor.submit(_timed, page_fns[j])
+            try: text, ms = futures.pop(i).result()
+            except Exception as e: raise DocumentError(f"Gagal membaca halaman {i + 1}: {e}") from e
+            tokens = estimate_tokens(text)
+            used += tokens
+            yield PageText(page=i + 1, text=text, tokens=tokens, ms=round(ms, 2))
+            if token_budget and used >= token_budget: return
+    finally:
+        for future in futures.values(): future.cancel()
+
+
+def iter_pages(filename, data, token_budget=DEFAULT_TOKEN_BUDGET, executor=None):
+    """Yield PageText berurutan; berhenti setelah halaman yang membuat total token >= budget.
+
+    Paling banyak `max_workers` halaman diekstrak di depan halaman yang sedang dikonsumsi.
+    """
+    return _iter_pages(_page_fns(filename, data), token_budget, executor)
+
+
+def extract_document(filename, data, token_budget=DEFAULT_TOKEN_BUDGET, executor=None):
+    """Ekstrak teks dokumen dari bytes/buffer. Teks dipotong di batas token budget."""
+    start = time.perf_counter()
+    page_fns = _page_fns(filename, data)
+    pages, used, cut = [], 0, False
+    for page in _iter_pages(page_fns, token_budget, executor):
+        if token_budget and used + page.tokens > token_budget:
+            # potong halaman terakhir tepat di budget (≈4 karakter per token)
+            page.text = page.text[: max(0, token_budget - used) * 4]
+            page.tokens = estimate_tokens(page.text)
+            cut = True
+        used += page.tokens
+        pages.append(page)
+    truncated = cut or len(pages) < len(page_fns)
+    text = "\n\n".join(p.text.strip() for p in pages if p.text.strip())
+    return ExtractionResult(text=text, pages=pages, total_pages=len(page_fns), truncated=truncated,
+                            ms=round((time.perf_counter() - start) * 1000, 2))
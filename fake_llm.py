@@ -0,0 +1,262 @@
+import re
+import json
+import time
+import random
+import itertools
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from prompts import FUSED_ANALYSIS_MARKER, FUSED_PROFILE_MARKER
+
+# ==========================================
+# STAND-IN CHAT MODEL (OFFLINE)
+# ==========================================
+# Pengganti ChatGoogleGenerativeAI untuk mode batch/offline & benchmark: tidak ada
+# panggilan jaringan, output deterministik dan mengikuti skema JSON yang diminta prompt.
+# Agent tool-calling juga disimulasikan (kata kunci -> tool_call).
+
+KNOWN_SKILLS = [
+    "Python", "SQL", "Java", "JavaScript", "TypeScript", "React", "Node.js", "Go", "C++",
+    "Machine Learning", "Deep Learning", "TensorFlow", "PyTorch", "Pandas", "NumPy",
+    "Excel", "Tableau", "Power BI", "Docker", "Kubernetes", "AWS", "GCP", "Azure",
+    "Linux", "Git", "Figma", "UI/UX", "Flutter", "Kotlin", "Swift", "Statistik",
+    "Data Analysis", "Project Management", "Komunikasi", "Leadership", "Marketing",
+]
+
+ROLE_BY_SKILL = {
+    "Python": "Data Scientist", "Machine Learning": "Machine Learning Engineer",
+    "SQL": "Data Analyst", "Excel": "Business Analyst", "Tableau": "BI Analyst",
+    "Power BI": "BI Analyst", "JavaScript": "Frontend Developer", "React": "Frontend Developer",
+    "Node.js": "Backend Developer", "Java": "Backend Developer", "Go": "Backend Developer",
+    "Docker": "DevOps Engineer", "Kubernetes": "DevOps Engineer", "AWS": "Cloud Engineer",
+    "Figma": "UI/UX Designer", "UI/UX": "UI/UX Designer", "Flutter": "Mobile Developer",
+    "Kotlin": "Mobile Developer", "Marketing": "Digital Marketing Specialist",
+}
+
+
+def _fenced(payload):
+    return "```json\n" + json.dumps(payload, ensure_ascii=False, indent=2) + "\n```"
+
+
+def _find_skills(text):
+    lowered = text.lower()
+    found = [s for s in KNOWN_SKILLS if re.search(r"(?<![\w])" + re.escape(s.lower()) + r"(?![\w])", lowered)]
+    return found[:10] or ["Komunikasi"]
+
+
+def _fake_resume(text):
+    lines = [l.strip() for l in text.splitlines() if l.strip()]
+    name = lines[0][:60] if lines else "Kandidat"
+    edu = next((l for l in lines if re.search(r"\b(S1|S2|S3|D3|Sarjana|Bachelor|Master|Universitas|University)\b", l)), "Tidak disebutkan")
+    sentences = re.split(r"(?<=[.!?])\s+", " ".join(lines[1:]))
+    summary = " ".join(sentences[:2])[:300] or "Profil kandidat."
+    return {"nama_kandidat": name, "pendidikan_tertinggi": edu[:120], "skills_utama": _find_skills(text), "ringkasan_cv": summary}
+
+
+def _fake_career(profile):
+    roles = []
+    for skill in _find_skills(profile):
+        role = ROLE_BY_SKILL.get(skill)
+        if role and role not in roles: roles.append(role)
+    for role in ["Data Analyst", "Software Engineer", "Project Coordinator"]:
+        if len(roles) >= 3: break
+        if role not in roles: roles.append(role)
+    recs = [
+        {"judul_pekerjaan": role, "skor_kecocokan": f"{88 - i * 9}%", "alasan": f"Skill kandidat relevan untuk posisi {role}."}
+        for i, role in enumerate(roles[:3])
+    ]
+    return {"rekomendasi": recs, "analisis_gap": "Perdalam proyek portofolio dan sertifikasi yang relevan dengan posisi target."}
+
+
+def _fake_fused(prompt):
+    # Posisi dipilih dari katalog di prompt (seperti model yang patuh instruksi)
+    catalog = prompt.split("judul dari katalog: ", 1)[-1].split("), alasan", 1)[0].split(", ")
+    resume = _fake_resume(prompt.split("Resume:\n", 1)[-1])
+    roles = []
+    for skill in resume["skills_utama"]:
+        role = ROLE_BY_SKILL.get(skill)
+        if role in catalog and role not in roles: roles.append(role)
+    for role in ["Data Analyst", "Software Engineer", "Project Manager"]:
+        if len(roles) >= 3: break
+        if role not in roles: roles.append(role)
+    recs = [{"judul_pekerjaan": role, "skor_kecocokan": f"{85 - i * 10}%", "alasan": f"Skill kandidat relevan untuk posisi {role}."}
+            for i, role in enumerate(roles[:3])]
+    analysis = {"rekomendasi": recs, "analisis_gap": "Perdalam proyek portofolio dan sertifikasi yang relevan dengan posisi target."}
+    # Dua bagian berpenanda, JSON ringkas seperti output streaming model
+    return (f"{FUSED_PROFILE_MARKER}\n{json.dumps(resume, ensure_ascii=False)}\n"
+            f"{FUSED_ANALYSIS_MARKER}\n{json.dumps(analysis, ensure_ascii=False)}")
+
+
+def _fake_narrative(prompt):
+    block = prompt.split("jangan diubah):", 1)[-1].split("\n\n", 1)[0]
+    titles = re.findall(r"^\d+\. (.+?) \(\d+%\)", block, re.M)
+    return {
+        "alasan": [f"Pengalaman dan skill kandidat sejalan dengan kebutuhan {t}." for t in titles],
+        "analisis_gap": "Fokus pada skill yang belum dimiliki melalui proyek portofolio dan sertifikasi.",
+    }
+
+
+def _fake_feedback(prompt):
+    answer = prompt.split("Jawaban Kandidat:", 1)[-1].split("\n\n", 1)[0]
+    score = min(100, 40 + len(answer.split()))
+    return {
+        "skor": score,
+        "feedback_positif": "Jawaban terstruktur dan relevan.",
+        "feedback_negatif": "Tambahkan contoh konkret dan hasil terukur.",
+        "jawaban_saran": "Gunakan metode STAR dengan angka hasil yang jelas.",
+    }
+
+
+QUESTION_TOPICS = [
+    "desain sistem", "debugging produksi", "optimasi performa", "kualitas data", "kolaborasi tim",
+    "prioritisasi", "keamanan", "pengujian", "arsitektur", "komunikasi stakeholder",
+]
+_question_counter = itertools.count(1)
+
+
+def _fake_questions(prompt):
+    match = re.search(r"Buatlah (\d+) pertanyaan interview .*? untuk posisi '([^']+)'", prompt)
+    n, job = (int(match.group(1)), match.group(2)) if match else (5, "posisi ini")
+    questions = []
+    for _ in range(n):
+        i = next(_question_counter)
+        questions.append(f"Sebagai {job}, bagaimana Anda menangani kasus {QUESTION_TOPICS[i % len(QUESTION_TOPICS)]} nomor {i}?")
+    return {"pertanyaan": questions}
+
+
+def fake_response(prompt: str) -> str:
+    """Respons deterministik berdasarkan jenis prompt yang dikenali."""
+    if "Analisis CV berikut dalam satu langkah" in prompt:
+        return _fake_fused(prompt)
+    if "Extract resume data" in prompt:
+        return _fenced(_fake_resume(prompt.split("Resume:\n", 1)[-1]))
+    if "Posisi yang paling cocok menurut pencocokan skill" in prompt:
+        return _fenced(_fake_narrative(prompt))
+    if "suggest 3 specific job titles" in prompt:
+        return _fenced(_fake_career(prompt))
+    if "pertanyaan interview" in prompt and "format JSON" in prompt:
+        return _fenced(_fake_questions(prompt))
+    if "Senior Interviewer" in prompt:
+        return _fenced(_fake_feedback(prompt))
+    return f"[offline] Respons simulasi untuk: {prompt.strip()[:120]}"
+
+
+TOOL_INTENTS = [
+    ("tool_study_plan", "skill_name", ("rencana belajar", "study plan", "roadmap", "kurikulum")),
+    ("tool_cover_letter", "job_title", ("cover letter", "surat lamaran")),
+    ("tool_linkedin_optimization", "role_target", ("linkedin", "personal branding")),
+]
+
+_seed = 0
+_call_ids = itertools.count(1)
+
+
+def seed(value):
+    """Set seed injeksi JSON rusak (untuk benchmark yang reproducible)."""
+    global _seed
+    _seed = value
+
+
+def _roll(probability, key):
+    # Ditentukan oleh seed + isi prompt, bukan urutan panggilan: hasil sama walau thread berbeda urutan
+    if probability <= 0: return False
+    return random.Random(f"{_seed}:{key}").random() < probability
+
+
+def _corrupt_json(text):
+    # Simulasikan output terpotong: buang ~40% bagian akhir (termasuk kurung penutup)
+    return text[: max(1, int(len(text) * 0.6))]
+
+
+def _tool_call_for(messages, tool_names):
+    """Tentukan tool yang akan dipanggil agent untuk pesan user terakhir (sekali per giliran)."""
+    if not tool_names or any(isinstance(m, ToolMessage) for m in messages): return None
+    human = next((m for m in reversed(messages) if isinstance(m, HumanMessage)), None)
+    if human is None: return None
+    text = str(human.content).lower()
+    for name, arg, keywords in TOOL_INTENTS:
+        if name in tool_names and any(k in text for k in keywords):
+            value = "Python"
+            for marker in ("skill", "posisi", "untuk"):
+                match = re.search(marker + r"[:\s]+([\w .+/#-]{2,40}?)(?:[.,]|$)", str(human.content), re.I)
+                if match:
+                    value = match.group(1).strip()
+                    break
+            return {"name": name, "args": {arg: value}, "id": f"call_{next(_call_ids)}"}
+    return None
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model offline dengan latensi, kecepatan token, dan injeksi JSON rusak yang dapat diatur."""
+
+    model: str = "fake-chat"
+    api_key: Optional[str] = None
+    temperature: float = 0.0
+    latency_s: float = 0.0          # jeda sebelum token pertama
+    tokens_per_s: float = 0.0       # 0 = seluruh output langsung tersedia
+    malformed_rate: float = 0.0     # peluang output JSON dipotong
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _respond(self, messages, tools, tool_choice=None):
+        tool_call = _tool_call_for(messages, tools)
+        if tool_call: return "", tool_call
+        tool_outputs = [str(m.content) for m in messages if isinstance(m, ToolMessage)]
+        if tool_outputs:
+            return f"Berikut hasil yang sudah saya siapkan:\n\n{tool_outputs[-1]}", None
+        prompt = "\n".join(str(m.content) for m in messages)
+        text = fake_response(prompt)
+        if text.startswith(("```json", FUSED_PROFILE_MARKER)) and _roll(self.malformed_rate, prompt): return _corrupt_json(text), None
+        if tool_choice and tools and text.startswith("```json"):
+            # Mode output terstruktur (with_structured_output): JSON dikirim sebagai argumen tool call
+            return "", {"name": tools[0], "args": json.loads(text[7:-3]), "id": f"call_{next(_call_ids)}"}
+        return text, None
+
+    def _usage(self, messages, text, tool_call=None):
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        output = text or (json.dumps(tool_call["args"], ensure_ascii=False) if tool_call else "")
+        return {"input_tokens": input_tokens, "output_tokens": len(output) // 4, "total_tokens": input_tokens + len(output) // 4}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        text, tool_call = self._respond(messages, kwargs.get("tools"), kwargs.get("tool_choice"))
+        # Argumen tool call (mode output terstruktur) juga token output yang perlu waktu generate
+        pieces = re.findall(r"\S+\s*|\s+", text or (json.dumps(tool_call["args"], ensure_ascii=False) if tool_call else ""))
+        time.sleep(self.latency_s + (len(pieces) / self.tokens_per_s if self.tokens_per_s else 0))
+        message = AIMessage(content=text, tool_calls=[tool_call] if tool_call else [], usage_metadata=self._usage(messages, text, tool_call))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        text, tool_call = self._respond(messages, kwargs.get("tools"), kwargs.get("tool_choice"))
+        time.sleep(self.latency_s)
+        if tool_call:
+            if self.tokens_per_s: time.sleep(len(re.findall(r"\S+\s*|\s+", json.dumps(tool_call["args"], ensure_ascii=False))) / self.tokens_per_s)
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": tool_call["name"], "args": json.dumps(tool_call["args"]), "id": tool_call["id"], "index": 0}
+            ]))
+            return
+        for piece in re.findall(r"\S+\s*|\s+", text):
+            if self.tokens_per_s: time.sleep(1 / self.tokens_per_s)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager: run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, text)))
+
+    def bind_tools(self, tools: Any, **kwargs: Any):
+        # Tool LangChain punya .name; skema Pydantic (with_structured_output) memakai nama kelasnya
+        names = [getattr(t, "name", None) or getattr(t, "__name__", None) or t.get("name") for t in tools]
+        return self.bind(tools=names, **kwargs)
+
+
+def tiered_factory(latency_by_model, **kwargs):
+    """Factory LLMPool: FakeChatModel dengan latensi berbeda per nama model (tier cepat vs lambat)."""
+    default_latency = kwargs.pop("latency_s", 0.0)
+
+    def factory(model, api_key=None, temperature=0.0):
+        return FakeChatModel(model=model, api_key=api_key, temperature=temperature,
+                             latency_s=latency_by_model.get(model, default_latency), **kwargs)
+    return factory
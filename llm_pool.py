@@ -0,0 +1,90 @@
+import hashlib
+import threading
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from llm_scheduler import ScheduledChatModel
+from telemetry import llm_trace_handler
+
+# ==========================================
+# LLM CLIENT POOL (PROCESS-WIDE)
+# ==========================================
+# Satu instance chat model per (model, temperature, api key). Instance yang sama
+# dipakai ulang di semua rerun Streamlit & thread, sehingga client HTTP/gRPC
+# di dalamnya (dan koneksinya) juga dipakai ulang. Setiap client dibungkus
+# ScheduledChatModel sehingga semua panggilan melewati LLMScheduler (rate limit per key,
+# coalescing, retry). Jika factory diganti (mis. FakeChatModel untuk batch --fake / load test),
+# identitas factory ikut masuk key cache hasil agar output pengganti tidak terbaca sebagai Gemini.
+
+def _factory_id(factory):
+    factory = getattr(factory, "func", factory)  # functools.partial
+    return f"{factory.__module__}.{factory.__qualname__}"
+
+
+def gemini_client(model, api_key, temperature):
+    # Retry hanya di LLMScheduler (token bucket + jitter); tanpa ini tiap percobaan scheduler bisa
+    # memicu retry tenacity client sendiri. Catatan: langchain-google-genai < 2.1 mengabaikan
+    # max_retries (tetap 2 percobaan di dalam client).
+    return ChatGoogleGenerativeAI(model=model, api_key=api_key, temperature=temperature, max_retries=1)
+
+
+class LLMPool:
+    def __init__(self, factory=gemini_client):
+        self._factory = factory
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "reused": 0}
+
+    @staticmethod
+    def _key(model, temperature, api_key):
+        # API key tidak disimpan mentah di key registry
+        key_id = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+        return (model, float(temperature), key_id)
+
+    def get(self, model, temperature, api_key):
+        key = self._key(model, temperature, api_key)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._stats["reused"] += 1
+                return client
+            # Setiap client membawa handler telemetry sehingga semua panggilan LLM tercatat
+            client = ScheduledChatModel(
+                inner=self._factory(model=model, api_key=api_key, temperature=temperature),
+                key_id=key[2], callbacks=[llm_trace_handler()],
+            )
+            self._clients[key] = client
+            self._stats["created"] += 1
+            return client
+
+    def cache_identity(self, model):
+        """Identitas `model` untuk key cache: nama model untuk Gemini, diberi awalan factory jika diganti."""
+        with self._lock:
+            factory = self._factory
+        return model if factory in (gemini_client, ChatGoogleGenerativeAI) else f"{_factory_id(factory)}:{model}"
+
+    def set_factory(self, factory):
+        """Ganti kelas/factory chat model (mis. model pengganti offline). Registry dikosongkan."""
+        with self._lock:
+            self._factory = factory
+            self._clients.clear()
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, clients=len(self._clients))
+        calls = stats["created"] + stats["reused"]
+        stats["reuse_rate"] = stats["reused"] / calls if calls else 0.0
+        return stats
+
+
+_default_pool = LLMPool()
+
+def get_llm_pool():
+    return _default_pool
+
+def get_llm(model, temperature, api_key):
+    return _default_pool.get(model, temperature, api_key)
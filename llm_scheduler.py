@@ -0,0 +1,381 @@
+import os
+import json
+import time
+import heapq
+import random
+import hashlib
+import itertools
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import CancelledError
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from telemetry import record_event
+
+# ==========================================
+# LLM CALL SCHEDULER (RATE LIMIT, COALESCING, BACKOFF)
+# ==========================================
+# Semua panggilan Gemini lewat satu scheduler per proses (dipasang oleh llm_pool):
+# - token bucket per API key, hanya jika PAKAR_LLM_RPM diisi (request/menit, burst
+#   PAKAR_LLM_BURST); default tanpa batas agar key berbayar tidak ikut diperlambat;
+# - lane prioritas: "interactive" (chat) > "normal" > "background" (prefetch, refill bank
+#   soal). Ringkasan memori chat tetap di lane "normal" karena dijalankan sinkron sebelum
+#   jawaban agent. Antrian per key dilayani menurut lane, lalu FIFO;
+# - single-flight: prompt identik yang sedang berjalan tidak dikirim ulang, pemanggil
+#   berikutnya menunggu/menumpang hasil (atau stream token) panggilan pertama;
+# - retry 429/5xx (dari status HTTP exception) & error jaringan sementara dengan exponential
+#   backoff + full jitter (PAKAR_LLM_MAX_RETRIES). Ini satu-satunya lapisan retry: retry
+#   internal client Gemini dimatikan di llm_pool.
+# Kedalaman antrian, waktu tunggu per lane, retry & jumlah coalescing tersedia di stats().
+
+LANES = ("interactive", "normal", "background")
+_lane = contextvars.ContextVar("pakar_llm_lane", default="normal")
+
+_RETRYABLE_CODES = {429, 500, 502, 503, 504}
+# Error jaringan sementara (tanpa status HTTP) yang layak dicoba ulang
+_TRANSIENT_ERRORS = (ConnectionError, TimeoutError)
+try:
+    import httpx
+    _TRANSIENT_ERRORS += (httpx.TransportError,)
+except ImportError:
+    pass
+
+
+@contextmanager
+def llm_lane(name):
+    """Semua panggilan LLM di dalam blok ini dijadwalkan di lane `name`."""
+    token = _lane.set(name if name in LANES else "normal")
+    try: yield
+    finally: _lane.reset(token)
+
+
+def current_lane():
+    return _lane.get()
+
+
+def status_code(exc):
+    """Status HTTP dari exception: `.code` (google.api_core), `.status_code`, atau `.response.status_code` (httpx)."""
+    for code in (getattr(exc, "code", None), getattr(exc, "status_code", None),
+                 getattr(getattr(exc, "response", None), "status_code", None)):
+        if isinstance(code, int) and not isinstance(code, bool): return code
+    return None
+
+
+def is_retryable(exc):
+    """True untuk status 429 / 5xx atau error jaringan sementara, termasuk yang dibungkus
+    LangChain (dicek sepanjang rantai __cause__/__context__). Isi pesan error tidak dipakai."""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, CancelledError): return False
+        code = status_code(exc)
+        if code is not None: return code in _RETRYABLE_CODES
+        if isinstance(exc, _TRANSIENT_ERRORS): return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def _percentile(values, q):
+    if not values: return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _Flight:
+    """Satu panggilan upstream yang sedang berjalan, dipakai bersama oleh pemanggil identik."""
+
+    def __init__(self, key_id):
+        self.key_id = key_id
+        self.cond = threading.Condition()
+        self.chunks = []
+        self.consumers = 0
+        self.result = None
+        self.error = None
+        self.abandoned = False
+        self.done = False
+
+    def finish(self, result=None, error=None, abandoned=False):
+        with self.cond:
+            self.result, self.error, self.abandoned, self.done = result, error, abandoned, True
+            self.cond.notify_all()
+
+
+class _Abandoned(Exception):
+    pass
+
+
+class LLMScheduler:
+    def __init__(self, rpm=0, burst=10, max_retries=4, base_delay=1.0, max_delay=30.0, sleep=time.sleep):
+        self.rate = rpm / 60.0          # token per detik; <= 0 berarti tanpa batas
+        self.burst = max(1.0, float(burst))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._cond = threading.Condition()
+        self._buckets = {}              # key_id -> [token, waktu refill terakhir]
+        self._queues = {}               # key_id -> heap (prioritas lane, urutan datang)
+        self._seq = itertools.count()
+        self._waits = {lane: deque(maxlen=1000) for lane in LANES}
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self.counters = {"requests": 0, "upstream_calls": 0, "coalesced": 0, "retries": 0, "failures": 0}
+
+    def _count(self, name, n=1):
+        with self._cond: self.counters[name] += n
+
+    # --- Token bucket + lane prioritas ---
+    def _refill(self, key_id):
+        now = time.monotonic()
+        bucket = self._buckets.get(key_id)
+        if bucket is None:
+            bucket = self._buckets[key_id] = [self.burst, now]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        return bucket[0]
+
+    def acquire(self, key_id, lane="normal"):
+        """Blok sampai key ini boleh mengirim satu request; return lama menunggu (detik)."""
+        start = time.monotonic()
+        if self.rate > 0:
+            entry = (LANES.index(lane) if lane in LANES else 1, next(self._seq))
+            with self._cond:
+                queue = self._queues.setdefault(key_id, [])
+                heapq.heappush(queue, entry)
+                try:
+                    while True:
+                        tokens = self._refill(key_id)
+                        if queue[0] == entry and tokens >= 1: break
+                        # Hanya kepala antrian yang menunggu token; sisanya menunggu giliran
+                        self._cond.wait((1 - tokens) / self.rate if queue[0] == entry else None)
+                    heapq.heappop(queue)
+                    self._buckets[key_id][0] -= 1
+                except BaseException:
+                    queue.remove(entry)
+                    heapq.heapify(queue)
+                    raise
+                finally:
+                    if not queue: self._queues.pop(key_id, None)
+                    self._cond.notify_all()
+        waited = time.monotonic() - start
+        with self._cond: self._waits[lane if lane in LANES else "normal"].append(waited)
+        return waited
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _retry_or_raise(self, attempt, error):
+        if attempt >= self.max_retries or not is_retryable(error):
+            self._count("failures")
+            raise error
+        delay = self._backoff(attempt)
+        self._count("retries")
+        record_event("llm_retry", attempt=attempt + 1, delay_ms=round(delay * 1000, 1), error=f"{type(error).__name__}: {error}"[:200])
+        self._sleep(delay)
+
+    def call(self, key_id, fn, lane=None):
+        """fn() dengan rate limit & retry (tanpa coalescing)."""
+        lane = lane or _lane.get()
+        for attempt in itertools.count():
+            self.acquire(key_id, lane)
+            self._count("upstream_calls")
+            try: return fn()
+            except Exception as e: self._retry_or_raise(attempt, e)
+
+    # --- Single-flight ---
+    def _join(self, flight_key, key_id):
+        with self._flights_lock:
+            flight = self._flights.get(flight_key)
+            leader = flight is None
+            if leader: flight = self._flights[flight_key] = _Flight(key_id)
+            with flight.cond: flight.consumers += 1
+            return flight, leader
+
+    def _land(self, flight_key, flight, **outcome):
+        # Dilepas dari registry lebih dulu: pemanggil baru setelah ini memulai panggilan baru
+        with self._flights_lock:
+            if self._flights.get(flight_key) is flight: del self._flights[flight_key]
+        flight.finish(**outcome)
+
+    def generate(self, flight_key, key_id, fn):
+        """Panggilan non-streaming; pemanggil identik yang bersamaan menerima salinan hasil yang sama."""
+        self._count("requests")
+        flight, leader = self._join(flight_key, key_id)
+        if leader:
+            try: result = self.call(key_id, fn)
+            except Exception as e:
+                self._land(flight_key, flight, error=e)
+                raise
+            except BaseException:
+                self._land(flight_key, flight, abandoned=True)
+                raise
+            self._land(flight_key, flight, result=result)
+            return result
+
+        with flight.cond:
+            while not flight.done: flight.cond.wait()
+        if flight.result is not None:
+            self._count("coalesced")
+            return flight.result.copy(deep=True)
+        # Error milik API key lain (mis. key tidak valid) tidak diteruskan ke pemanggil ini
+        if flight.abandoned or flight.key_id != key_id: return self.call(key_id, fn)
+        raise flight.error
+
+    def stream(self, flight_key, key_id, open_stream):
+        """Panggilan streaming; yield chunk. Stream upstream dijalankan thread pompa dan
+        disiarkan ke semua pemanggil identik; berhenti jika semua pemanggil pergi."""
+        self._count("requests")
+        flight, leader = self._join(flight_key, key_id)
+        if leader:
+            ctx = contextvars.copy_context()
+            threading.Thread(target=ctx.run, args=(self._pump, flight_key, flight, open_stream), daemon=True).start()
+        seen = 0
+        try:
+            while True:
+                with flight.cond:
+                    while seen >= len(flight.chunks) and not flight.done: flight.cond.wait()
+                    new, done = flight.chunks[seen:], flight.done
+                for chunk in new:
+                    seen += 1
+                    # Salinan: BaseChatModel.stream menulis id run ke message tiap chunk
+                    yield chunk.copy(deep=True)
+                if done: break
+        finally:
+            with flight.cond: flight.consumers -= 1
+        if flight.error is None and not flight.abandoned:
+            if not leader: self._count("coalesced")
+            return
+        if seen == 0 and (flight.abandoned or flight.key_id != key_id):
+            yield from self._own_stream(key_id, open_stream)
+            return
+        raise flight.error or CancelledError("Stream dibatalkan.")
+
+    def _own_stream(self, key_id, open_stream):
+        for attempt in itertools.count():
+            self.acquire(key_id, _lane.get())
+            self._count("upstream_calls")
+            emitted = False
+            try:
+                for chunk in open_stream():
+                    emitted = True
+                    yield chunk
+                return
+            except Exception as e:
+                if emitted: raise
+                self._retry_or_raise(attempt, e)
+
+    def _pump(self, flight_key, flight, open_stream):
+        error = None
+        abandoned = False
+        try:
+            for attempt in itertools.count():
+                self.acquire(flight.key_id, _lane.get())
+                self._count("upstream_calls")
+                stream = open_stream()
+                try:
+                    for chunk in stream:
+                        with flight.cond:
+                            if not flight.consumers: raise _Abandoned()
+                            flight.chunks.append(chunk)
+                            flight.cond.notify_all()
+                    break
+                except (_Abandoned, CancelledError):
+                    raise
+                except Exception as e:
+                    if flight.chunks:
+                        self._count("failures")
+                        raise
+                    self._retry_or_raise(attempt, e)
+                finally:
+                    stream.close()
+        except (_Abandoned, CancelledError):
+            abandoned = True
+        except Exception as e:
+            error = e
+        finally:
+            self._land(flight_key, flight, error=error, abandoned=abandoned)
+
+    def stats(self):
+        with self._cond:
+            depth = {lane: 0 for lane in LANES}
+            for queue in self._queues.values():
+                for priority, _ in queue: depth[LANES[priority]] += 1
+            waits = {lane: list(w) for lane, w in self._waits.items()}
+            stats = dict(self.counters, queue_depth=depth)
+        with self._flights_lock: stats["in_flight"] = len(self._flights)
+        stats["wait_ms"] = {
+            lane: {"n": len(w), "p50": round(_percentile(w, 0.5) * 1000, 1), "p95": round(_percentile(w, 0.95) * 1000, 1)}
+            for lane, w in waits.items() if w
+        }
+        stats["coalesce_rate"] = stats["coalesced"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
+
+
+def _message_key(message):
+    return [message.type, message.content, getattr(message, "tool_calls", None), getattr(message, "tool_call_id", None)]
+
+
+class ScheduledChatModel(BaseChatModel):
+    """Chat model yang meneruskan semua panggilan ke `inner` lewat LLMScheduler."""
+
+    inner: BaseChatModel
+    key_id: str = ""
+    scheduler: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return self.inner._llm_type
+
+    @property
+    def _identifying_params(self):
+        return self.inner._identifying_params
+
+    def _scheduler(self):
+        return self.scheduler or get_scheduler()
+
+    def _flight_key(self, mode, messages, stop, kwargs):
+        payload = [mode, self.inner._identifying_params, [_message_key(m) for m in messages], stop, kwargs]
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        return self._scheduler().generate(
+            self._flight_key("generate", messages, stop, kwargs), self.key_id,
+            lambda: self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs),
+        )
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        # Stream upstream tanpa run_manager; token diteruskan ke callback milik pemanggil ini
+        for chunk in self._scheduler().stream(
+            self._flight_key("stream", messages, stop, kwargs), self.key_id,
+            lambda: self.inner._stream(messages, stop=stop, **kwargs),
+        ):
+            if run_manager: run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def bind_tools(self, tools: Any, **kwargs: Any):
+        # Format tool milik model asli, tapi panggilan tetap lewat wrapper ini
+        return self.bind(**self.inner.bind_tools(tools, **kwargs).kwargs)
+
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+def get_scheduler():
+    """Scheduler global per proses; batas dari env PAKAR_LLM_RPM (kosong/0 = tanpa batas) /
+    PAKAR_LLM_BURST / PAKAR_LLM_MAX_RETRIES."""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = LLMScheduler(
+                rpm=float(os.environ.get("PAKAR_LLM_RPM") or 0),
+                burst=float(os.environ.get("PAKAR_LLM_BURST", "10")),
+                max_retries=int(os.environ.get("PAKAR_LLM_MAX_RETRIES", "4")),
+            )
+        return _default_scheduler
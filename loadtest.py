@@ -0,0 +1,195 @@
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import threading
+
+# Load test selalu offline kecuali --url menunjuk server yang sudah berjalan
+os.environ.setdefault("PAKAR_TRACE_FILE", "")
+os.environ.setdefault("PAKAR_FAKE_LLM", "1")
+os.environ.setdefault("GEMINI_API_KEY", "offline")
+
+import httpx
+
+from benchmark import AGENT_QUERIES, build_corpus, percentile
+
+# ==========================================
+# LOAD TEST HTTP API
+# ==========================================
+# Menjalankan api.py (uvicorn, in-process, FakeChatModel) lalu mensimulasikan N user
+# bersamaan: upload CV -> analisis -> chat streaming -> soal & penilaian interview.
+# Melaporkan latensi p50/p95 per endpoint, time-to-first-token chat, throughput,
+# dan jumlah 429 (batas per key) / error:
+#   python loadtest.py --users 20 --keys 2 --latency-ms 80
+#   python loadtest.py --url http://127.0.0.1:8080 --key $GEMINI_API_KEY   # server nyata
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(latency_ms, tokens_per_s):
+    """Start uvicorn di thread daemon; return (base_url, server)."""
+    os.environ["PAKAR_FAKE_LATENCY_MS"] = str(latency_ms)
+    os.environ["PAKAR_FAKE_TOKENS_PER_S"] = str(tokens_per_s)
+    import uvicorn
+    from api import api
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(api, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline: raise RuntimeError("Server API tidak bisa dijalankan.")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", server
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+        self.ttft = []
+
+    def add(self, endpoint, status, seconds):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        counts = self.statuses.setdefault(endpoint, {})
+        counts[status] = counts.get(status, 0) + 1
+
+    def report(self, wall_s):
+        endpoints = {}
+        for endpoint, values in self.latencies.items():
+            statuses = self.statuses[endpoint]
+            endpoints[endpoint] = {
+                "n": len(values),
+                "p50_ms": round(percentile(values, 0.5) * 1000, 1),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+                "ok": statuses.get(200, 0),
+                "throttled": statuses.get(429, 0),
+                "errors": sum(n for s, n in statuses.items() if s not in (200, 429)),
+            }
+        total = sum(e["n"] for e in endpoints.values())
+        return {
+            "wall_s": round(wall_s, 2),
+            "requests": total,
+            "rps": round(total / wall_s, 1) if wall_s else 0.0,
+            "chat_ttft_p50_ms": round(percentile(self.ttft, 0.5) * 1000, 1) if self.ttft else None,
+            "chat_ttft_p95_ms": round(percentile(self.ttft, 0.95) * 1000, 1) if self.ttft else None,
+            "endpoints": endpoints,
+        }
+
+
+async def _timed(recorder, endpoint, call):
+    start = time.perf_counter()
+    try:
+        response = await call()
+        status = response.status_code
+    except httpx.HTTPError:
+        response, status = None, 0
+    recorder.add(endpoint, status, time.perf_counter() - start)
+    return response if status == 200 else None
+
+
+async def _chat(client, recorder, headers, profile, career, query):
+    start = time.perf_counter()
+    status, first = 0, None
+    try:
+        async with client.stream("POST", "/v1/chat", headers=headers, json={
+            "query": query, "profile": profile, "career": career, "stream": True,
+        }) as response:
+            status = response.status_code
+            async for line in response.aiter_lines():
+                if status != 200 or not line: continue  # 429/4xx: body berisi {"detail": ...}
+                event = json.loads(line)
+                if first is None and event["event"] in ("token", "tool_start", "final"): first = time.perf_counter() - start
+                if event["event"] == "error": status = 500
+    except httpx.HTTPError:
+        status = 0
+    recorder.add("/v1/chat", status, time.perf_counter() - start)
+    if first is not None: recorder.ttft.append(first)
+
+
+async def simulate_user(client, recorder, user_id, api_key, cv_path, rng):
+    headers = {"X-Gemini-Key": api_key, "X-Session-Id": f"load-{user_id}"}
+    with open(cv_path, "rb") as f: data = f.read()
+    response = await _timed(recorder, "/v1/cv/analyze", lambda: client.post(
+        "/v1/cv/analyze", headers=headers, files={"file": (os.path.basename(cv_path), data)}))
+    if response is None: return
+    result = response.json()
+    profile, career = result["resume"], result["career"]
+    skills = profile.get("skills_utama") or ["Python"]
+    jobs = [j["judul_pekerjaan"] for j in (career or {}).get("rekomendasi", [])] or ["Data Analyst"]
+
+    await _chat(client, recorder, headers, profile, career, rng.choice(AGENT_QUERIES).format(skill=rng.choice(skills), job=jobs[0]))
+    response = await _timed(recorder, "/v1/interview/questions", lambda: client.post(
+        "/v1/interview/questions", headers=headers, json={"job_title": jobs[0], "n": 2}))
+    if response is None: return
+    for question in response.json()["questions"]:
+        await _timed(recorder, "/v1/interview/evaluate", lambda: client.post(
+            "/v1/interview/evaluate", headers=headers,
+            json={"question": question, "answer": "Saya akan menganalisis kebutuhan lalu mengujinya bertahap.", "job_title": jobs[0]}))
+
+
+async def run_load(base_url, users, keys, docs, corpus_dir, seed):
+    rng = random.Random(seed)
+    paths = build_corpus(corpus_dir or os.path.join(".bench_corpus", f"n{docs}"), docs)
+    api_keys = [os.environ.get("PAKAR_LOADTEST_KEY") or f"load-key-{i}" for i in range(keys)]
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=users * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            simulate_user(client, recorder, i, api_keys[i % keys], paths[i % len(paths)], random.Random(rng.random()))
+            for i in range(users)
+        ))
+        wall = time.perf_counter() - start
+    return recorder.report(wall)
+
+
+def print_report(result):
+    print(f"{result['requests']} request dalam {result['wall_s']} s ({result['rps']} req/s)")
+    if result["chat_ttft_p50_ms"] is not None:
+        print(f"chat time-to-first-token: p50 {result['chat_ttft_p50_ms']} ms | p95 {result['chat_ttft_p95_ms']} ms")
+    print(f"{'endpoint':<26}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'ok':>6}{'429':>6}{'err':>6}")
+    for endpoint, e in result["endpoints"].items():
+        print(f"{endpoint:<26}{e['n']:>5}{e['p50_ms']:>10}{e['p95_ms']:>10}{e['ok']:>6}{e['throttled']:>6}{e['errors']:>6}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PAKAR load test untuk HTTP API (default: server in-process + FakeChatModel).")
+    parser.add_argument("--url", help="Target server yang sudah berjalan (default: jalankan api.py in-process).")
+    parser.add_argument("--key", help="API key untuk --url (default: key sintetis per user).")
+    parser.add_argument("--users", type=int, default=20, help="Jumlah user bersamaan.")
+    parser.add_argument("--keys", type=int, default=2, help="Jumlah API key berbeda yang dibagi rata ke user.")
+    parser.add_argument("--docs", type=int, default=10, help="Jumlah CV sintetis.")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Latensi FakeChatModel per panggilan.")
+    parser.add_argument("--tokens-per-s", type=float, default=400)
+    parser.add_argument("--corpus", help="Folder korpus (default .bench_corpus/n<docs>).")
+    parser.add_argument("--llm-rpm", type=float, default=0, help="Rate limit scheduler LLM per key (0 = tanpa batas).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Simpan hasil ke file JSON.")
+    args = parser.parse_args(argv)
+
+    if args.key: os.environ["PAKAR_LOADTEST_KEY"] = args.key
+    os.environ["PAKAR_LLM_RPM"] = str(args.llm_rpm)  # hanya berlaku untuk server in-process
+    server = None
+    base_url = args.url
+    if not base_url: base_url, server = start_server(args.latency_ms, args.tokens_per_s)
+    try:
+        result = asyncio.run(run_load(base_url, args.users, args.keys, args.docs, args.corpus, args.seed))
+    finally:
+        if server is not None: server.should_exit = True
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f: json.dump(result, f, indent=2)
+    errors = sum(e["errors"] for e in result["endpoints"].values())
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# ==========================================
+# SKILL-TO-JOB MATCHING (LOKAL, VEKTORISASI NUMPY)
+# ==========================================
+# Katalog posisi (job_catalog.json) diubah sekali menjadi matriks bobot
+# posisi x skill. Skill kandidat dinormalisasi (sinonim, versi, tanda kurung)
+# menjadi vektor biner, lalu skor semua posisi dihitung dengan satu perkalian
+# matriks. Skor deterministik & instan; LLM hanya menulis alasan & gap analysis.
+
+CATALOG_PATH = os.environ.get("PAKAR_JOB_CATALOG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "job_catalog.json"))
+CORE_WEIGHT = 2.0      # bobot skill inti sebuah posisi
+SKILL_WEIGHT = 1.0
+COVERAGE_SHARE = 0.7   # porsi skor dari kebutuhan posisi yang terpenuhi; sisanya relevansi skill kandidat
+
+_VERSION_RE = re.compile(r"\s+v?\d+(\.\d+)*\+?$")
+
+
+@dataclass
+class RoleMatch:
+    title: str
+    score: int
+    matched: list = field(default_factory=list)
+    missing: list = field(default_factory=list)
+
+
+class SkillMatcher:
+    def __init__(self, roles, synonyms=None):
+        self.synonyms = {k.lower(): v.lower() for k, v in (synonyms or {}).items()}
+        self.titles = [r["title"] for r in roles]
+        vocab = {}
+        for role in roles:
+            for skill in list(role.get("core", [])) + list(role.get("skills", [])):
+                vocab.setdefault(self._canonical(skill), len(vocab))
+        self.vocab = vocab
+        self.skills = sorted(vocab, key=vocab.get)
+        # Matriks bobot posisi x skill (float32 agar ribuan posisi tetap ringan)
+        self.weights = np.zeros((len(roles), len(vocab)), dtype=np.float32)
+        for i, role in enumerate(roles):
+            for skill in role.get("skills", []): self.weights[i, vocab[self._canonical(skill)]] = SKILL_WEIGHT
+            for skill in role.get("core", []): self.weights[i, vocab[self._canonical(skill)]] = CORE_WEIGHT
+        self.required = self.weights > 0
+        self.totals = np.maximum(self.weights.sum(axis=1), 1e-9)
+        # Kata kunci multi-kata dicari utuh di dalam skill bebas ("advanced excel" -> excel)
+        terms = sorted(set(vocab) | set(self.synonyms), key=len, reverse=True)
+        self._term_re = re.compile(r"(?<![\w+#.])(" + "|".join(re.escape(t) for t in terms) + r")(?![\w+#])") if terms else None
+        digest = json.dumps([roles, self.synonyms], sort_keys=True).encode("utf-8")
+        self.version = hashlib.sha256(digest).hexdigest()[:12]
+
+    @classmethod
+    def from_file(cls, path=CATALOG_PATH):
+        with open(path, "r", encoding="utf-8") as f: catalog = json.load(f)
+        return cls(catalog["roles"], catalog.get("synonyms"))
+
+    def _canonical(self, skill):
+        skill = " ".join(str(skill).lower().split()).strip(" .,;:-•")
+        skill = _VERSION_RE.sub("", skill)
+        return self.synonyms.get(skill, skill)
+
+    def normalize(self, skill):
+        """Skill bebas dari CV -> daftar skill kanonik yang dikenal katalog."""
+        canonical = self._canonical(skill)
+        if canonical in self.vocab: return [canonical]
+        # "Python (Pandas, NumPy)", "HTML/CSS", "SQL & Excel"
+        parts = [p for p in re.split(r"[(),;/&|]| dan | and ", canonical) if p.strip()]
+        if len(parts) > 1:
+            found = []
+            for part in parts:
+                for s in self.normalize(part):
+                    if s not in found: found.append(s)
+            return found
+        if self._term_re is None: return []
+        found = []
+        for term in self._term_re.findall(canonical):
+            s = self.synonyms.get(term, term)
+            if s in self.vocab and s not in found: found.append(s)
+        return found
+
+    def vectorize(self, skills):
+        vec = np.zeros(len(self.vocab), dtype=np.float32)
+        for skill in skills:
+            for s in self.normalize(skill): vec[self.vocab[s]] = 1.0
+        return vec
+
+    def scores(self, skills):
+        """Skor 0-100 untuk SEMUA posisi (satu operasi matriks)."""
+        vec = self.vectorize(skills)
+        known = vec.sum()
+        if not known: return np.zeros(len(self.titles), dtype=np.float32)
+        coverage = (self.weights @ vec) / self.totals
+        relevance = (self.required @ vec) / known
+        return 100.0 * (COVERAGE_SHARE * coverage + (1 - COVERAGE_SHARE) * relevance)
+
+    def match(self, skills, top_k=3):
+        scores = self.scores(skills)
+        vec = self.vectorize(skills)
+        order = np.argsort(-scores, kind="stable")[:top_k]  # stabil -> urutan katalog memutus skor seri
+        results = []
+        for i in order:
+            req = np.flatnonzero(self.required[i])
+            req = req[np.argsort(-self.weights[i, req], kind="stable")]  # skill inti lebih dulu
+            results.append(RoleMatch(
+                title=self.titles[i],
+                score=int(round(float(scores[i]))),
+                matched=[self.skills[j] for j in req if vec[j]],
+                missing=[self.skills[j] for j in req if not vec[j]],
+            ))
+        return results
+
+
+_default_matcher = None
+_default_lock = threading.Lock()
+
+def get_matcher():
+    """Matcher global per proses (katalog dimuat & divektorisasi sekali)."""
+    global _default_matcher
+    with _default_lock:
+        if _default_matcher is None: _default_matcher = SkillMatcher.from_file()
+        return _default_matcher
@@ -0,0 +1,197 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import CancelledError
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from telemetry import record_event
+
+# ==========================================
+# MODEL ROUTING (TIER PER TUGAS)
+# ==========================================
+# Setiap tugas LLM dipetakan ke tier model ("fast" < "standard" < "pro") dengan anggaran
+# latensi (p95 per panggilan) dan biaya (USD per panggilan, dari estimasi token prompt):
+# - estimasi biaya di atas anggaran -> panggilan ini memakai tier yang lebih murah;
+# - p95 latensi jendela terakhir di atas anggaran -> tugas diturunkan ke tier yang lebih
+#   cepat selama `cooldown_s`, lalu tier utama dicoba lagi;
+# - sinyal kualitas per tugas & tier (parse sukses, output kosong, error, eskalasi) dicatat
+#   di stats() untuk menyetel pemetaan.
+# Konfigurasi env: PAKAR_TIER_<TIER>=model, PAKAR_ROUTE_<TASK>=tier,
+# PAKAR_ROUTE_<TASK>_BUDGET_MS, PAKAR_ROUTE_<TASK>_BUDGET_USD, PAKAR_ROUTE_COOLDOWN_S.
+
+TIERS = ("fast", "standard", "pro")  # urut dari tercepat/termurah
+DEFAULT_TIER_MODELS = {"fast": "gemini-2.5-flash-lite", "standard": "gemini-2.5-flash", "pro": "gemini-2.5-pro"}
+# Harga kasar USD per 1 juta token input (hanya untuk estimasi anggaran)
+DEFAULT_TIER_COST = {"fast": 0.10, "standard": 0.30, "pro": 1.25}
+
+# tugas: (tier, anggaran latensi ms, anggaran biaya USD per panggilan)
+DEFAULT_ROUTES = {
+    "extract": ("standard", 20000, 0.005),   # parse_resume_with_llm
+    "analyze": ("standard", 15000, 0.002),   # analyze_career_path
+    "fused": ("standard", 25000, 0.006),     # profil + analisis karir dalam satu panggilan
+    "chat": ("standard", 30000, 0.005),      # agent (termasuk waktu tool)
+    "tool": ("standard", 20000, 0.002),      # study plan, cover letter, LinkedIn
+    "question": ("fast", 8000, 0.001),       # soal interview (tunggal & bank soal)
+    "grade": ("standard", 12000, 0.002),     # penilaian jawaban interview
+    "summary": ("fast", 10000, 0.001),       # ringkasan memori chat
+}
+
+
+@dataclass
+class Route:
+    tier: str
+    budget_ms: float
+    budget_usd: float
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ModelRouter:
+    def __init__(self, routes=None, tier_models=None, tier_cost=None, window=20, min_samples=5, cooldown_s=300.0, clock=time.monotonic):
+        self.routes = {task: Route(*spec) for task, spec in (routes or DEFAULT_ROUTES).items()}
+        self.tier_models = dict(DEFAULT_TIER_MODELS, **(tier_models or {}))
+        self.tier_cost = dict(DEFAULT_TIER_COST, **(tier_cost or {}))
+        for task, route in self.routes.items():
+            if route.tier not in TIERS: raise ValueError(f"Tier tidak dikenal untuk {task}: {route.tier} (pilih {TIERS})")
+        self.window = window
+        self.min_samples = min_samples
+        self.cooldown_s = cooldown_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._latency = {}   # (task, tier) -> deque detik
+        self._demoted = {}   # task -> (tier, berlaku sampai)
+        self._quality = {}   # (task, tier) -> counter
+
+    def model(self, tier):
+        return self.tier_models[tier]
+
+    def primary(self, task):
+        return self.routes[task].tier
+
+    def primary_model(self, task):
+        """Model tier utama (dipakai sebagai bagian key cache agar stabil saat tier turun sementara)."""
+        return self.model(self.primary(task))
+
+    def cost(self, tier, tokens):
+        return tokens * self.tier_cost[tier] / 1_000_000
+
+    def select(self, task, est_tokens=0):
+        """Tier untuk satu panggilan `task` (prompt ~`est_tokens` token)."""
+        route = self.routes[task]
+        now = self._clock()
+        with self._lock:
+            tier = route.tier
+            demoted = self._demoted.get(task)
+            if demoted and demoted[1] > now: tier = demoted[0]
+            elif demoted:
+                # Cooldown habis: coba tier utama lagi dengan jendela latensi yang bersih
+                del self._demoted[task]
+                for t in TIERS: self._latency.pop((task, t), None)
+                record_event("route", task=task, action="restore", tier=tier)
+        level = TIERS.index(tier)
+        while level > 0 and self.cost(TIERS[level], est_tokens) > route.budget_usd: level -= 1
+        if TIERS[level] != tier: record_event("route", task=task, action="cost_fallback", tier=TIERS[level], est_tokens=est_tokens)
+        return TIERS[level]
+
+    def _counter(self, task, tier):
+        return self._quality.setdefault((task, tier), {"calls": 0, "ok": 0, "empty": 0, "errors": 0,
+                                                       "parse_ok": 0, "parse_failed": 0, "escalated": 0, "cost_usd": 0.0})
+
+    def observe(self, task, tier, seconds, ok=True, parsed=None, error=False, escalated=False, est_tokens=0):
+        """Catat satu panggilan; turunkan tier tugas jika p95 latensi melewati anggaran."""
+        route = self.routes[task]
+        with self._lock:
+            q = self._counter(task, tier)
+            q["calls"] += 1
+            q["errors" if error else "ok" if ok else "empty"] += 1
+            if parsed is not None: q["parse_ok" if parsed else "parse_failed"] += 1
+            if escalated: q["escalated"] += 1
+            q["cost_usd"] += self.cost(tier, est_tokens)
+            samples = self._latency.setdefault((task, tier), deque(maxlen=self.window))
+            samples.append(seconds)
+            level = TIERS.index(tier)
+            if error or len(samples) < self.min_samples or level == 0: return
+            p95_ms = _percentile(samples, 0.95) * 1000
+            if p95_ms <= route.budget_ms: return
+            current = self._demoted.get(task, (route.tier, 0))[0]
+            if TIERS.index(current) < level: return  # sudah diturunkan oleh panggilan lain
+            self._demoted[task] = (TIERS[level - 1], self._clock() + self.cooldown_s)
+            samples.clear()
+        record_event("route", task=task, action="latency_fallback", tier=TIERS[level - 1], p95_ms=round(p95_ms, 1), budget_ms=route.budget_ms)
+
+    @contextmanager
+    def track(self, task, tier, est_tokens=0, escalated=False):
+        """Ukur blok panggilan LLM. Isi `signals["ok"]` / `signals["parsed"]` dengan sinyal kualitas."""
+        signals = {"ok": True, "parsed": None}
+        started = time.perf_counter()
+        try: yield signals
+        except CancelledError: raise  # dibatalkan client, bukan sinyal kualitas model
+        except Exception:
+            self.observe(task, tier, time.perf_counter() - started, ok=False, error=True, escalated=escalated, est_tokens=est_tokens)
+            raise
+        self.observe(task, tier, time.perf_counter() - started, ok=signals["ok"], parsed=signals["parsed"],
+                     escalated=escalated, est_tokens=est_tokens)
+
+    def stats(self):
+        """Per tugas: tier aktif, anggaran, latensi & sinyal kualitas per tier yang pernah dipakai."""
+        now = self._clock()
+        with self._lock:
+            result = {}
+            for task, route in self.routes.items():
+                demoted = self._demoted.get(task)
+                active = demoted[0] if demoted and demoted[1] > now else route.tier
+                tiers = {}
+                for tier in TIERS:
+                    q = self._quality.get((task, tier))
+                    if not q: continue
+                    samples = list(self._latency.get((task, tier), ()))
+                    parses = q["parse_ok"] + q["parse_failed"]
+                    tiers[tier] = dict(q, cost_usd=round(q["cost_usd"], 6),
+                                       p50_ms=round(_percentile(samples, 0.5) * 1000, 1) if samples else None,
+                                       p95_ms=round(_percentile(samples, 0.95) * 1000, 1) if samples else None,
+                                       parse_rate=round(q["parse_ok"] / parses, 4) if parses else None,
+                                       error_rate=round(q["errors"] / q["calls"], 4))
+                result[task] = {"tier": active, "primary": route.tier, "model": self.model(active),
+                                "budget_ms": route.budget_ms, "budget_usd": route.budget_usd,
+                                "demoted_for_s": round(demoted[1] - now, 1) if active != route.tier else 0, "tiers": tiers}
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._latency.clear()
+            self._demoted.clear()
+            self._quality.clear()
+
+
+def routes_from_env(environ=None):
+    env = os.environ if environ is None else environ
+    routes = {}
+    for task, (tier, budget_ms, budget_usd) in DEFAULT_ROUTES.items():
+        name = task.upper()
+        routes[task] = (
+            env.get(f"PAKAR_ROUTE_{name}", tier),
+            float(env.get(f"PAKAR_ROUTE_{name}_BUDGET_MS", budget_ms)),
+            float(env.get(f"PAKAR_ROUTE_{name}_BUDGET_USD", budget_usd)),
+        )
+    return routes
+
+
+_default_router = None
+_default_lock = threading.Lock()
+
+def get_router():
+    """Router global per proses; pemetaan & anggaran dari env (lihat header modul)."""
+    global _default_router
+    with _default_lock:
+        if _default_router is None:
+            _default_router = ModelRouter(
+                routes=routes_from_env(),
+                tier_models={tier: os.environ[f"PAKAR_TIER_{tier.upper()}"] for tier in TIERS if os.environ.get(f"PAKAR_TIER_{tier.upper()}")},
+                cooldown_s=float(os.environ.get("PAKAR_ROUTE_COOLDOWN_S", "300")),
+            )
+        return _default_router
@@ -0,0 +1,38 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+# ==========================================
+# DEFINISI DATA (PYDANTIC MODELS)
+# ==========================================
+class ResumeData(BaseModel):
+    nama_kandidat: str = Field(description="Nama lengkap kandidat.")
+    pendidikan_tertinggi: str = Field(description="Pendidikan tertinggi.")
+    skills_utama: list[str] = Field(description="Daftar 5-10 skill teknis.")
+    ringkasan_cv: str = Field(description="Ringkasan eksekutif singkat tentang profil kandidat (2-3 kalimat).")
+
+class JobRecommendation(BaseModel):
+    judul_pekerjaan: str = Field(description="Posisi pekerjaan.")
+    skor_kecocokan: str = Field(description="Persentase 0-100%.")
+    alasan: str = Field(description="Alasan spesifik kenapa cocok (maks 2 kalimat).")
+    # Diisi oleh matcher lokal (bukan LLM)
+    skor: int = Field(default=0, description="Skor kecocokan numerik 0-100.")
+    skill_cocok: List[str] = Field(default_factory=list, description="Skill kandidat yang dibutuhkan posisi ini.")
+    skill_kurang: List[str] = Field(default_factory=list, description="Skill posisi ini yang belum dimiliki kandidat.")
+
+class CareerAnalysis(BaseModel):
+    rekomendasi: List[JobRecommendation] = Field(description="Daftar 3 rekomendasi pekerjaan.")
+    analisis_gap: str = Field(description="Saran pengembangan skill (gap analysis) yang konkret.")
+
+class CareerNarrative(BaseModel):
+    alasan: List[str] = Field(description="Alasan kecocokan untuk setiap posisi, urutan sama dengan daftar posisi (maks 2 kalimat per posisi).")
+    analisis_gap: str = Field(description="Saran pengembangan skill (gap analysis) yang konkret.")
+
+class InterviewFeedback(BaseModel):
+    skor: int = Field(description="Skor jawaban user (0-100).")
+    feedback_positif: str = Field(description="Apa yang sudah bagus dari jawaban user.")
+    feedback_negatif: str = Field(description="Apa yang perlu diperbaiki/kurang.")
+    jawaban_saran: str = Field(description="Contoh jawaban ideal/sempurna untuk pertanyaan tersebut.")
+
+class InterviewQuestionSet(BaseModel):
+    pertanyaan: List[str] = Field(description="Daftar pertanyaan interview, satu pertanyaan per item, tanpa nomor.")
@@ -0,0 +1,92 @@
+import os
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+from llm_scheduler import llm_lane
+from telemetry import submit_with_context
+
+# ==========================================
+# SPECULATIVE PREFETCH
+# ==========================================
+# Setelah analisis karir selesai, hasil yang kemungkinan besar akan diminta user
+# (soal interview per posisi, output Tindakan Cepat) dibuat lebih dulu di worker
+# pool. Setiap sesi punya Prefetcher sendiri; pool thread-nya dipakai bersama.
+# Panggilan LLM prefetch berjalan di lane "background" scheduler (kalah prioritas dari chat).
+
+_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("PAKAR_PREFETCH_WORKERS", "4")),
+    thread_name_prefix="pakar-prefetch",
+)
+
+
+class Prefetcher:
+    def __init__(self, max_calls=int(os.environ.get("PAKAR_PREFETCH_MAX_CALLS", "12")), executor=None):
+        self.max_calls = max_calls
+        self._executor = executor or _EXECUTOR
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.stats = {"submitted": 0, "used": 0, "cancelled": 0, "failed": 0, "over_cap": 0}
+
+    def submit(self, key, fn, *args, **kwargs):
+        """Jadwalkan `fn(*args, **kwargs)` di bawah `key`. False jika sudah ada atau kuota habis."""
+        with self._lock:
+            if key in self._futures: return False
+            if self.stats["submitted"] >= self.max_calls:
+                self.stats["over_cap"] += 1
+                return False
+            generation = self._generation
+            self._futures[key] = submit_with_context(self._executor, self._run, generation, fn, args, kwargs)
+            self.stats["submitted"] += 1
+            return True
+
+    def _run(self, generation, fn, args, kwargs):
+        # Job yang masih antre saat sesi di-reset tidak perlu memanggil LLM
+        if generation != self._generation: raise CancelledError()
+        with llm_lane("background"):
+            return fn(*args, **kwargs)
+
+    def has(self, key):
+        with self._lock:
+            return key in self._futures
+
+    def take(self, key, timeout=None):
+        """Ambil (dan lepas) hasil prefetch untuk `key`; None jika tidak ada atau gagal."""
+        with self._lock:
+            future = self._futures.pop(key, None)
+        if future is None: return None
+        try:
+            result = future.result(timeout=timeout)
+        except CancelledError:
+            return None
+        except Exception:
+            with self._lock: self.stats["failed"] += 1
+            return None
+        with self._lock: self.stats["used"] += 1
+        return result
+
+    def take_ready(self, key):
+        """Seperti `take`, tapi tidak pernah menunggu: prefetch `key` yang belum selesai dibatalkan
+        (hasilnya dibuang) agar klik interaktif jalan sendiri, tidak antre di belakang lane background."""
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None: return None
+            if not future.done():
+                del self._futures[key]
+                future.cancel()
+                self.stats["cancelled"] += 1
+                return None
+        return self.take(key)
+
+    def cancel(self):
+        """Batalkan semua prefetch (mis. user mengunggah CV baru). Kuota sesi tidak di-reset."""
+        with self._lock:
+            self._generation += 1
+            for future in self._futures.values():
+                future.cancel()
+                self.stats["cancelled"] += 1
+            self._futures.clear()
+
+    def pending(self):
+        with self._lock:
+            return sum(1 for f in self._futures.values() if not f.done())
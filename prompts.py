@@ -0,0 +1,115 @@
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.output_parsers import PydanticOutputParser
+
+from models import ResumeData, CareerAnalysis, CareerNarrative, InterviewFeedback, InterviewQuestionSet
+
+# ==========================================
+# PROMPT & PARSER (DIKOMPILASI SEKALI SAAT IMPORT)
+# ==========================================
+# Modul ini di-cache oleh Python, jadi template & format instructions tidak
+# dibangun ulang di setiap rerun Streamlit maupun di setiap panggilan fungsi.
+
+RESUME_PARSER = PydanticOutputParser(pydantic_object=ResumeData)
+RESUME_PROMPT = ChatPromptTemplate.from_template(
+    "Extract resume data to JSON:\n{format_instructions}\nResume:\n{resume_text}"
+).partial(format_instructions=RESUME_PARSER.get_format_instructions())
+
+CAREER_PARSER = PydanticOutputParser(pydantic_object=CareerAnalysis)
+CAREER_PROMPT = ChatPromptTemplate.from_template(
+    "Based on this profile, suggest 3 specific job titles and provide a gap analysis in JSON format:\n{profile}\n{format_instructions}"
+).partial(format_instructions=CAREER_PARSER.get_format_instructions())
+
+# Pipeline fused: profil + analisis karir dalam satu panggilan (skor posisi katalog tetap dari matcher lokal).
+# Output dua bagian JSON, masing-masing diawali penanda di barisnya sendiri: string JSON tidak memuat
+# baris baru mentah, jadi isi profil tidak bisa menyerupai penanda bagian analisis.
+FUSED_PROFILE_MARKER = "@@PROFIL@@"
+FUSED_ANALYSIS_MARKER = "@@ANALISIS@@"
+FUSED_PROMPT = ChatPromptTemplate.from_template(
+    "Analisis CV berikut dalam satu langkah. Balas dalam dua bagian, masing-masing diawali penanda "
+    "di barisnya sendiri.\n{profile_marker}\nJSON data resume:\n{resume_format}\n"
+    "{analysis_marker}\nJSON berisi 3 posisi yang paling cocok (utamakan judul dari katalog: {catalog}), "
+    "alasan singkat per posisi, dan gap analysis yang konkret:\n{career_format}\nResume:\n{resume_text}"
+).partial(profile_marker=FUSED_PROFILE_MARKER, analysis_marker=FUSED_ANALYSIS_MARKER,
+          resume_format=RESUME_PARSER.get_format_instructions(), career_format=CAREER_PARSER.get_format_instructions())
+
+# Skor & urutan posisi dihitung matcher lokal; LLM hanya menulis alasan & gap analysis
+CAREER_NARRATIVE_PARSER = PydanticOutputParser(pydantic_object=CareerNarrative)
+CAREER_NARRATIVE_PROMPT = ChatPromptTemplate.from_template(
+    "Profil kandidat:\n{profile}\n\n"
+    "Posisi yang paling cocok menurut pencocokan skill (skor dihitung sistem, jangan diubah):\n{matches}\n\n"
+    "Tulis alasan singkat kecocokan untuk setiap posisi (urutan sama) dan gap analysis yang konkret "
+    "berdasarkan skill yang belum dimiliki, dalam format JSON:\n{format_instructions}"
+).partial(format_instructions=CAREER_NARRATIVE_PARSER.get_format_instructions())
+
+INTERVIEW_FEEDBACK_PARSER = PydanticOutputParser(pydantic_object=InterviewFeedback)
+INTERVIEW_FEEDBACK_PROMPT = ChatPromptTemplate.from_template(
+    "Anda adalah Senior Interviewer untuk posisi {job_title}.\n"
+    "Pertanyaan: {question}\n"
+    "Jawaban Kandidat: {answer}\n\n"
+    "Berikan penilaian jujur dan detail dalam format JSON:\n{format_instructions}"
+).partial(format_instructions=INTERVIEW_FEEDBACK_PARSER.get_format_instructions())
+
+INTERVIEW_QUESTION_PROMPT = (
+    "Buatlah 1 pertanyaan interview yang SULIT, SPESIFIK dan TEKNIS untuk posisi '{job_title}'. "
+    "Langsung tulis pertanyaannya saja tanpa kalimat pembuka."
+)
+
+QUESTION_SET_PARSER = PydanticOutputParser(pydantic_object=InterviewQuestionSet)
+QUESTION_SET_PROMPT = ChatPromptTemplate.from_template(
+    "Buatlah {n} pertanyaan interview dengan tingkat kesulitan {difficulty} yang SPESIFIK dan TEKNIS untuk posisi '{job_title}'. "
+    "Setiap pertanyaan harus membahas topik yang berbeda dan berdiri sendiri. "
+    "Kembalikan daftar pertanyaan dalam format JSON:\n{format_instructions}"
+).partial(format_instructions=QUESTION_SET_PARSER.get_format_instructions())
+
+STUDY_PLAN_PROMPT = "Buatkan study plan 4 minggu yang ringkas dan padat untuk mempelajari: {skill_name}."
+
+COVER_LETTER_PROMPT = (
+    "Buatkan draft Cover Letter (Surat Lamaran Kerja) profesional dalam Bahasa Indonesia "
+    "untuk posisi: {job_title}. "
+    "Buatlah surat yang persuasif, menonjolkan semangat belajar, dan siap berkontribusi. "
+    "Gunakan format [Nama Kandidat], [Perusahaan Tujuan] sebagai placeholder."
+)
+
+LINKEDIN_PROMPT = (
+    "Buatkan optimasi profil LinkedIn untuk seseorang yang menargetkan posisi: {role_target}. "
+    "Berikan output berupa:\n"
+    "1. 3 Opsi 'Headline' yang profesional dengan kata kunci SEO.\n"
+    "2. Draft 'About' (Ringkasan Diri) yang engaging (maks 2 paragraf).\n"
+    "3. 5 Hashtag relevan."
+)
+
+AGENT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system",
+     "Anda adalah AI Career Coach agent profesional. Tugas utama Anda adalah memberikan saran karir strategis. "
+     "Anda memiliki akses ke 3 tools khusus: 'Study Plan Generator', 'Cover Letter Drafter', dan 'LinkedIn Optimizer'. "
+     "Gunakan tools tersebut JIKA DAN HANYA JIKA user memintanya atau jika konteks percakapan membutuhkannya. "
+     "\n\n"
+     "ATURAN RESPON (HARUS DIPATUHI SETIAP SAAT):\n"
+     "1. Jika pertanyaan terkait karir/skill: Jawablah dengan profesional dan gunakan tools jika perlu.\n"
+     "2. Jika pertanyaan DI LUAR KONTEKS (misal: 'kenapa bumi bulat', 'resep masakan', 'gosip artis', dll): \n"
+     "   - Jawablah pertanyaan tersebut secara ringkas (maksimal 2 kalimat).\n"
+     "   - SETIAP KALI (TANPA KECUALI) Anda menjawab pertanyaan di luar konteks, Anda WAJIB menutup jawaban dengan kalimat transisi untuk mengajak user kembali ke topik karir. \n"
+     "   - JANGAN PERNAH lupa menambahkan kalimat pengingat ini, meskipun user bertanya di luar konteks berkali-kali.\n"
+     "   (Contoh penutup: '...Namun, agar waktu Anda produktif, mari kita kembali bahas strategi karir Anda. Ada update terbaru soal skill yang sedang dipelajari?')\n"
+     "3. Jika user meminta simulasi interview: Arahkan ke Tab 3.\n"
+     "\n"
+     "Informasi Profil User:\n{context_data}"),
+    MessagesPlaceholder(variable_name="chat_history"),
+    ("human", "{input}"),
+    MessagesPlaceholder(variable_name="agent_scratchpad"),
+])
+
+CHAT_SUMMARY_PROMPT = (
+    "Perbarui ringkasan percakapan konsultasi karir berikut. Pertahankan fakta penting: tujuan karir user, "
+    "skill yang dibahas, dokumen/rencana yang sudah dibuat, dan keputusan yang diambil. "
+    "Tulis maksimal 5 kalimat dalam Bahasa Indonesia.\n\n"
+    "Ringkasan sebelumnya:\n{summary}\n\n"
+    "Percakapan baru:\n{transcript}\n\n"
+    "Ringkasan terbaru:"
+)
+
+# Tanya ulang (sekali) jika output terstruktur tidak valid / terpotong
+STRUCTURED_REASK_PROMPT = (
+    "Output Anda sebelumnya tidak valid untuk skema {schema}: {error}\n"
+    "Kirim ulang HANYA objek JSON lengkap yang valid sesuai skema berikut, tanpa teks lain:\n{format_instructions}"
+)
@@ -0,0 +1,149 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_scheduler import llm_lane
+from telemetry import submit_with_context
+
+# ==========================================
+# INTERVIEW QUESTION BANK
+# ==========================================
+# Soal dibuat per batch (N soal dalam satu panggilan terstruktur) lalu disimpan per
+# (posisi, tingkat kesulitan). Klik "Generate Soal Ujian" dilayani dari bank tanpa
+# mengulang soal yang sudah pernah diterima sesi yang sama; bank diisi ulang di
+# background saat sisa soal untuk sesi itu turun di bawah low-water mark. Riwayat soal
+# per sesi dibatasi `max_sessions` (LRU) dan direset saat profil sesi berganti.
+
+DIFFICULTIES = ["Mudah", "Menengah", "Sulit"]
+
+
+def normalize_question(text):
+    return re.sub(r"[^\w]+", " ", text.lower()).strip()
+
+
+class QuestionBank:
+    def __init__(self, generate_fn=None, batch_size=8, low_water=3, max_per_key=64, max_workers=2, max_sessions=1000):
+        # generate_fn(job_title, n, difficulty, api_key) -> list[str]
+        self.generate_fn = generate_fn
+        self.batch_size = batch_size
+        self.low_water = low_water
+        self.max_per_key = max_per_key
+        self.max_sessions = max_sessions
+        self._questions = {}   # key -> [soal] (urutan masuk)
+        self._served = OrderedDict()  # session_id -> {key: {soal ternormalisasi}}, urut LRU
+        self._refilling = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pakar-qbank")
+        self.stats = {"served_local": 0, "served_after_generate": 0, "generated_batches": 0,
+                      "async_refills": 0, "duplicates_dropped": 0, "generate_failures": 0}
+
+    @staticmethod
+    def _key(job_title, difficulty):
+        return (job_title.strip().lower(), difficulty)
+
+    def add(self, job_title, difficulty, questions):
+        """Simpan soal baru (de-duplikasi); return jumlah yang benar-benar ditambahkan."""
+        key = self._key(job_title, difficulty)
+        with self._lock:
+            bank = self._questions.setdefault(key, [])
+            known = {normalize_question(q) for q in bank}
+            added = 0
+            for q in questions:
+                q = q.strip()
+                norm = normalize_question(q)
+                if not norm or norm in known:
+                    self.stats["duplicates_dropped"] += 1
+                    continue
+                bank.append(q)
+                known.add(norm)
+                added += 1
+            del bank[:-self.max_per_key]  # buang soal tertua jika bank penuh
+            return added
+
+    def _generate(self, job_title, difficulty, api_key):
+        try:
+            questions = self.generate_fn(job_title, self.batch_size, difficulty, api_key) or []
+        except Exception:
+            questions = []
+        with self._lock:
+            self.stats["generated_batches"] += 1
+            if not questions: self.stats["generate_failures"] += 1
+        return self.add(job_title, difficulty, questions)
+
+    def _available(self, session_id, key):
+        served = self._served.get(session_id, {}).get(key, set())
+        return [q for q in self._questions.get(key, []) if normalize_question(q) not in served]
+
+    def _refill_async(self, job_title, difficulty, api_key):
+        key = self._key(job_title, difficulty)
+        with self._lock:
+            if key in self._refilling: return
+            self._refilling.add(key)
+            self.stats["async_refills"] += 1
+
+        def run():
+            try:
+                with llm_lane("background"): self._generate(job_title, difficulty, api_key)
+            finally:
+                with self._lock: self._refilling.discard(key)
+
+        submit_with_context(self._executor, run)
+
+    def ensure(self, job_title, difficulty, api_key, session_id=None):
+        """Isi bank secara sinkron jika stok (untuk sesi ini) di bawah low-water mark."""
+        key = self._key(job_title, difficulty)
+        with self._lock:
+            enough = len(self._available(session_id, key)) > self.low_water
+        if not enough: self._generate(job_title, difficulty, api_key)
+
+    def next(self, session_id, job_title, difficulty, api_key):
+        """Soal berikutnya yang belum pernah diterima sesi ini, atau None jika gagal dibuat."""
+        key = self._key(job_title, difficulty)
+        with self._lock:
+            available = self._available(session_id, key)
+        generated = False
+        if not available:
+            self._generate(job_title, difficulty, api_key)
+            generated = True
+            with self._lock:
+                available = self._available(session_id, key)
+            if not available: return None
+
+        question = available[0]
+        with self._lock:
+            if session_id in self._served: self._served.move_to_end(session_id)
+            self._served.setdefault(session_id, {}).setdefault(key, set()).add(normalize_question(question))
+            while len(self._served) > self.max_sessions: self._served.popitem(last=False)
+            self.stats["served_after_generate" if generated else "served_local"] += 1
+            remaining = len(available) - 1
+        if remaining <= self.low_water: self._refill_async(job_title, difficulty, api_key)
+        return question
+
+    def reset_session(self, session_id):
+        """Lupakan soal yang sudah diterima sesi ini (sesi selesai atau profil berganti)."""
+        with self._lock:
+            self._served.pop(session_id, None)
+
+    def summary(self):
+        with self._lock:
+            return dict(self.stats, keys=len(self._questions), questions=sum(len(v) for v in self._questions.values()),
+                        sessions=len(self._served))
+
+
+_default_bank = None
+_default_lock = threading.Lock()
+
+def get_question_bank(generate_fn=None):
+    """Bank soal global per proses (dipakai bersama semua sesi)."""
+    global _default_bank
+    with _default_lock:
+        if _default_bank is None:
+            _default_bank = QuestionBank(
+                batch_size=int(os.environ.get("PAKAR_QBANK_BATCH", "8")),
+                low_water=int(os.environ.get("PAKAR_QBANK_LOW_WATER", "3")),
+                max_sessions=int(os.environ.get("PAKAR_QBANK_SESSIONS", "1000")),
+            )
+        if generate_fn is not None: _default_bank.generate_fn = generate_fn
+        return _default_bank
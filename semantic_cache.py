@@ -0,0 +1,284 @@
+import os
+import re
+import time
+import zlib
+import hashlib
+import threading
+
+import numpy as np
+
+# ==========================================
+# SEMANTIC CACHE (OFFLINE, NUMPY)
+# ==========================================
+# Jawaban agent & output tool untuk pertanyaan yang mirip ("buatkan study plan python"
+# vs "rencana belajar Python") dipakai ulang tanpa memanggil LLM. Teks dinormalisasi
+# (frasa Indonesia -> istilah baku, stopword dibuang) lalu di-embed dengan hashing
+# vectorizer lokal (kata + trigram karakter, tanpa model/jaringan). Lookup = satu
+# perkalian matriks atas entry dengan scope yang sama persis (namespace + digest
+# profil/riwayat), diterima jika cosine >= threshold namespace. Angka & kata negasi
+# tidak ikut di-embed tapi menjadi guard: "tidak cocok" tidak pernah cocok dengan
+# "cocok", dan "2 minggu" tidak cocok dengan "8 minggu". Entry kedaluwarsa setelah
+# TTL; jika penuh, entry yang paling lama tidak dipakai (LRU) dibuang.
+# Threshold disetel terhadap CALIBRATION_PAIRS (`python semantic_cache.py`).
+
+DIM = 1024
+TRIGRAM_WEIGHT = 0.25
+
+# Variasi frasa -> satu token baku (urutan: frasa terpanjang dulu)
+_PHRASES = {
+    "rencana belajar": "study_plan", "roadmap belajar": "study_plan", "kurikulum belajar": "study_plan",
+    "jadwal belajar": "study_plan", "study plan": "study_plan", "learning plan": "study_plan", "roadmap": "study_plan",
+    "surat lamaran kerja": "cover_letter", "surat lamaran": "cover_letter", "lamaran kerja": "cover_letter",
+    "cover letter": "cover_letter", "motivation letter": "cover_letter",
+    "profil linkedin": "linkedin", "linkedin profile": "linkedin", "personal branding": "linkedin",
+    "langkah karir": "career_step", "langkah karier": "career_step", "career path": "career_step", "jenjang karir": "career_step",
+}
+_STOPWORDS = set("""
+    buatkan buat bikin tolong mohon bantu bantuin dong ya yah saya aku gue kamu anda untuk
+    yang dan atau dengan di ke dari ini itu apa apakah bagaimana gimana sebagai bisa boleh berikan kasih
+    beri tentang soal skill posisi role sih nih please pls the a an to for of me my i make create give
+    write help about on in with profesional draft jadi menjadi optimasi optimalkan saran
+    minggu bulan hari jam week weeks month months day days
+""".split())
+# Guard: negasi membalik makna, angka mengubah permintaan (durasi, jumlah, level)
+_NEGATIONS = set("tidak tak bukan belum jangan tanpa gak nggak ngga enggak ga not no never without dont don doesn isn".split())
+_NUMBER_WORDS = {
+    "satu": "1", "dua": "2", "tiga": "3", "empat": "4", "lima": "5", "enam": "6", "tujuh": "7", "delapan": "8",
+    "sembilan": "9", "sepuluh": "10", "one": "1", "two": "2", "three": "3", "four": "4", "five": "5", "six": "6",
+    "seven": "7", "eight": "8", "nine": "9", "ten": "10",
+}
+_PHRASE_RE = re.compile(r"\b(" + "|".join(re.escape(p) for p in sorted(_PHRASES, key=len, reverse=True)) + r")\b")
+_TOKEN_RE = re.compile(r"[\w+#]+(?:\.[\w+#]+)*")
+
+
+def scope_key(*parts):
+    """Digest scope exact-match (mis. nama tool + profil) dari bagian-bagian teks."""
+    return hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:32]
+
+
+def guard_of(tokens):
+    """(negasi?, angka yang disebut) dari token teks."""
+    numbers = frozenset(_NUMBER_WORDS.get(t, t) for t in tokens if t.isdigit() or t in _NUMBER_WORDS)
+    return any(t in _NEGATIONS for t in tokens), numbers
+
+
+class HashingVectorizer:
+    def __init__(self, dim=DIM):
+        self.dim = dim
+
+    def tokens(self, text):
+        text = _PHRASE_RE.sub(lambda m: " " + _PHRASES[m.group(1)] + " ", str(text).lower())
+        return [t for t in _TOKEN_RE.findall(text) if t not in _STOPWORDS]
+
+    def guard(self, text):
+        return guard_of(self.tokens(text))
+
+    def _add(self, vec, feature, weight):
+        h = zlib.crc32(feature.encode("utf-8"))
+        vec[h % self.dim] += weight if h & 0x80000000 else -weight  # signed hashing: tabrakan saling meniadakan
+
+    def transform(self, text):
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for token in self.tokens(text):
+            if token in _NEGATIONS or token.isdigit() or token in _NUMBER_WORDS: continue  # ditangani guard
+            self._add(vec, token, 1.0)
+            padded = f" {token} "
+            for i in range(len(padded) - 2): self._add(vec, "#" + padded[i:i + 3], TRIGRAM_WEIGHT)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+
+class SemanticCache:
+    def __init__(self, vectorizer=None, max_entries=1000, ttl=24 * 3600, thresholds=None, default_threshold=0.9):
+        self.vectorizer = vectorizer or HashingVectorizer()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.thresholds = dict(thresholds or {})
+        self.default_threshold = default_threshold
+        self._lock = threading.Lock()
+        # Slot array (tumbuh 2x sampai max_entries); scope -1 = slot kosong
+        self._vectors = np.zeros((0, self.vectorizer.dim), dtype=np.float32)
+        self._scopes = np.zeros(0, dtype=np.int64)
+        self._created = np.zeros(0, dtype=np.float64)
+        self._used = np.zeros(0, dtype=np.float64)
+        self._negated = np.zeros(0, dtype=bool)
+        self._numbers = []  # frozenset angka per slot
+        self._values = []
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "expired": 0}
+        self._by_namespace = {}
+
+    @staticmethod
+    def _scope_id(namespace, scope):
+        return int.from_bytes(hashlib.blake2b(f"{namespace}\x1f{scope}".encode("utf-8"), digest_size=8).digest(), "big", signed=True) & 0x7FFFFFFFFFFFFFFF
+
+    def threshold(self, namespace):
+        return self.thresholds.get(namespace, self.default_threshold)
+
+    def _candidates(self, sid, now, guard=None):
+        live = self._scopes == sid
+        expired = live & (now - self._created > self.ttl)
+        if expired.any():
+            self._free(np.flatnonzero(expired))
+            self._stats["expired"] += int(expired.sum())
+            live &= ~expired
+        slots = np.flatnonzero(live)
+        if guard is None: return slots
+        # Negasi harus sama; angka yang disebut query harus sama persis dengan angka entry
+        # (query tanpa angka boleh memakai entry berangka: user tidak membatasi detail itu)
+        negated, numbers = guard
+        return np.array([s for s in slots if self._negated[s] == negated and (not numbers or self._numbers[s] == numbers)], dtype=np.int64)
+
+    def _free(self, slots):
+        self._scopes[slots] = -1
+        for i in slots: self._values[i] = None
+
+    def _count(self, namespace, outcome):
+        self._stats[outcome] += 1
+        counts = self._by_namespace.setdefault(namespace, {"hits": 0, "misses": 0})
+        counts[outcome] += 1
+
+    def get(self, namespace, scope, text):
+        """Return (value, similarity) entry termirip di scope ini jika >= threshold, selain itu None."""
+        vec = self.vectorizer.transform(text)
+        guard = self.vectorizer.guard(text)
+        sid = self._scope_id(namespace, scope)
+        now = time.time()
+        with self._lock:
+            slots = self._candidates(sid, now, guard)
+            if len(slots) and vec.any():
+                sims = self._vectors[slots] @ vec
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold(namespace):
+                    slot = slots[best]
+                    self._used[slot] = now
+                    self._count(namespace, "hits")
+                    return self._values[slot], float(sims[best])
+            self._count(namespace, "misses")
+            return None
+
+    def put(self, namespace, scope, text, value):
+        vec = self.vectorizer.transform(text)
+        if not vec.any(): return
+        negated, numbers = self.vectorizer.guard(text)
+        sid = self._scope_id(namespace, scope)
+        now = time.time()
+        with self._lock:
+            slots = self._candidates(sid, now)
+            slots = slots[[self._negated[s] == negated and self._numbers[s] == numbers for s in slots]] if len(slots) else slots
+            same = slots[self._vectors[slots] @ vec >= 0.999] if len(slots) else slots
+            slot = same[0] if len(same) else self._allocate()
+            self._vectors[slot], self._scopes[slot] = vec, sid
+            self._negated[slot], self._numbers[slot] = negated, numbers
+            self._created[slot] = self._used[slot] = now
+            self._values[slot] = value
+            self._stats["writes"] += 1
+
+    def _allocate(self):
+        free = np.flatnonzero(self._scopes < 0)
+        if len(free): return free[0]
+        size = len(self._scopes)
+        if size < self.max_entries:
+            grow = min(self.max_entries, max(16, size * 2)) - size
+            self._vectors = np.vstack([self._vectors, np.zeros((grow, self.vectorizer.dim), dtype=np.float32)])
+            self._scopes = np.concatenate([self._scopes, np.full(grow, -1, dtype=np.int64)])
+            self._created = np.concatenate([self._created, np.zeros(grow)])
+            self._used = np.concatenate([self._used, np.zeros(grow)])
+            self._negated = np.concatenate([self._negated, np.zeros(grow, dtype=bool)])
+            self._numbers.extend([frozenset()] * grow)
+            self._values.extend([None] * grow)
+            return size
+        slot = int(np.argmin(self._used))  # LRU
+        self._stats["evictions"] += 1
+        return slot
+
+    def clear(self):
+        with self._lock:
+            self._free(np.flatnonzero(self._scopes >= 0))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, entries=int((self._scopes >= 0).sum()), by_namespace={k: dict(v) for k, v in self._by_namespace.items()})
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+# (namespace, teks entry di cache, teks query, harus hit?) — dasar penyetelan threshold.
+# Agent: pasangan harus-miss tertinggi ~0.73 ("gaji data analyst" vs "... scientist"), harus-hit
+# terendah ~0.94 -> 0.85. Tool (argumen pendek): "Data Analyst" vs "Senior Data Analyst" ~0.81 harus miss.
+CALIBRATION_PAIRS = [
+    ("agent", "rencana belajar Python 4 minggu", "buatkan study plan python", True),
+    ("agent", "buatkan study plan python", "study plan untuk python dong", True),
+    ("agent", "Apakah saya cocok jadi data analyst?", "apakah aku cocok menjadi data analyst", True),
+    ("agent", "buatkan cover letter untuk data analyst", "tolong buat surat lamaran kerja posisi Data Analyst", True),
+    ("agent", "Berikan saran optimasi profil LinkedIn untuk posisi Data Analyst.", "personal branding linkedin data analyst", True),
+    ("agent", "Apa langkah karir terbaik untuk saya tahun ini?", "apa langkah karier terbaik saya tahun ini", True),
+    ("agent", "Buatkan rencana belajar 4 minggu untuk skill: SQL.", "rencana belajar sql empat minggu", True),
+    ("agent", "Apakah saya cocok jadi data analyst?", "Apakah saya tidak cocok jadi data analyst?", False),
+    ("agent", "rencana belajar python 2 minggu", "rencana belajar python 8 minggu", False),
+    ("agent", "buatkan study plan python", "rencana belajar Python 4 minggu", False),
+    ("agent", "buatkan cover letter untuk data analyst", "buatkan cover letter untuk data scientist", False),
+    ("agent", "Apa langkah karir terbaik untuk saya tahun ini?", "Apa langkah karir terburuk untuk saya tahun ini?", False),
+    ("agent", "berapa gaji data analyst", "berapa gaji data scientist", False),
+    ("agent", "Apakah saya cocok jadi data analyst?", "Apakah saya cocok jadi data engineer?", False),
+    ("agent", "study plan python", "study plan java", False),
+    ("agent", "study plan sql", "study plan nosql", False),
+    ("tool_study_plan", "Python", "python", True),
+    ("tool_study_plan", "Machine Learning", "machine learning", True),
+    ("tool_study_plan", "SQL", "NoSQL", False),
+    ("tool_study_plan", "Java", "JavaScript", False),
+    ("tool_cover_letter", "Data Analyst", "data analyst", True),
+    ("tool_cover_letter", "Data Analyst", "Data Scientist", False),
+    ("tool_cover_letter", "Data Analyst", "Senior Data Analyst", False),
+    ("tool_cover_letter", "Frontend Developer", "Backend Developer", False),
+]
+
+
+def default_thresholds():
+    """Threshold per namespace. Env: PAKAR_SEMCACHE_AGENT_THRESHOLD, PAKAR_SEMCACHE_TOOL_THRESHOLD."""
+    tool_threshold = float(os.environ.get("PAKAR_SEMCACHE_TOOL_THRESHOLD", "0.85"))
+    return {
+        "agent": float(os.environ.get("PAKAR_SEMCACHE_AGENT_THRESHOLD", "0.85")),
+        "tool_study_plan": tool_threshold,
+        "tool_cover_letter": tool_threshold,
+        "tool_linkedin_optimization": tool_threshold,
+    }
+
+
+def calibration_report(thresholds=None, pairs=CALIBRATION_PAIRS):
+    """Uji threshold terhadap pasangan berlabel: [(namespace, entry, query, harus hit, similarity | None)]
+    untuk setiap pasangan yang hasilnya salah (kosong = semua benar)."""
+    errors = []
+    for namespace, cached, query, should_hit in pairs:
+        cache = SemanticCache(thresholds=thresholds or default_thresholds())
+        cache.put(namespace, "calibration", cached, cached)
+        hit = cache.get(namespace, "calibration", query)
+        if (hit is not None) != should_hit:
+            errors.append((namespace, cached, query, should_hit, round(hit[1], 3) if hit else None))
+    return errors
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_semantic_cache():
+    """Cache global per proses. Env: PAKAR_SEMCACHE_MAX_ENTRIES, PAKAR_SEMCACHE_TTL_HOURS (+ threshold,
+    lihat default_thresholds)."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = SemanticCache(
+                max_entries=int(os.environ.get("PAKAR_SEMCACHE_MAX_ENTRIES", "1000")),
+                ttl=float(os.environ.get("PAKAR_SEMCACHE_TTL_HOURS", "24")) * 3600,
+                thresholds=default_thresholds(),
+            )
+        return _default_cache
+
+
+if __name__ == "__main__":
+    import sys
+    errors = calibration_report()
+    print(f"{len(CALIBRATION_PAIRS) - len(errors)}/{len(CALIBRATION_PAIRS)} pasangan kalibrasi benar")
+    for namespace, cached, query, should_hit, similarity in errors:
+        print(f"  ✗ [{namespace}] {cached!r} vs {query!r}: harus {'hit' if should_hit else 'miss'}, similarity {similarity}")
+    sys.exit(1 if errors else 0)
@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import threading
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+# ==========================================
+# SESSION STORE (SQLITE, PERSISTEN)
+# ==========================================
+# Profil & hasil analisis (per hash CV), state sesi (interview, ujian, ringkasan
+# memori chat) dan transkrip chat disimpan di SQLite (mode WAL). Data disimpan
+# sebagai JSON ringkas, dikompresi zlib bila cukup panjang. Transkrip disimpan per
+# pesan sehingga sesi panjang bisa dimuat sebagian (pesan terbaru dulu). Membuka
+# ulang sesi memulihkan state tanpa panggilan LLM.
+
+_COMPRESS_MIN_BYTES = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    cv_hash TEXT PRIMARY KEY,
+    resume BLOB NOT NULL,
+    career BLOB,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    cv_hash TEXT,
+    state BLOB,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content BLOB NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions(updated);
+"""
+
+
+def pack(obj):
+    """JSON ringkas; dikompresi zlib (bytes) jika panjang, selain itu tetap teks."""
+    text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    raw = text.encode("utf-8")
+    return zlib.compress(raw, 6) if len(raw) >= _COMPRESS_MIN_BYTES else text
+
+
+def unpack(value):
+    if value is None: return None
+    if isinstance(value, bytes): value = zlib.decompress(value).decode("utf-8")
+    return json.loads(value)
+
+
+class SessionStore:
+    def __init__(self, path, max_age_days=30):
+        self.path = path
+        self._lock = threading.Lock()
+        # Satu koneksi per proses, dipakai bergantian oleh thread Streamlit (dijaga lock)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        if max_age_days: self.prune(max_age_days * 86400)
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # --- Profil (per hash CV) ---
+    def save_profile(self, cv_hash, resume, career):
+        self._execute(
+            "INSERT INTO profiles(cv_hash, resume, career, updated) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(cv_hash) DO UPDATE SET resume=excluded.resume, career=excluded.career, updated=excluded.updated",
+            (cv_hash, pack(resume), pack(career), time.time()),
+        )
+
+    def load_profile(self, cv_hash):
+        """Return (resume_dict, career_dict) atau (None, None)."""
+        rows = self._execute("SELECT resume, career FROM profiles WHERE cv_hash = ?", (cv_hash,))
+        return (unpack(rows[0][0]), unpack(rows[0][1])) if rows else (None, None)
+
+    # --- State sesi ---
+    def save_session(self, session_id, cv_hash, state):
+        now = time.time()
+        self._execute(
+            "INSERT INTO sessions(session_id, cv_hash, state, created, updated) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET cv_hash=excluded.cv_hash, state=excluded.state, updated=excluded.updated",
+            (session_id, cv_hash, pack(state), now, now),
+        )
+
+    def load_session(self, session_id):
+        """Return (cv_hash, state_dict) atau (None, None) jika sesi tidak dikenal."""
+        rows = self._execute("SELECT cv_hash, state FROM sessions WHERE session_id = ?", (session_id,))
+        return (rows[0][0], unpack(rows[0][1]) or {}) if rows else (None, None)
+
+    # --- Transkrip chat ---
+    def append_messages(self, session_id, start_seq, messages):
+        now = time.time()
+        rows = [
+            (session_id, start_seq + i, "human" if isinstance(m, HumanMessage) else "ai", pack(m.content), now)
+            for i, m in enumerate(messages)
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                # Baris sesi dibuat lebih dulu agar transkrip tidak pernah yatim (ikut terhapus oleh prune)
+                self._conn.execute(
+                    "INSERT INTO sessions(session_id, created, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT(session_id) DO UPDATE SET updated=excluded.updated",
+                    (session_id, now, now),
+                )
+                self._conn.executemany("INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?)", rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def count_messages(self, session_id):
+        return self._execute("SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,))[0][0]
+
+    def load_messages(self, session_id, start=0, end=None):
+        """Pesan dengan seq di [start, end) sebagai HumanMessage/AIMessage, urut naik."""
+        rows = self._execute(
+            "SELECT role, content FROM messages WHERE session_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+            (session_id, start, end if end is not None else 2 ** 62),
+        )
+        return [(HumanMessage if role == "human" else AIMessage)(content=unpack(content)) for role, content in rows]
+
+    # --- Perawatan ---
+    def delete_session(self, session_id):
+        """Hapus state sesi & transkripnya (tombol "Hapus Sesi Ini" di sidebar)."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def prune(self, max_age_s):
+        """Hapus sesi (beserta transkrip) yang tidak disentuh lebih dari `max_age_s` detik."""
+        cutoff = time.time() - max_age_s
+        self._execute("DELETE FROM messages WHERE session_id IN (SELECT session_id FROM sessions WHERE updated < ?)", (cutoff,))
+        self._execute("DELETE FROM sessions WHERE updated < ?", (cutoff,))
+        self._execute("DELETE FROM profiles WHERE updated < ? AND cv_hash NOT IN (SELECT cv_hash FROM sessions WHERE cv_hash IS NOT NULL)", (cutoff,))
+
+    def stats(self):
+        counts = {table: self._execute(f"SELECT COUNT(*) FROM {table}")[0][0] for table in ("profiles", "sessions", "messages")}
+        try: counts["bytes"] = os.path.getsize(self.path)
+        except OSError: counts["bytes"] = 0
+        return counts
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+def get_session_store():
+    """Store global per proses; lokasi dari PAKAR_DB_PATH (default .pakar_store.sqlite3)."""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = SessionStore(
+                os.environ.get("PAKAR_DB_PATH", ".pakar_store.sqlite3"),
+                max_age_days=float(os.environ.get("PAKAR_SESSION_TTL_DAYS", "30")),
+            )
+        return _default_store
@@ -0,0 +1,137 @@
+import re
+import json
+
+from pydantic import ValidationError
+from langchain_core.messages import AIMessage, HumanMessage
+
+from prompts import STRUCTURED_REASK_PROMPT
+from telemetry import record_event
+
+# ==========================================
+# STRUCTURED OUTPUT & JSON REPAIR
+# ==========================================
+# Output terstruktur diminta lewat mode skema model (function calling dengan
+# tool_choice dipaksa, via `with_structured_output`). Jika model tetap membalas
+# teks atau JSON-nya terpotong, `repair_json` memulihkan objek secara toleran.
+# Baru jika itu pun gagal, model ditanya ulang SEKALI dengan pesan error-nya
+# (bukan mengulang seluruh analisis dari awal oleh user).
+
+_FENCE_RE = re.compile(r"^\s*```[a-zA-Z]*\s*|\s*```\s*$")
+
+
+def strip_code_fence(text):
+    # Hanya pagar ``` di awal/akhir yang dibuang; kata "json" di dalam isi tetap utuh
+    return _FENCE_RE.sub("", text or "")
+
+
+def _drop_trailing_commas(text):
+    """Buang koma tepat sebelum } / ] di luar string: {"a": [1, 2,],} -> {"a": [1, 2]}."""
+    out = []
+    in_string = escape = False
+    for ch in text:
+        if in_string:
+            if escape: escape = False
+            elif ch == "\\": escape = True
+            elif ch == '"': in_string = False
+        elif ch == '"': in_string = True
+        elif ch in "}]":
+            j = len(out) - 1
+            while j >= 0 and out[j].isspace(): j -= 1
+            if j >= 0 and out[j] == ",": del out[j]
+        out.append(ch)
+    return "".join(out)
+
+
+def _close(text, stack):
+    return text + "".join("}" if c == "{" else "]" for c in reversed(stack))
+
+
+def _candidates(text):
+    """Kandidat penutupan untuk JSON terpotong, dari yang paling lengkap ke paling pendek."""
+    stack, safe = [], []
+    in_string = escape = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape: escape = False
+            elif ch == "\\": escape = True
+            elif ch == '"': in_string = False
+            continue
+        if ch == '"': in_string = True
+        elif ch in "{[":
+            stack.append(ch)
+            safe.append((i + 1, list(stack)))
+        elif ch in "}]":
+            if not stack: break
+            stack.pop()
+            safe.append((i + 1, list(stack)))
+            if not stack: return  # objek lengkap tapi tetap tidak valid
+        elif ch == ",":
+            safe.append((i, list(stack)))
+
+    # 1) tutup string yang terpotong lalu semua kurung yang masih terbuka
+    tail = text[:-1] if escape else text
+    tail = tail + '"' if in_string else tail.rstrip().rstrip(",")
+    yield _close(tail, stack)
+    # 2) mundur ke titik aman terakhir (sebelum koma / setelah kurung)
+    for end, snapshot in reversed(safe[-50:]):
+        yield _close(text[:end], snapshot)
+
+
+def repair_json(text):
+    """Parse JSON yang mungkin dibungkus teks/pagar kode, berkoma di akhir, atau terpotong. Return dict/list atau None."""
+    text = strip_code_fence(text)
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts: return None
+    text = _drop_trailing_commas(text[min(starts):])
+    try: return json.JSONDecoder().raw_decode(text)[0]
+    except ValueError: pass
+    for candidate in _candidates(text):
+        try: return json.loads(candidate)
+        except ValueError: continue
+    return None
+
+
+def parse_model(content, schema):
+    """Validasi (hasil perbaikan) `content` ke model Pydantic `schema`; None jika gagal."""
+    data = repair_json(content)
+    if not isinstance(data, dict): return None
+    try: return schema(**data)
+    except (ValidationError, TypeError): return None
+
+
+def _raw_payload(raw):
+    """Teks JSON dari pesan model: argumen tool call (mode skema) atau isi teks biasa."""
+    for call in getattr(raw, "tool_calls", None) or []:
+        return json.dumps(call.get("args") or {}, ensure_ascii=False)
+    for call in getattr(raw, "invalid_tool_calls", None) or []:
+        if call.get("args"): return call["args"]
+    return str(getattr(raw, "content", "") or "")
+
+
+def invoke_structured(llm, prompt, inputs, parser):
+    """Panggil `llm` dengan mode output terstruktur untuk `parser.pydantic_object`.
+
+    Urutan: hasil skema native -> perbaikan JSON toleran -> satu kali tanya ulang.
+    Return instance model atau None.
+    """
+    schema = parser.pydantic_object
+    messages = prompt.format_messages(**inputs)
+    runnable = llm.with_structured_output(schema, include_raw=True)
+
+    def attempt(msgs):
+        out = runnable.invoke(msgs)
+        if out.get("parsed") is not None: return out["parsed"], "native", None, ""
+        payload = _raw_payload(out.get("raw"))
+        result = parse_model(payload, schema)
+        error = out.get("parsing_error") or "JSON tidak lengkap atau tidak sesuai skema"
+        return result, "repaired", error, payload
+
+    result, mode, error, payload = attempt(messages)
+    reasked = False
+    if result is None:
+        reasked = True
+        followup = STRUCTURED_REASK_PROMPT.format(schema=schema.__name__, error=str(error)[:300],
+                                                  format_instructions=parser.get_format_instructions())
+        result, mode, _, _ = attempt(messages + [AIMessage(content=payload[:4000]), HumanMessage(content=followup)])
+    record_event("parse", schema=schema.__name__, success=result is not None, mode=mode, reasked=reasked)
+    return result
@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import logging
+import threading
+import functools
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from chat_memory import estimate_tokens
+
+# ==========================================
+# TELEMETRY (LATENSI & TOKEN PER TAHAP)
+# ==========================================
+# Setiap panggilan LLM / tool dicatat sebagai satu record JSON: waktu total,
+# time-to-first-token, token input/output, model, serta tahap pemanggil
+# (parse_resume_with_llm, tool_cover_letter, ...). Event non-LLM seperti cache
+# hit/miss dan keberhasilan parsing JSON ikut dicatat. Record ditulis ke file
+# JSONL yang dirotasi dan disimpan di memori per sesi untuk ditampilkan di sidebar
+# (maksimal PAKAR_TRACE_SESSIONS sesi; sesi yang paling lama tidak aktif dibuang lebih dulu).
+
+_stage = contextvars.ContextVar("pakar_stage", default="unknown")
+_session = contextvars.ContextVar("pakar_session", default=None)
+
+
+def current_stage():
+    return _stage.get()
+
+
+def set_session(session_id):
+    _session.set(session_id)
+
+
+@contextmanager
+def trace_stage(name):
+    token = _stage.set(name)
+    try: yield
+    finally: _stage.reset(token)
+
+
+def traced(name):
+    """Decorator: tandai semua panggilan LLM di dalam fungsi dengan tahap `name`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with trace_stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def submit_with_context(executor, fn, *args, **kwargs):
+    """executor.submit yang membawa contextvars (tahap & sesi) ke worker thread."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class TraceLog:
+    def __init__(self, path=None, max_bytes=5 * 1024 * 1024, backup_count=3, per_session=500, max_sessions=200):
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # session_id -> deque record, urut LRU
+        self.per_session = per_session
+        self.max_sessions = max_sessions
+        self._logger = None
+        if path:
+            logger = logging.getLogger(f"pakar.trace.{path}")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            if not logger.handlers:
+                handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+            self._logger = logger
+
+    def record(self, kind, **fields):
+        entry = {"ts": round(time.time(), 3), "session": _session.get(), "stage": _stage.get(), "kind": kind}
+        entry.update(fields)
+        with self._lock:
+            records = self._sessions.get(entry["session"])
+            if records is None:
+                records = self._sessions[entry["session"]] = deque(maxlen=self.per_session)
+                while len(self._sessions) > self.max_sessions: self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(entry["session"])
+            records.append(entry)
+        if self._logger: self._logger.info(json.dumps(entry, ensure_ascii=False, default=str))
+        return entry
+
+    def records(self, session_id=None):
+        with self._lock:
+            return list(self._sessions.get(session_id, ()))
+
+    def breakdown(self, session_id=None):
+        """Ringkasan per tahap untuk satu sesi: jumlah panggilan, latensi, TTFT, token, cache & parse."""
+        stages = {}
+        for r in self.records(session_id):
+            s = stages.setdefault(r["stage"], {"calls": 0, "wall_ms": 0.0, "ttft_ms": [], "input_tokens": 0,
+                                               "output_tokens": 0, "cache_hits": 0, "cache_misses": 0,
+                                               "parse_ok": 0, "parse_failed": 0, "errors": 0})
+            if r["kind"] in ("llm", "tool"):
+                s["calls"] += 1
+                s["wall_ms"] += r.get("wall_ms") or 0
+                if r.get("ttft_ms") is not None: s["ttft_ms"].append(r["ttft_ms"])
+                s["input_tokens"] += r.get("input_tokens") or 0
+                s["output_tokens"] += r.get("output_tokens") or 0
+                if r.get("error"): s["errors"] += 1
+            elif r["kind"] == "cache":
+                s["cache_hits" if r.get("hit") else "cache_misses"] += 1
+            elif r["kind"] == "parse":
+                s["parse_ok" if r.get("success") else "parse_failed"] += 1
+        for s in stages.values():
+            ttfts = s.pop("ttft_ms")
+            s["avg_ttft_ms"] = round(sum(ttfts) / len(ttfts), 1) if ttfts else None
+            s["avg_wall_ms"] = round(s["wall_ms"] / s["calls"], 1) if s["calls"] else None
+            s["wall_ms"] = round(s["wall_ms"], 1)
+        return stages
+
+
+class TraceHandler(BaseCallbackHandler):
+    """Callback LangChain yang mengubah event LLM/tool menjadi record TraceLog.
+
+    Dipasang di setiap client LLM (lihat llm_pool) untuk event LLM, dan di config
+    AgentExecutor dengan `llm=False` untuk event tool (agar LLM tidak tercatat dua kali).
+    """
+
+    def __init__(self, log, llm=True, tools=True):
+        self.log = log
+        self.trace_llm = llm
+        self.trace_tools = tools
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, **info):
+        with self._lock:
+            self._runs[run_id] = dict(info, start=time.perf_counter(), first_token=None, stage=_stage.get())
+
+    def _pop(self, run_id):
+        with self._lock:
+            return self._runs.pop(run_id, None)
+
+    # --- LLM ---
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        if not self.trace_llm: return
+        prompt_chars = sum(len(str(m.content)) for batch in messages for m in batch)
+        self._start(run_id, model=self._model(serialized, kwargs), prompt_chars=prompt_chars)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        if not self.trace_llm: return
+        self._start(run_id, model=self._model(serialized, kwargs), prompt_chars=sum(len(p) for p in prompts))
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run and run["first_token"] is None and token: run["first_token"] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._pop(run_id)
+        if not run: return
+        input_tokens, output_tokens, text = None, None, ""
+        try:
+            generation = response.generations[0][0]
+            text = generation.text or ""
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            input_tokens, output_tokens = usage.get("input_tokens"), usage.get("output_tokens")
+        except (IndexError, AttributeError):
+            pass
+        self._finish("llm", run, model=run["model"],
+                     input_tokens=input_tokens if input_tokens is not None else (run["prompt_chars"] + 3) // 4,
+                     output_tokens=output_tokens if output_tokens is not None else estimate_tokens(text))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        run = self._pop(run_id)
+        if run: self._finish("llm", run, model=run["model"], error=f"{type(error).__name__}: {error}")
+
+    # --- TOOL ---
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        if self.trace_tools: self._start(run_id, name=serialized.get("name", "tool"))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        run = self._pop(run_id)
+        if run: self._finish("tool", run, name=run["name"])
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        run = self._pop(run_id)
+        if run: self._finish("tool", run, name=run["name"], error=f"{type(error).__name__}: {error}")
+
+    def _finish(self, kind, run, **fields):
+        now = time.perf_counter()
+        wall_ms = round((now - run["start"]) * 1000, 1)
+        ttft_ms = round((run["first_token"] - run["start"]) * 1000, 1) if run.get("first_token") else None
+        token = _stage.set(run["stage"])  # catat dengan tahap saat run dimulai
+        try: self.log.record(kind, wall_ms=wall_ms, ttft_ms=ttft_ms, **fields)
+        finally: _stage.reset(token)
+
+    @staticmethod
+    def _model(serialized, kwargs):
+        params = kwargs.get("invocation_params") or {}
+        return params.get("model") or params.get("model_name") or (serialized or {}).get("kwargs", {}).get("model")
+
+
+_trace_log = TraceLog(os.environ.get("PAKAR_TRACE_FILE", "pakar_traces.jsonl") or None,
+                      max_sessions=int(os.environ.get("PAKAR_TRACE_SESSIONS", "200")))
+_llm_handler = TraceHandler(_trace_log, llm=True, tools=False)
+_tool_handler = TraceHandler(_trace_log, llm=False, tools=True)
+
+
+def get_trace_log():
+    return _trace_log
+
+
+def llm_trace_handler():
+    return _llm_handler
+
+
+def tool_trace_handler():
+    return _tool_handler
+
+
+def record_event(kind, **fields):
+    return _trace_log.record(kind, **fields)
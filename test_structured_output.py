@@ -0,0 +1,106 @@
+import os
+
+os.environ.setdefault("PAKAR_TRACE_FILE", "")  # tes tidak menulis ke trace log produksi
+
+from typing import List
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel
+
+from structured_output import invoke_structured, parse_model, repair_json
+
+# ==========================================
+# JSON REPAIR & RE-ASK (structured_output.py)
+# ==========================================
+
+
+class Profil(BaseModel):
+    nama: str
+    skills: List[str]
+
+
+PARSER = PydanticOutputParser(pydantic_object=Profil)
+PROMPT = ChatPromptTemplate.from_template("Ekstrak profil dari: {text}")
+VALID = '{"nama": "Budi", "skills": ["Python", "SQL"]}'
+
+
+class ScriptedLLM:
+    """Pengganti `llm.with_structured_output(schema, include_raw=True)`: membalas output mentah sesuai urutan."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = []
+
+    def with_structured_output(self, schema, include_raw=False):
+        return self
+
+    def invoke(self, messages):
+        self.calls.append(messages)
+        reply = self.replies.pop(0)
+        if isinstance(reply, Profil): return {"parsed": reply, "raw": AIMessage(content=""), "parsing_error": None}
+        return {"parsed": None, "raw": AIMessage(content=reply), "parsing_error": "Invalid json output"}
+
+
+@pytest.mark.parametrize("text, expected", [
+    # Objek / array terpotong: kurung ditutup, string terpotong ditutup
+    ('{"nama": "Budi", "skills": ["Python", "SQL"', {"nama": "Budi", "skills": ["Python", "SQL"]}),
+    ('{"nama": "Bud', {"nama": "Bud"}),
+    ('[1, 2, {"x": 3', [1, 2, {"x": 3}]),
+    ('{"nama": "Budi", "skills": ["Python", "SQ', {"nama": "Budi", "skills": ["Python", "SQ"]}),
+    ('{"nama": "Budi",', {"nama": "Budi"}),
+    ('{"kutip": "a \\" b', {"kutip": 'a " b'}),
+    # Pagar kode & teks di sekitar JSON
+    ('```json\n{"nama": "Budi"}\n```', {"nama": "Budi"}),
+    ('```\n[1, 2]\n```', [1, 2]),
+    ('Berikut hasilnya:\n{"nama": "Budi"}\nSemoga membantu.', {"nama": "Budi"}),
+    ('```json\n{"catatan": "format json"}\n```', {"catatan": "format json"}),
+    # Koma di akhir (di luar string saja)
+    ('{"nama": "Budi", "skills": ["Python", "SQL",],}', {"nama": "Budi", "skills": ["Python", "SQL"]}),
+    ('{"a": [1,\n  ],\n}', {"a": [1]}),
+    ('{"teks": "x,}", "b": [1,]}', {"teks": "x,}", "b": [1]}),
+])
+def test_repair_json(text, expected):
+    assert repair_json(text) == expected
+
+
+@pytest.mark.parametrize("text", ["", "tidak ada json sama sekali", "```\n```"])
+def test_repair_json_without_json(text):
+    assert repair_json(text) is None
+
+
+def test_parse_model_truncated():
+    assert parse_model('{"nama": "Budi", "skills": ["Python", "SQL"', Profil) == Profil(nama="Budi", skills=["Python", "SQL"])
+    # Terpotong sebelum field wajib -> tidak lolos validasi skema
+    assert parse_model('{"nama": "Budi", "ski', Profil) is None
+    assert parse_model('[1, 2]', Profil) is None
+
+
+def test_invoke_structured_native():
+    llm = ScriptedLLM(Profil(nama="Budi", skills=["Python"]))
+    assert invoke_structured(llm, PROMPT, {"text": "cv"}, PARSER) == Profil(nama="Budi", skills=["Python"])
+    assert len(llm.calls) == 1
+
+
+def test_invoke_structured_repairs_without_reask():
+    llm = ScriptedLLM('Ini JSON-nya:\n```json\n{"nama": "Budi", "skills": ["Python", "SQL",')
+    assert invoke_structured(llm, PROMPT, {"text": "cv"}, PARSER) == Profil(nama="Budi", skills=["Python", "SQL"])
+    assert len(llm.calls) == 1
+
+
+def test_invoke_structured_reasks_once():
+    llm = ScriptedLLM('{"nama": "Budi"}', VALID)
+    assert invoke_structured(llm, PROMPT, {"text": "cv"}, PARSER) == Profil(nama="Budi", skills=["Python", "SQL"])
+    assert len(llm.calls) == 2
+    # Tanya ulang membawa output sebelumnya & pesan error untuk skema yang diminta
+    previous, followup = llm.calls[1][-2:]
+    assert isinstance(previous, AIMessage) and previous.content == '{"nama": "Budi"}'
+    assert isinstance(followup, HumanMessage) and "Profil" in followup.content and "Invalid json output" in followup.content
+
+
+def test_invoke_structured_gives_up_after_one_reask():
+    llm = ScriptedLLM("maaf, tidak bisa", "tetap bukan JSON", VALID)
+    assert invoke_structured(llm, PROMPT, {"text": "cv"}, PARSER) is None
+    assert len(llm.calls) == 2